@@ -0,0 +1,20 @@
+from src.api.server import create_server
+from src.ui.console import ConsoleUI
+
+
+def main():
+    """Chạy HTTP API (API_HOST, API_PORT, API_TOKEN/API_TOKENS) cho các pipeline nội bộ"""
+    console = ConsoleUI()
+    server = create_server()
+    host, port = server.server_address[:2]
+    console.print_info(f"HTTP API đang chạy tại http://{host}:{port} (Ctrl+C để dừng)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        console.print_warning("Đã dừng HTTP API")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+import argparse
+from src.core.storage import DataStorage
+from src.core.columnar_export import CorpusExporter
+from src.ui.console import ConsoleUI
+
+
+def main():
+    """
+    Xuất transcript đã lưu sang Parquet/Arrow để phân tích.
+    Đọc lại (memory map, không nạp toàn bộ vào RAM):
+        pyarrow.parquet.read_table('segments.parquet', memory_map=True)
+        pyarrow.ipc.open_file(pyarrow.memory_map('segments.arrow')).read_all()
+    """
+    parser = argparse.ArgumentParser(description="Xuất transcript sang định dạng cột (Parquet/Arrow)")
+    scope = parser.add_mutually_exclusive_group()
+    scope.add_argument('--playlist', action='append', dest='playlists', metavar='PLAYLIST_ID',
+                       help="ID playlist cần xuất (có thể lặp lại)")
+    scope.add_argument('--channel', help="Xuất mọi playlist của một kênh")
+    scope.add_argument('--all', action='store_true', help="Xuất toàn bộ corpus (mặc định)")
+    parser.add_argument('--format', choices=sorted(CorpusExporter.FORMATS), default='parquet')
+    parser.add_argument('--output', default='export', help="Thư mục ghi segments.* và videos.*")
+    parser.add_argument('--row-group-size', type=int, default=None,
+                        help="Số dòng mỗi row group (mặc định EXPORT_ROW_GROUP_SIZE hoặc 65536)")
+    args = parser.parse_args()
+
+    console = ConsoleUI()
+    try:
+        exporter = CorpusExporter(DataStorage(), args.row_group_size)
+        summary = exporter.export(args.output, args.playlists, args.channel, args.format)
+    except Exception as e:
+        console.print_error(f"Xuất dữ liệu thất bại: {str(e)}")
+        return
+
+    if not summary['playlist_count']:
+        console.print_warning("Không tìm thấy playlist nào phù hợp")
+    console.print_success(
+        f"Đã xuất {summary['video_count']} video, {summary['segment_count']} segment "
+        f"từ {summary['playlist_count']} playlist"
+    )
+    console.print_info(f"Segments: {summary['segments_path']}")
+    console.print_info(f"Videos: {summary['videos_path']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+from src.core.playlist import PlaylistHandler
+from src.core.transcript import TranscriptExtractor
+from src.core.storage import DataStorage
+from src.core.pipeline import TranscriptPipeline
+from src.core.job_control import JobControl
+from src.core.progress import ProgressBus, metrics_subscriber
+from src.ui.console import ConsoleUI
+from src.utils.profiler import profile_job
+
+
+def main():
+    """Chạy trích xuất phụ đề playlist từ dòng lệnh"""
+    console = ConsoleUI()
+    playlist_handler = PlaylistHandler()
+    pipeline = TranscriptPipeline(TranscriptExtractor(), DataStorage())
+
+    console.print_welcome()
+
+    while True:
+        playlist_url = console.get_playlist_url()
+        if playlist_url is None:
+            break
+
+        language = console.get_language_preference()
+
+        if not playlist_handler.validate_playlist_url(playlist_url):
+            console.print_error("URL playlist không hợp lệ!")
+            continue
+
+        playlist_info = playlist_handler.get_playlist_info(playlist_url)
+        if not playlist_info:
+            console.print_error("Không thể lấy thông tin playlist")
+            continue
+
+        videos = playlist_handler.get_playlist_videos(playlist_url)
+        if not videos:
+            console.print_error("Không thể tải danh sách video")
+            continue
+
+        console.print_info(f"Playlist: {playlist_info['title']} ({len(videos)} videos)")
+
+        # Thanh tqdm chỉ cần cập nhật vài lần mỗi giây
+        bus = ProgressBus()
+        bus.subscribe(console.create_progress_subscriber("Downloading transcripts"), max_updates_per_second=10)
+        bus.subscribe(metrics_subscriber)
+
+        # Ctrl+C dừng job giữa các video; ngân sách thời gian theo JOB_DEADLINE_SECONDS
+        control = JobControl.from_env()
+        try:
+            with profile_job('cli', playlist_id=playlist_info['id'], size=len(videos)):
+                summary = pipeline.run(videos, playlist_info['id'], language, bus, control=control, user_id='cli')
+        except KeyboardInterrupt:
+            succeeded = sum(1 for video in videos if video.get('status') == 'success')
+            console.print_warning(f"Đã dừng job: {succeeded}/{len(videos)} transcripts đã được lưu")
+            continue
+
+        total = len(videos)
+        if summary['stop_reason']:
+            console.print_warning(f"Job dừng sớm ({summary['stop_reason']})")
+        if summary['success_count'] == total:
+            console.print_success(f"Đã tải thành công {total}/{total} transcripts")
+        else:
+            console.print_warning(f"Hoàn thành với {summary['success_count']}/{total} transcripts thành công")
+            for video in summary['failed_videos']:
+                console.print_warning(f"{video['title']}: {video.get('error_type')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import argparse
+import json
+from src.core.storage import DataStorage
+from src.core.faq_miner import FaqMiner
+from src.ui.console import ConsoleUI
+
+
+def main():
+    """
+    Phân tích FAQ/từ khóa từ transcript đã lưu của playlist (offline, không gọi mạng).
+    Kết quả được cache theo manifest của playlist; sau khi đồng bộ thêm video,
+    chỉ các transcript mới được phân tích lại.
+    """
+    parser = argparse.ArgumentParser(description="Tìm câu hỏi thường gặp và từ khóa của playlist")
+    parser.add_argument('playlist_id', help="ID playlist đã trích xuất")
+    parser.add_argument('--top', type=int, default=10, help="Số mục FAQ hiển thị")
+    parser.add_argument('--similarity', type=float, default=None,
+                        help="Ngưỡng cosine để gom câu hỏi gần giống nhau (mặc định FAQ_SIMILARITY hoặc 0.8)")
+    parser.add_argument('--json', dest='json_path', help="Ghi toàn bộ kết quả ra file JSON")
+    parser.add_argument('--force', action='store_true', help="Bỏ qua kết quả đã cache của playlist")
+    args = parser.parse_args()
+
+    console = ConsoleUI()
+    try:
+        result = FaqMiner(DataStorage(), similarity=args.similarity).mine(args.playlist_id, force=args.force)
+    except Exception as e:
+        console.print_error(f"Phân tích FAQ thất bại: {str(e)}")
+        return
+
+    if not result['video_count']:
+        console.print_warning(f"Playlist {args.playlist_id} chưa có transcript nào được lưu")
+        return
+
+    console.print_success(
+        f"{len(result['faq'])} mục FAQ từ {result['question_count']} câu hỏi trong {result['video_count']} video"
+    )
+    console.print_info("Từ khóa: " + ", ".join(item['phrase'] for item in result['keyphrases'][:10]))
+    for number, entry in enumerate(result['faq'][:args.top], 1):
+        print(f"\n{number}. {entry['question']} ({entry['occurrences']} lần, {entry['video_count']} video)")
+        for source in entry['sources'][:3]:
+            print(f"   [{source['timestamp']}] {source['title']} - {source['url']}")
+
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        console.print_info(f"Đã ghi kết quả vào {args.json_path}")
+
+
+if __name__ == "__main__":
+    main()
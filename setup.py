@@ -6,8 +6,17 @@ setup(
     packages=find_packages(),
     install_requires=[
         'yt-dlp',
-        'youtube-transcript-api',
+        'youtube-transcript-api>=0.6,<2',
+        'requests',
         'tqdm',
         'colorama',
     ],
+    extras_require={
+        # Backend lưu trữ S3 (STORAGE_BACKEND=s3)
+        's3': ['boto3'],
+        # Xuất Parquet/Arrow (export_corpus.py)
+        'parquet': ['pyarrow'],
+        # Phân tích FAQ/từ khóa (mine_faq.py): numpy cho TF-IDF, scipy cho ma trận thưa khi gom câu hỏi
+        'faq': ['numpy', 'scipy'],
+    },
 ) 
\ No newline at end of file
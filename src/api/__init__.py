@@ -0,0 +1 @@
+# HTTP API package
\ No newline at end of file
@@ -0,0 +1,452 @@
+import hashlib
+import hmac
+import json
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from ..core.job_control import JobControl
+from ..core.pipeline import TranscriptPipeline
+from ..core.playlist import PlaylistHandler
+from ..core.progress import ProgressBus, ProgressEvent, metrics_subscriber
+from ..core.storage import DataStorage
+from ..core.transcript import TranscriptExtractor
+from ..core.work_queue import create_work_queue
+from ..utils.error_handler import ErrorHandler
+from ..utils.metrics import Metrics
+
+
+class ApiError(Exception):
+    """Lỗi trả về cho client với mã HTTP tương ứng"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class ApiJob:
+    """
+    Job gửi qua API: kết quả từng video được ghi nhận theo thứ tự hoàn thành để stream cho client.
+    Trạng thái: resolving (đang lấy danh sách video của playlist) -> running -> finished/cancelled/
+    deadline_exceeded/failed
+    """
+
+    def __init__(self, job_id: str, language: str):
+        self.job_id = job_id
+        self.playlists = []
+        self.language = language
+        self.membership = {}
+        self.total = 0
+        self.control = JobControl.from_env()
+        self.status = 'resolving'
+        self.error = None
+        self.stop_reason = None
+        self.success_count = 0
+        self.failed_count = 0
+        self.results = []
+        self._seen = set()
+        self._condition = threading.Condition()
+
+    def _record(self, video: dict) -> dict:
+        video_id = video['video_id']
+        playlist_ids = self.membership.get(video_id, [])
+        record = {
+            'video_id': video_id,
+            'title': video.get('title'),
+            'status': video.get('status'),
+            'playlist_ids': playlist_ids
+        }
+        if video.get('status') == 'success' and playlist_ids:
+            record['transcript_url'] = f"/playlists/{playlist_ids[0]}/transcripts/{video_id}"
+        else:
+            record['error_type'] = video.get('error_type')
+            record['error'] = video.get('error')
+        return record
+
+    def start(self, playlists: list, membership: dict):
+        """Đã có danh sách video: chuyển sang xử lý"""
+        with self._condition:
+            self.playlists = [
+                {key: playlist[key] for key in ('playlist_id', 'title', 'channel')} for playlist in playlists
+            ]
+            self.membership = membership
+            self.total = len(membership)
+            self.status = 'running'
+            self._condition.notify_all()
+
+    def _append(self, video: dict):
+        if video['video_id'] not in self._seen:
+            self._seen.add(video['video_id'])
+            self.results.append(self._record(video))
+
+    def on_event(self, event: ProgressEvent):
+        """Subscriber của ProgressBus (chạy trên luồng xử lý job)"""
+        with self._condition:
+            if event.kind == ProgressEvent.VIDEO_FINISHED and event.video:
+                self._append(event.video)
+            self.success_count = event.success_count
+            self.failed_count = event.failed_count
+            self._condition.notify_all()
+
+    def finish(self, summary: dict = None, error: str = None):
+        with self._condition:
+            if summary is not None:
+                # Video bị bỏ qua khi job dừng sớm không có sự kiện riêng
+                for video in summary['failed_videos']:
+                    self._append(video)
+                self.success_count = summary['success_count']
+                self.failed_count = summary['failed_count']
+                self.stop_reason = summary['stop_reason']
+            else:
+                # Job dừng trước khi chạy (bị hủy khi đang lấy danh sách video)
+                self.stop_reason = self.control.stop_reason
+            self.error = error
+            self.status = 'failed' if error else (self.stop_reason or 'finished')
+            self._condition.notify_all()
+
+    @property
+    def done(self) -> bool:
+        return self.status not in ('resolving', 'running')
+
+    def iter_results(self, poll_interval: float = 1.0):
+        """Lần lượt trả về kết quả từng video, chờ kết quả mới cho tới khi job kết thúc"""
+        index = 0
+        while True:
+            with self._condition:
+                while index >= len(self.results) and not self.done:
+                    self._condition.wait(poll_interval)
+                batch = self.results[index:]
+                done = self.done
+            index += len(batch)
+            yield from batch
+            if done and index >= len(self.results):
+                return
+
+    def to_dict(self) -> dict:
+        with self._condition:
+            return {
+                'job_id': self.job_id,
+                'status': self.status,
+                'language': self.language,
+                'playlists': self.playlists,
+                'total': self.total,
+                'completed': len(self.results),
+                'success_count': self.success_count,
+                'failed_count': self.failed_count,
+                'stop_reason': self.stop_reason,
+                'error': self.error,
+                'status_url': f"/jobs/{self.job_id}",
+                'results_url': f"/jobs/{self.job_id}/results"
+            }
+
+
+class TranscriptApi:
+    """
+    Lớp dịch vụ của HTTP API: PlaylistHandler -> TranscriptPipeline -> DataStorage,
+    dùng chung các thành phần (scheduler, rate limiter, hàng đợi...) với giao diện Streamlit.
+    """
+
+    def __init__(self, data_storage: DataStorage = None, playlist_handler: PlaylistHandler = None,
+                 pipeline: TranscriptPipeline = None):
+        self.error_handler = ErrorHandler()
+        self.playlist_handler = playlist_handler or PlaylistHandler()
+        self.data_storage = data_storage or DataStorage()
+        self.pipeline = pipeline or TranscriptPipeline(TranscriptExtractor(), self.data_storage)
+        self.work_queue = create_work_queue() if os.environ.get('WORK_QUEUE_BACKEND') else None
+        # Số job gần nhất được giữ lại để tra cứu trạng thái/kết quả
+        self.max_jobs = int(os.environ.get('API_MAX_JOBS', 100))
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _validate_urls(self, urls: list):
+        """Kiểm tra cú pháp URL (không gọi mạng) để trả lỗi 400 ngay khi gửi job"""
+        for url in urls:
+            if not self.playlist_handler.validate_playlist_url(url):
+                raise ApiError(400, f"URL playlist không hợp lệ: {url}")
+
+    def _resolve_playlists(self, urls: list) -> list:
+        """Lấy thông tin và danh sách video của các playlist (gọi YouTube, chạy trong luồng của job)"""
+        playlists = []
+        for url in urls:
+            playlist_info = self.playlist_handler.get_playlist_info(url)
+            if not playlist_info:
+                raise ApiError(502, f"Không thể lấy thông tin playlist: {url}")
+            videos = self.playlist_handler.get_playlist_videos(url)
+            if videos:
+                playlists.append({
+                    'playlist_id': playlist_info['id'],
+                    'title': playlist_info['title'],
+                    'channel': playlist_info['channel'],
+                    'videos': videos
+                })
+        if not playlists:
+            raise ApiError(422, "Không có playlist nào để xử lý")
+        return playlists
+
+    def submit_job(self, urls: list, language: str, user_id: str) -> ApiJob:
+        """
+        Tạo job và chạy trong luồng nền, trả về ngay để client theo dõi.
+        Danh sách video được lấy trong luồng của job; lỗi khi lấy được báo qua trạng thái job (status 'failed')
+        """
+        self._validate_urls(urls)
+        job = ApiJob(uuid.uuid4().hex, language)
+
+        with self._lock:
+            self._jobs[job.job_id] = job
+            while len(self._jobs) > self.max_jobs:
+                oldest_id = next((job_id for job_id, old in self._jobs.items() if old.done), None)
+                if oldest_id is None:
+                    break
+                del self._jobs[oldest_id]
+
+        def run():
+            bus = ProgressBus()
+            bus.subscribe(job.on_event)
+            bus.subscribe(metrics_subscriber)
+            try:
+                playlists = self._resolve_playlists(urls)
+                if job.control.stop_reason:
+                    job.finish()
+                    return
+                _, membership = self.pipeline.build_work_set(playlists)
+                job.start(playlists, membership)
+                self.error_handler.log_info(f"API: job {job.job_id} có {job.total} video")
+                if self.work_queue is not None:
+                    summary = self.pipeline.run_distributed(
+                        playlists, language, self.work_queue, bus, job.job_id, job.control, user_id
+                    )
+                else:
+                    summary = self.pipeline.run_batch(playlists, language, bus, job.job_id, job.control, user_id)
+                job.finish(summary)
+            except ApiError as e:
+                self.error_handler.log_warning(f"API: job {job.job_id} không lấy được playlist: {str(e)}")
+                job.finish(error=str(e))
+            except Exception as e:
+                self.error_handler.log_error("API Job Error", str(e), {"job_id": job.job_id})
+                job.finish(error=str(e))
+
+        threading.Thread(target=run, name=f"api-job-{job.job_id[:8]}", daemon=True).start()
+        self.error_handler.log_info(f"API: bắt đầu job {job.job_id} ({len(urls)} playlist)")
+        return job
+
+    def get_job(self, job_id: str) -> ApiJob:
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            raise ApiError(404, f"Không tìm thấy job {job_id}")
+        return job
+
+    def get_transcript(self, playlist_id: str, video_id: str) -> tuple:
+        """Trả về (ref, transcript_data) của video đã lưu"""
+        ref = self.data_storage.get_transcript_ref(playlist_id, video_id)
+        if not ref or not ref.get('object'):
+            raise ApiError(404, f"Chưa có transcript của video {video_id} trong playlist {playlist_id}")
+        return ref, self.data_storage.load_transcript(ref)
+
+
+class ApiRequestHandler(BaseHTTPRequestHandler):
+    """
+    Các endpoint:
+        POST   /jobs                               {"urls": [...], "language": "en"} -> 202 + trạng thái job
+        GET    /jobs/<job_id>                      trạng thái job
+        GET    /jobs/<job_id>/results              NDJSON, mỗi dòng một video khi xử lý xong
+                                                   (?include=transcript để kèm nội dung)
+        DELETE /jobs/<job_id>                      dừng job
+        GET    /playlists/<pid>/transcripts/<vid>  transcript đã lưu (?format=txt), hỗ trợ ETag/If-None-Match
+    """
+    protocol_version = 'HTTP/1.1'
+    server_version = 'TranscriptAPI/1.0'
+    api = None
+
+    def log_message(self, format, *args):
+        self.api.error_handler.log_debug(f"API {self.address_string()} {format % args}")
+
+    def _send_json(self, status: int, data: dict, headers: dict = None):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):X}\r\n".encode('ascii') + data + b"\r\n")
+        self.wfile.flush()
+
+    def _read_json_body(self) -> dict:
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            data = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            raise ApiError(400, "Body không phải JSON hợp lệ")
+        if not isinstance(data, dict):
+            raise ApiError(400, "Body phải là JSON object")
+        return data
+
+    @staticmethod
+    def _api_tokens() -> dict:
+        """
+        Token hợp lệ -> user_id, cấu hình phía server:
+        API_TOKENS="user_a:token_a,user_b:token_b" (mỗi người dùng một token) và/hoặc API_TOKEN (user 'api')
+        """
+        tokens = {}
+        for pair in os.environ.get('API_TOKENS', '').split(','):
+            user_id, _, token = pair.strip().partition(':')
+            if user_id and token:
+                tokens[token] = user_id
+        if os.environ.get('API_TOKEN'):
+            tokens[os.environ['API_TOKEN']] = 'api'
+        return tokens
+
+    def _authenticate(self) -> str:
+        """
+        Kiểm tra token và trả về user_id dùng cho hàng đợi công bằng/hạn mức của FetchScheduler.
+        user_id chỉ lấy từ token (không tin giá trị client tự gửi); không cấu hình token thì mọi request là 'api'.
+        """
+        tokens = self._api_tokens()
+        if not tokens:
+            return 'api'
+        provided = self.headers.get('Authorization', '').encode('utf-8')
+        user_id = None
+        # So sánh với mọi token (thời gian không phụ thuộc token nào khớp)
+        for token, token_user in tokens.items():
+            if hmac.compare_digest(provided, f"Bearer {token}".encode('utf-8')):
+                user_id = token_user
+        if user_id is None:
+            raise ApiError(401, "Thiếu hoặc sai API token")
+        return user_id
+
+    def _dispatch(self, method: str):
+        Metrics().increment('api.requests')
+        url = urlparse(self.path)
+        parts = [part for part in url.path.split('/') if part]
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        try:
+            if parts == ['health'] and method == 'GET':
+                return self._send_json(200, {'status': 'ok'})
+            user_id = self._authenticate()
+            if parts == ['jobs'] and method == 'POST':
+                return self._submit_job(user_id)
+            if len(parts) == 2 and parts[0] == 'jobs' and method == 'GET':
+                return self._send_json(200, self.api.get_job(parts[1]).to_dict())
+            if len(parts) == 2 and parts[0] == 'jobs' and method == 'DELETE':
+                job = self.api.get_job(parts[1])
+                job.control.cancel()
+                return self._send_json(202, job.to_dict())
+            if len(parts) == 3 and parts[0] == 'jobs' and parts[2] == 'results' and method == 'GET':
+                return self._stream_results(self.api.get_job(parts[1]), query.get('include') == 'transcript')
+            if len(parts) == 4 and parts[0] == 'playlists' and parts[2] == 'transcripts' and method == 'GET':
+                return self._send_transcript(parts[1], parts[3], query.get('format', 'json'))
+            raise ApiError(404, f"Không có endpoint {method} {url.path}")
+        except ApiError as e:
+            self._send_json(e.status, {'error': str(e)})
+        except Exception as e:
+            self.api.error_handler.log_error("API Request Error", str(e), {"method": method, "path": self.path})
+            self._send_json(500, {'error': str(e)})
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def do_DELETE(self):
+        self._dispatch('DELETE')
+
+    def _submit_job(self, user_id: str):
+        data = self._read_json_body()
+        urls = data.get('urls') or ([data['url']] if data.get('url') else [])
+        if not urls:
+            raise ApiError(400, "Cần truyền 'urls' (danh sách URL playlist) hoặc 'url'")
+        job = self.api.submit_job(urls, data.get('language', 'en'), user_id)
+        self._send_json(202, job.to_dict(), {'Location': f"/jobs/{job.job_id}"})
+
+    def _stream_results(self, job: ApiJob, include_transcript: bool):
+        """Stream NDJSON (chunked): mỗi video một dòng ngay khi xử lý xong, dòng cuối là trạng thái job"""
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson; charset=utf-8')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        try:
+            try:
+                for record in job.iter_results():
+                    if include_transcript and record.get('transcript_url'):
+                        record = self._with_transcript(record)
+                    line = json.dumps({'type': 'video', **record}, ensure_ascii=False) + '\n'
+                    self._send_chunk(line.encode('utf-8'))
+                final = {'type': 'job', **job.to_dict()}
+            except (BrokenPipeError, ConnectionResetError):
+                raise
+            except Exception as e:
+                # Header 200 đã gửi: báo lỗi bằng dòng cuối thay vì để client chờ một response bị cắt
+                self.api.error_handler.log_error("API Stream Error", str(e), {"job_id": job.job_id})
+                final = {'type': 'error', 'job_id': job.job_id, 'error': str(e)}
+            self._send_chunk((json.dumps(final, ensure_ascii=False) + '\n').encode('utf-8'))
+            self._send_chunk(b'')
+        except (BrokenPipeError, ConnectionResetError):
+            # Client ngắt kết nối: job vẫn chạy tiếp, có thể đọc lại kết quả từ đầu
+            self.close_connection = True
+
+    def _with_transcript(self, record: dict) -> dict:
+        """Kèm nội dung transcript vào bản ghi kết quả; lỗi đọc được ghi vào transcript_error"""
+        record = dict(record)
+        try:
+            ref, transcript_data = self.api.get_transcript(record['playlist_ids'][0], record['video_id'])
+            record['content_hash'] = ref.get('content_hash')
+            record['transcript'] = transcript_data['transcript']
+        except ApiError as e:
+            # Video gần trùng ở chế độ skip không có nội dung
+            record['transcript_error'] = str(e)
+        except Exception as e:
+            self.api.error_handler.log_error("API Transcript Read Error", str(e), {"video_id": record['video_id']})
+            record['transcript_error'] = str(e)
+        return record
+
+    def _send_transcript(self, playlist_id: str, video_id: str, fmt: str):
+        """
+        Transcript đã lưu; ETag theo hash nội dung và các trường của tham chiếu có trong response
+        (tiêu đề, ngày tải) để client chỉ tải lại khi transcript hoặc các trường này thay đổi
+        """
+        if fmt not in ('json', 'txt'):
+            raise ApiError(400, "format phải là 'json' hoặc 'txt'")
+        ref = self.api.data_storage.get_transcript_ref(playlist_id, video_id)
+        if not ref or not ref.get('object'):
+            raise ApiError(404, f"Chưa có transcript của video {video_id} trong playlist {playlist_id}")
+        version = json.dumps([ref['content_hash'], ref.get('title'), ref.get('download_date')], ensure_ascii=False)
+        etag = f'"{hashlib.sha256(version.encode("utf-8")).hexdigest()[:32]}-{fmt}"'
+        if_none_match = self.headers.get('If-None-Match', '')
+        if if_none_match.strip() == '*' or etag in [tag.strip() for tag in if_none_match.split(',')]:
+            Metrics().increment('api.not_modified')
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        transcript_data = self.api.data_storage.load_transcript(ref)
+        headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+        if fmt == 'json':
+            return self._send_json(200, {**transcript_data, 'content_hash': ref['content_hash']}, headers)
+        body = self.api.data_storage.render_text(transcript_data).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def create_server(host: str = None, port: int = None, api: TranscriptApi = None) -> ThreadingHTTPServer:
+    """Tạo HTTP server theo API_HOST (mặc định 127.0.0.1) và API_PORT (mặc định 8080)"""
+    host = host or os.environ.get('API_HOST', '127.0.0.1')
+    port = port if port is not None else int(os.environ.get('API_PORT', 8080))
+    handler = type('BoundApiRequestHandler', (ApiRequestHandler,), {'api': api or TranscriptApi()})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
@@ -0,0 +1,222 @@
+import os
+from ..utils.error_handler import ErrorHandler
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow là phụ thuộc tùy chọn, chỉ cần khi xuất Parquet/Arrow
+    pa = None
+    pq = None
+
+
+def _segment_schema():
+    return pa.schema([
+        ('video_id', pa.string()),
+        ('language', pa.string()),
+        ('content_hash', pa.string()),
+        ('segment_index', pa.int32()),
+        ('start', pa.float64()),
+        ('duration', pa.float64()),
+        ('text', pa.string()),
+    ])
+
+
+def _video_schema():
+    return pa.schema([
+        ('playlist_id', pa.string()),
+        ('playlist_title', pa.string()),
+        ('channel', pa.string()),
+        ('video_id', pa.string()),
+        ('title', pa.string()),
+        ('language', pa.string()),
+        ('language_name', pa.string()),
+        ('download_date', pa.string()),
+        ('content_hash', pa.string()),
+        ('segment_count', pa.int32()),
+        ('duration', pa.float64()),
+        ('near_duplicate_of', pa.string()),
+    ])
+
+
+class _RowGroupWriter:
+    """
+    Ghi bảng theo từng row group: các dòng được gom vào buffer cột và ghi ra đĩa
+    mỗi khi đủ row_group_size dòng, nên bộ nhớ không phụ thuộc kích thước corpus.
+    File được ghi vào file tạm rồi đổi tên khi hoàn tất.
+    """
+
+    def __init__(self, path: str, schema, fmt: str, row_group_size: int):
+        self.path = path
+        self.schema = schema
+        self.fmt = fmt
+        self.row_group_size = row_group_size
+        self.rows = 0
+        self._tmp_path = f"{path}.tmp"
+        self._columns = {name: [] for name in schema.names}
+        self._buffered = 0
+        if fmt == 'parquet':
+            self._sink = None
+            self._writer = pq.ParquetWriter(self._tmp_path, schema, compression='zstd')
+        else:
+            # Arrow IPC không nén để đọc zero-copy qua memory map
+            self._sink = pa.OSFile(self._tmp_path, 'wb')
+            self._writer = pa.ipc.new_file(self._sink, schema)
+
+    def append(self, row: dict):
+        for name, values in self._columns.items():
+            values.append(row.get(name))
+        self._buffered += 1
+        if self._buffered >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        if not self._buffered:
+            return
+        table = pa.Table.from_pydict(self._columns, schema=self.schema)
+        if self.fmt == 'parquet':
+            self._writer.write_table(table, row_group_size=self.row_group_size)
+        else:
+            self._writer.write_table(table, max_chunksize=self.row_group_size)
+        self.rows += self._buffered
+        self._columns = {name: [] for name in self.schema.names}
+        self._buffered = 0
+
+    def close(self):
+        self.flush()
+        self._writer.close()
+        if self._sink is not None:
+            self._sink.close()
+        os.replace(self._tmp_path, self.path)
+
+    def abort(self):
+        """Đóng writer và xóa file tạm khi xuất bị lỗi"""
+        try:
+            self._writer.close()
+            if self._sink is not None:
+                self._sink.close()
+        finally:
+            if os.path.exists(self._tmp_path):
+                os.remove(self._tmp_path)
+
+
+class CorpusExporter:
+    """
+    Xuất transcript ra định dạng cột (Parquet hoặc Arrow IPC) để phân tích bằng
+    pandas/DuckDB/Spark mà không phải đọc từng file JSON.
+    Tạo hai bảng:
+        segments - mỗi dòng một segment (video_id, language, start, duration, text),
+                   mỗi nội dung transcript (content_hash) chỉ được ghi một lần dù nằm trong nhiều playlist
+        videos   - mỗi dòng một video trong một playlist (tiêu đề, kênh, ngôn ngữ, content_hash...),
+                   nối với segments qua content_hash
+    Playlist lưu theo cấu trúc cũ (json/, trước khi có kho object) cũng được xuất.
+    """
+    FORMATS = {'parquet': 'parquet', 'arrow': 'arrow'}
+
+    def __init__(self, data_storage, row_group_size: int = None):
+        if pa is None:
+            raise ImportError("Xuất Parquet/Arrow cần thư viện pyarrow (pip install pyarrow)")
+        self.data_storage = data_storage
+        self.error_handler = ErrorHandler()
+        self.row_group_size = row_group_size or int(os.environ.get('EXPORT_ROW_GROUP_SIZE', 65536))
+
+    def resolve_playlists(self, playlist_ids: list = None, channel: str = None) -> list:
+        """
+        Xác định các playlist cần xuất: danh sách playlist_ids, các playlist của một kênh
+        (theo metadata đã lưu khi trích xuất) hoặc toàn bộ corpus khi không chỉ định
+        """
+        if playlist_ids:
+            return list(dict.fromkeys(playlist_ids))
+        all_ids = self.data_storage.list_playlist_ids()
+        if not channel:
+            return all_ids
+        wanted = channel.strip().lower()
+        return [
+            playlist_id for playlist_id in all_ids
+            if ((self.data_storage.get_playlist_metadata(playlist_id) or {}).get('channel') or '').strip().lower() == wanted
+        ]
+
+    def export(self, output_dir: str, playlist_ids: list = None, channel: str = None, fmt: str = 'parquet') -> dict:
+        """
+        Ghi segments.<ext> và videos.<ext> vào output_dir
+        Returns:
+            dict gồm đường dẫn hai file, số playlist, số video và số segment đã ghi
+        """
+        if fmt not in self.FORMATS:
+            raise ValueError(f"Định dạng không hỗ trợ: {fmt} (chọn một trong {', '.join(self.FORMATS)})")
+        selected = self.resolve_playlists(playlist_ids, channel)
+        os.makedirs(output_dir, exist_ok=True)
+        extension = self.FORMATS[fmt]
+        segments = _RowGroupWriter(os.path.join(output_dir, f"segments.{extension}"), _segment_schema(), fmt,
+                                   self.row_group_size)
+        videos = _RowGroupWriter(os.path.join(output_dir, f"videos.{extension}"), _video_schema(), fmt,
+                                 self.row_group_size)
+        try:
+            self._write_playlists(selected, segments, videos)
+            segments.close()
+            videos.close()
+        except Exception as e:
+            segments.abort()
+            videos.abort()
+            self.error_handler.log_error("Export Error", str(e), {"output_dir": output_dir, "format": fmt})
+            raise
+
+        summary = {
+            'segments_path': segments.path,
+            'videos_path': videos.path,
+            'playlist_count': len(selected),
+            'video_count': videos.rows,
+            'segment_count': segments.rows
+        }
+        self.error_handler.log_info(
+            f"Đã xuất {summary['video_count']} video, {summary['segment_count']} segment "
+            f"từ {len(selected)} playlist sang {fmt}: {output_dir}"
+        )
+        return summary
+
+    def _write_playlists(self, playlist_ids: list, segments: _RowGroupWriter, videos: _RowGroupWriter):
+        # content_hash -> (segment_count, duration, language_name) của các transcript đã ghi
+        written = {}
+        for playlist_id in playlist_ids:
+            metadata = self.data_storage.get_playlist_metadata(playlist_id) or {}
+            refs = self.data_storage.get_playlist_refs(playlist_id, include_legacy=True)
+            for ref in sorted(refs, key=lambda r: r['video_id']):
+                row = {
+                    'playlist_id': playlist_id,
+                    'playlist_title': metadata.get('title'),
+                    'channel': metadata.get('channel'),
+                    'video_id': ref['video_id'],
+                    'title': ref.get('title'),
+                    'language': ref.get('language'),
+                    'download_date': ref.get('download_date'),
+                    'content_hash': ref.get('content_hash'),
+                    'segment_count': 0,
+                    'near_duplicate_of': (ref.get('near_duplicate_of') or {}).get('video_id')
+                }
+                # Video gần trùng bị bỏ qua khi lưu không có nội dung
+                if ref.get('object') or ref.get('legacy_key'):
+                    content_hash = ref['content_hash']
+                    if content_hash not in written:
+                        written[content_hash] = self._write_segments(ref, content_hash, segments)
+                    row['segment_count'], row['duration'], row['language_name'] = written[content_hash]
+                videos.append(row)
+
+    def _write_segments(self, ref: dict, content_hash: str, segments: _RowGroupWriter) -> tuple:
+        """Ghi các segment của một transcript; chỉ giữ một transcript trong bộ nhớ tại một thời điểm"""
+        transcript_data = self.data_storage.load_transcript(ref)
+        transcript = transcript_data['transcript']
+        language = transcript_data['metadata']['language']
+        end = 0.0
+        for index, entry in enumerate(transcript):
+            start = float(entry.get('start', 0.0))
+            duration = float(entry.get('duration', 0.0))
+            end = max(end, start + duration)
+            segments.append({
+                'video_id': ref['video_id'],
+                'language': language,
+                'content_hash': content_hash,
+                'segment_index': index,
+                'start': start,
+                'duration': duration,
+                'text': entry.get('text', '')
+            })
+        return len(transcript), end, transcript_data['metadata']['language_name']
@@ -0,0 +1,158 @@
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from ..utils.error_handler import ErrorHandler
+from ..utils.metrics import Metrics
+from .rate_limiter import RateLimiter
+from .retry import FailureReason
+
+
+class CoverageReport:
+    """
+    Kết quả quét trước phụ đề của một tập video: ngôn ngữ nào có sẵn cho video nào.
+    Trạng thái của một video với một ngôn ngữ:
+        'manual'     - phụ đề do người đăng tạo
+        'generated'  - phụ đề tự động
+        'translated' - không có sẵn nhưng dịch được từ phụ đề tiếng Anh
+        None         - không tải được
+    """
+    SYMBOLS = {'manual': '✅', 'generated': '🤖', 'translated': '🌐', None: '—'}
+
+    def __init__(self, language: str, videos: list, listings: dict):
+        self.language = language
+        self.videos = videos
+        # video_id -> {'tracks': [...], 'error_type': ...}
+        self.listings = listings
+
+    def status(self, video_id: str, language: str = None) -> str:
+        """Trạng thái phụ đề theo đúng thứ tự mà TranscriptExtractor sẽ thử khi tải"""
+        language = language or self.language
+        tracks = self.listings.get(video_id, {}).get('tracks') or []
+        for generated, status in ((False, 'manual'), (True, 'generated')):
+            if any(track['language'] == language and track['generated'] == generated for track in tracks):
+                return status
+        if language != 'en' and any(track['language'] == 'en' and track['translatable'] for track in tracks):
+            return 'translated'
+        return None
+
+    def usable_ids(self, language: str = None) -> set:
+        return {video['video_id'] for video in self.videos if self.status(video['video_id'], language)}
+
+    def is_unavailable(self, video_id: str, language: str = None) -> bool:
+        """
+        Video chắc chắn không có phụ đề dùng được: lấy được danh sách phụ đề nhưng không có ngôn ngữ cần,
+        hoặc lỗi vĩnh viễn (tắt phụ đề, video không tồn tại...). Lỗi tạm thời khi quét thì chưa kết luận được.
+        """
+        listing = self.listings.get(video_id)
+        if listing is None:
+            return False
+        if listing.get('error_type'):
+            return FailureReason.is_permanent(listing['error_type'])
+        return self.status(video_id, language) is None
+
+    def unavailable_ids(self, language: str = None) -> set:
+        return {video['video_id'] for video in self.videos if self.is_unavailable(video['video_id'], language)}
+
+    def unavailable_reason(self, video_id: str) -> str:
+        """Lý do video không dùng được: lỗi khi lấy danh sách phụ đề hoặc thiếu ngôn ngữ"""
+        return self.listings.get(video_id, {}).get('error_type') or FailureReason.NO_TRANSCRIPT
+
+    def filter_playlists(self, playlists: list) -> list:
+        """
+        Bỏ khỏi các playlist những video đã quét mà không có phụ đề dùng được (không gọi mạng cho các video này).
+        Video bị lỗi tạm thời khi quét hoặc thêm vào playlist sau lần quét vẫn được giữ lại.
+        Returns:
+            Danh sách video bị bỏ qua (không trùng lặp), đã được đánh dấu lỗi
+        """
+        skipped = {}
+        for playlist in playlists:
+            usable = []
+            for video in playlist['videos']:
+                video_id = video['video_id']
+                if self.is_unavailable(video_id):
+                    video['status'] = 'failed'
+                    video['error_type'] = self.unavailable_reason(video_id)
+                    video['error'] = f"Không có phụ đề {self.language} (quét trước)"
+                    skipped.setdefault(video_id, video)
+                else:
+                    usable.append(video)
+            playlist['videos'] = usable
+        return list(skipped.values())
+
+    def language_counts(self) -> dict:
+        """Số video có phụ đề (không tính bản dịch) theo từng ngôn ngữ"""
+        counts = {}
+        for listing in self.listings.values():
+            for language in {track['language'] for track in listing.get('tracks') or []}:
+                counts[language] = counts.get(language, 0) + 1
+        return counts
+
+    def top_languages(self, limit: int = 8) -> list:
+        """Ngôn ngữ đang chọn và các ngôn ngữ phổ biến nhất trong tập video"""
+        counts = self.language_counts()
+        others = sorted((language for language in counts if language != self.language), key=lambda l: (-counts[l], l))
+        return [self.language] + others[:max(0, limit - 1)]
+
+    def matrix(self, languages: list = None) -> list:
+        """Ma trận ngôn ngữ x video: mỗi dòng một video, mỗi cột một ngôn ngữ"""
+        languages = languages or self.top_languages()
+        rows = []
+        for video in self.videos:
+            row = {'Video': video.get('title') or video['video_id']}
+            for language in languages:
+                row[language] = self.SYMBOLS[self.status(video['video_id'], language)]
+            rows.append(row)
+        return rows
+
+    def estimate_seconds(self, video_count: int = None, workers: int = None) -> float:
+        """
+        Ước lượng thời gian trích xuất các video dùng được, từ thời gian xử lý trung bình
+        (metric video.process_time) và tốc độ request hiện tại của RateLimiter.
+        Returns:
+            Số giây, None nếu chưa có số liệu thời gian xử lý
+        """
+        if video_count is None:
+            video_count = len(self.usable_ids())
+        workers = workers or int(os.environ.get('WORKER_THREADS', 4))
+        average = Metrics().get_average('video.process_time')
+        if average is None:
+            return None
+        # Mỗi video cần ít nhất 2 request (danh sách phụ đề + nội dung) qua RateLimiter dùng chung
+        rate_bound = video_count * 2 / RateLimiter().rate
+        return max(video_count * average / workers, rate_bound)
+
+
+class LanguageCoverageScanner:
+    """Quét trước danh sách phụ đề của nhiều video song song, không tải nội dung phụ đề"""
+
+    def __init__(self, transcript_extractor, max_workers: int = None):
+        self.transcript_extractor = transcript_extractor
+        self.error_handler = ErrorHandler()
+        self.metrics = Metrics()
+        self.max_workers = max_workers or int(os.environ.get('WORKER_THREADS', 4))
+
+    def scan(self, videos: list, language: str, control=None, on_progress=None, user_id: str = None) -> CoverageReport:
+        """
+        Lấy danh sách phụ đề của từng video (có cache)
+        Args:
+            on_progress: Hàm (completed, total) được gọi từ luồng gọi scan
+            user_id: Người dùng được tính lượt tải trên FetchScheduler
+        """
+        unique_videos = list({video['video_id']: video for video in videos}.values())
+        listings = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='coverage-scan') as executor:
+            futures = {
+                executor.submit(self.transcript_extractor.list_tracks, video['video_id'], control, user_id): video
+                for video in unique_videos
+            }
+            for completed, future in enumerate(as_completed(futures), 1):
+                listings[futures[future]['video_id']] = future.result()
+                if on_progress:
+                    on_progress(completed, len(futures))
+
+        report = CoverageReport(language, unique_videos, listings)
+        usable = len(report.usable_ids())
+        self.metrics.increment('coverage.scanned', len(unique_videos))
+        self.error_handler.log_info(
+            f"Quét phụ đề {language}: {usable}/{len(unique_videos)} video có thể trích xuất"
+        )
+        return report
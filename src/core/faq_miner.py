@@ -0,0 +1,359 @@
+import hashlib
+import os
+import re
+import time
+from datetime import datetime
+from ..utils.error_handler import ErrorHandler
+from ..utils.metrics import Metrics
+
+try:
+    import numpy as np
+except ImportError:  # numpy là phụ thuộc tùy chọn, chỉ cần khi phân tích FAQ
+    np = None
+
+try:
+    import scipy.sparse as sparse
+except ImportError:  # scipy là phụ thuộc tùy chọn, chỉ cần khi phân tích FAQ
+    sparse = None
+
+ANALYSIS_VERSION = 1
+
+_STOPWORDS = frozenset("""
+a an and are as at be been but by can could did do does for from had has have he her his how i if in into is it
+its just like me my no not of on or our so that the their them then there these they this to was we were what
+when where which who why will with would you your yeah okay oh um uh gonna wanna got get really very also
+và là của có không được cho những các một này đó thì mà với để khi trong đã sẽ đang như người chúng ta tôi bạn
+anh chị em nó họ thế nào gì sao rồi lại ra vào nữa cũng thôi nhé nhỉ ạ à ừ vâng ở từ đến bị bởi vì nên nếu
+""".split())
+
+# Câu hỏi tiếng Anh thường bắt đầu bằng các từ này (phụ đề tự động thường không có dấu '?')
+_QUESTION_STARTS = frozenset(
+    "what why how when where who whom whose which can could do does did is are was were should would will "
+    "have has anyone".split()
+)
+_VI_QUESTION_PHRASES = ('tại sao', 'vì sao', 'làm sao', 'thế nào', 'bao nhiêu', 'khi nào', 'là gì', 'có phải')
+_VI_QUESTION_ENDINGS = ('không', 'chưa', 'nhỉ', 'hả')
+
+_SENTENCE_END = re.compile(r'[.?!…]["\')\]]*$')
+_WORD = re.compile(r'\w+')
+
+
+def _tokens(text: str) -> list:
+    return [token for token in _WORD.findall(text.lower()) if not token.isdigit()]
+
+
+def extract_terms(text: str) -> list:
+    """Các từ (unigram) và cụm hai từ (bigram) không chứa stopword"""
+    tokens = _tokens(text)
+    keep = [len(token) > 1 and token not in _STOPWORDS for token in tokens]
+    terms = [token for token, kept in zip(tokens, keep) if kept]
+    terms.extend(
+        f"{tokens[i]} {tokens[i + 1]}" for i in range(len(tokens) - 1) if keep[i] and keep[i + 1]
+    )
+    return terms
+
+
+def is_question(text: str) -> bool:
+    """Nhận diện câu có dạng câu hỏi (dấu '?', từ để hỏi tiếng Anh hoặc tiếng Việt)"""
+    stripped = text.strip()
+    if stripped.endswith('?'):
+        return True
+    tokens = _tokens(stripped)
+    if not tokens:
+        return False
+    lowered = ' '.join(tokens)
+    return (tokens[0] in _QUESTION_STARTS
+            or any(phrase in lowered for phrase in _VI_QUESTION_PHRASES)
+            or tokens[-1] in _VI_QUESTION_ENDINGS)
+
+
+def split_sentences(transcript: list, max_segments: int = 3) -> list:
+    """
+    Ghép các segment liên tiếp thành câu (kết thúc bằng dấu câu hoặc tối đa max_segments segment)
+    Returns:
+        Danh sách (start, text) với start là thời điểm của segment đầu tiên
+    """
+    sentences = []
+    parts, start = [], None
+    for entry in transcript:
+        text = ' '.join(entry.get('text', '').split())
+        if not text:
+            continue
+        if parts and (text[0].isupper() or _tokens(text)[:1] and _tokens(text)[0] in _QUESTION_STARTS):
+            # Phụ đề không có dấu câu: segment mở đầu bằng chữ hoa hoặc từ để hỏi là câu mới
+            sentences.append((start, ' '.join(parts)))
+            parts, start = [], None
+        if start is None:
+            start = float(entry.get('start', 0.0))
+        parts.append(text)
+        if _SENTENCE_END.search(text) or len(parts) >= max_segments:
+            sentences.append((start, ' '.join(parts)))
+            parts, start = [], None
+    if parts:
+        sentences.append((start, ' '.join(parts)))
+    return sentences
+
+
+def format_timestamp(seconds: float) -> str:
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    if hours:
+        return f"{hours}:{rest // 60:02d}:{rest % 60:02d}"
+    return f"{rest // 60:02d}:{rest % 60:02d}"
+
+
+class FaqMiner:
+    """
+    Phân tích FAQ/từ khóa cho toàn bộ playlist, chạy offline trên CPU:
+        1. Mỗi transcript (object) được tách câu, lọc câu hỏi và đếm từ khóa một lần;
+           kết quả cache theo content hash nên lần chạy sau chỉ xử lý video mới/đổi nội dung
+        2. TF-IDF được tính một lượt cho cả playlist trên ma trận thưa (dạng COO, numpy)
+        3. Các câu hỏi gần giống nhau (cosine TF-IDF >= similarity) được gom thành một mục FAQ
+    Kết quả cả playlist được cache theo hash manifest (danh sách video + content hash).
+    """
+    CACHE_PREFIX = f"faq/v{ANALYSIS_VERSION}"
+
+    def __init__(self, data_storage, similarity: float = None, top_keyphrases: int = None):
+        if np is None or sparse is None:
+            raise ImportError("Phân tích FAQ cần thư viện numpy và scipy (pip install numpy scipy)")
+        self.data_storage = data_storage
+        self.error_handler = ErrorHandler()
+        self.metrics = Metrics()
+        self.similarity = similarity or float(os.environ.get('FAQ_SIMILARITY', 0.8))
+        self.top_keyphrases = top_keyphrases or int(os.environ.get('FAQ_TOP_KEYPHRASES', 20))
+
+    def _object_cache_key(self, content_hash: str) -> str:
+        return f"{self.CACHE_PREFIX}/objects/{content_hash}"
+
+    def _playlist_cache_key(self, playlist_id: str) -> str:
+        return f"{self.CACHE_PREFIX}/playlists/{playlist_id}"
+
+    def _manifest(self, playlist_id: str) -> list:
+        """
+        Các video dùng để phân tích: mỗi nội dung (content_hash) một lần, bỏ qua video gần trùng
+        (reupload làm số lần xuất hiện của câu hỏi bị đếm lặp); gồm cả transcript lưu theo cấu trúc cũ
+        """
+        manifest = {}
+        for ref in self.data_storage.get_playlist_refs(playlist_id, include_legacy=True):
+            if ((ref.get('object') or ref.get('legacy_key')) and not ref.get('near_duplicate_of')
+                    and ref['content_hash'] not in manifest):
+                manifest[ref['content_hash']] = ref
+        return sorted(manifest.values(), key=lambda ref: ref['video_id'])
+
+    def manifest_hash(self, manifest: list) -> str:
+        digest = hashlib.sha256(
+            f"v{ANALYSIS_VERSION}|{self.similarity}|{self.top_keyphrases}".encode('utf-8')
+        )
+        for ref in manifest:
+            digest.update(f"\n{ref['video_id']}:{ref['content_hash']}:{ref.get('title', '')}".encode('utf-8'))
+        return digest.hexdigest()
+
+    def mine(self, playlist_id: str, force: bool = False) -> dict:
+        """
+        Phân tích FAQ của playlist, dùng lại kết quả cache nếu manifest không đổi
+        Args:
+            force: Bỏ qua cache kết quả của playlist (cache từng transcript vẫn được dùng)
+        """
+        manifest = self._manifest(playlist_id)
+        manifest_hash = self.manifest_hash(manifest)
+        cached = self.data_storage.load_analysis(self._playlist_cache_key(playlist_id))
+        if not force and cached and cached.get('manifest_hash') == manifest_hash:
+            self.metrics.increment('faq.cache_hits')
+            self.error_handler.log_info(f"Dùng kết quả FAQ đã cache cho playlist {playlist_id}")
+            return cached
+
+        started = time.time()
+        documents = [self._analyze_object(ref) for ref in manifest]
+        result = self._build_result(manifest, documents)
+        result.update({
+            'playlist_id': playlist_id,
+            'manifest_hash': manifest_hash,
+            'generated_at': datetime.now().isoformat()
+        })
+        self.data_storage.save_analysis(self._playlist_cache_key(playlist_id), result)
+        self.metrics.observe('faq.mine_time', time.time() - started)
+        self.error_handler.log_info(
+            f"Phân tích FAQ playlist {playlist_id}: {len(result['faq'])} mục từ "
+            f"{result['question_count']} câu hỏi trong {len(manifest)} video ({time.time() - started:.1f}s)"
+        )
+        return result
+
+    def _analyze_object(self, ref: dict) -> dict:
+        """Câu hỏi và số lần xuất hiện từ khóa của một transcript (cache theo content hash)"""
+        cache_key = self._object_cache_key(ref['content_hash'])
+        document = self.data_storage.load_analysis(cache_key)
+        if document is not None:
+            return document
+
+        transcript = self.data_storage.load_transcript(ref)['transcript']
+        counts, questions = {}, []
+        # Tách theo câu để cụm hai từ không nối qua ranh giới câu
+        for start, text in split_sentences(transcript):
+            terms = extract_terms(text)
+            for term in terms:
+                counts[term] = counts.get(term, 0) + 1
+            if is_question(text) and 3 <= len(_tokens(text)) <= 30:
+                questions.append({'start': start, 'text': text, 'terms': terms})
+        document = {'terms': counts, 'questions': questions}
+        self.data_storage.save_analysis(cache_key, document)
+        self.metrics.increment('faq.objects_analyzed')
+        return document
+
+    def _build_result(self, manifest: list, documents: list) -> dict:
+        vocabulary = {}
+        rows, cols, counts = [], [], []
+        for row, document in enumerate(documents):
+            for term, count in document['terms'].items():
+                rows.append(row)
+                cols.append(vocabulary.setdefault(term, len(vocabulary)))
+                counts.append(count)
+        terms = list(vocabulary)
+        result = {'video_count': len(documents), 'question_count': 0, 'keyphrases': [], 'videos': {}, 'faq': []}
+        if not terms:
+            return result
+
+        rows = np.asarray(rows, dtype=np.int64)
+        cols = np.asarray(cols, dtype=np.int64)
+        document_count = len(documents)
+        document_frequency = np.bincount(cols, minlength=len(terms))
+        idf = np.log((1 + document_count) / (1 + document_frequency)) + 1
+        weights = self._normalize(rows, (1 + np.log(np.asarray(counts, dtype=np.float64))) * idf[cols],
+                                  document_count)
+
+        # Từ khóa của cả playlist: trung bình TF-IDF (đã chuẩn hóa) trên mọi video
+        scores = np.bincount(cols, weights=weights, minlength=len(terms)) / document_count
+        is_unigram = np.fromiter((' ' not in term for term in terms), dtype=bool, count=len(terms))
+        candidates = np.argpartition(-scores, min(3 * self.top_keyphrases, len(terms)) - 1)[:3 * self.top_keyphrases]
+        # Cùng điểm thì ưu tiên cụm hai từ
+        candidates = candidates[np.lexsort((is_unigram[candidates], -scores[candidates]))]
+        result['keyphrases'] = [
+            {'phrase': terms[index], 'score': round(float(scores[index]), 4),
+             'video_count': int(document_frequency[index])}
+            for index in self._select_phrases(candidates.tolist(), terms, self.top_keyphrases)
+        ]
+
+        # Từ khóa từng video: sắp xếp theo (video, -trọng số) rồi lấy các phần tử đầu mỗi nhóm
+        order = np.lexsort((is_unigram[cols], -weights, rows))
+        sorted_rows = rows[order]
+        rank = np.arange(len(order)) - np.searchsorted(sorted_rows, sorted_rows)
+        per_video = {}
+        for row, col in zip(sorted_rows[rank < 15].tolist(), cols[order][rank < 15].tolist()):
+            per_video.setdefault(row, []).append(col)
+        for row, ref in enumerate(manifest):
+            result['videos'][ref['video_id']] = {
+                'title': ref.get('title'),
+                'keyphrases': [terms[col] for col in self._select_phrases(per_video.get(row, []), terms, 5)]
+            }
+
+        result['faq'], result['question_count'] = self._cluster_questions(manifest, documents, vocabulary, idf)
+        return result
+
+    @staticmethod
+    def _normalize(rows, weights, row_count: int):
+        """Chuẩn hóa L2 từng dòng của ma trận thưa dạng COO"""
+        norms = np.sqrt(np.bincount(rows, weights=weights * weights, minlength=row_count))
+        norms[norms == 0] = 1
+        return weights / norms[rows]
+
+    @staticmethod
+    def _select_phrases(candidates: list, terms: list, limit: int) -> list:
+        """Chọn từ khóa theo thứ tự ứng viên, bỏ từ đơn đã nằm trong một cụm hai từ được chọn trước"""
+        selected, covered = [], set()
+        for index in candidates:
+            if ' ' in terms[index]:
+                covered.update(terms[index].split())
+            elif terms[index] in covered:
+                continue
+            selected.append(index)
+            if len(selected) >= limit:
+                break
+        return selected
+
+    def _cluster_questions(self, manifest: list, documents: list, vocabulary: dict, idf) -> tuple:
+        """Gom các câu hỏi gần giống nhau; mỗi cụm là một mục FAQ kèm nguồn (video, thời điểm)"""
+        questions, rows, cols, counts = [], [], [], []
+        for ref, document in zip(manifest, documents):
+            for question in document['questions']:
+                term_counts = {}
+                for term in question['terms']:
+                    if term in vocabulary:
+                        term_counts[vocabulary[term]] = term_counts.get(vocabulary[term], 0) + 1
+                if not term_counts:
+                    # Câu hỏi chỉ gồm stopword ("what is it?") không mang thông tin
+                    continue
+                for col, count in term_counts.items():
+                    rows.append(len(questions))
+                    cols.append(col)
+                    counts.append(count)
+                questions.append((ref, question))
+        if not questions:
+            return [], 0
+
+        rows = np.asarray(rows, dtype=np.int64)
+        cols = np.asarray(cols, dtype=np.int64)
+        weights = self._normalize(rows, (1 + np.log(np.asarray(counts, dtype=np.float64))) * idf[cols], len(questions))
+        parent = list(range(len(questions)))
+
+        def find(index):
+            while parent[index] != index:
+                parent[index] = parent[parent[index]]
+                index = parent[index]
+            return index
+
+        for first, second in self._similar_pairs(rows, cols, weights, len(questions)):
+            root_first, root_second = find(first), find(second)
+            if root_first != root_second:
+                parent[max(root_first, root_second)] = min(root_first, root_second)
+
+        clusters = {}
+        for index in range(len(questions)):
+            clusters.setdefault(find(index), []).append(index)
+
+        # Trọng số của từng câu hỏi theo từ khóa: dùng để xếp hạng và chọn từ khóa của mục FAQ
+        question_terms = {}
+        for row, col, weight in zip(rows.tolist(), cols.tolist(), weights.tolist()):
+            question_terms.setdefault(row, []).append((weight, col))
+        terms = list(vocabulary)
+
+        entries = []
+        for members in clusters.values():
+            # Cách diễn đạt phổ biến nhất (rồi ngắn nhất) làm câu hỏi đại diện
+            variants = {}
+            for index in members:
+                text = questions[index][1]['text']
+                variant = variants.setdefault(text.lower(), [0, text, index])
+                variant[0] += 1
+            ranked_variants = sorted(variants.values(), key=lambda item: (-item[0], len(item[1])))
+            top_terms = sorted(question_terms[ranked_variants[0][2]], reverse=True)[:3]
+            sources = sorted(
+                ({'video_id': questions[index][0]['video_id'],
+                  'title': questions[index][0].get('title'),
+                  'start': questions[index][1]['start'],
+                  'timestamp': format_timestamp(questions[index][1]['start']),
+                  'url': f"https://www.youtube.com/watch?v={questions[index][0]['video_id']}"
+                         f"&t={int(questions[index][1]['start'])}s"}
+                 for index in members),
+                key=lambda source: (source['video_id'], source['start'])
+            )
+            entries.append({
+                'question': ranked_variants[0][1],
+                'variants': [text for _, text, _ in ranked_variants[1:6]],
+                'occurrences': len(members),
+                'video_count': len({source['video_id'] for source in sources}),
+                'keyphrases': [terms[col] for _, col in top_terms],
+                'score': round(float(sum(idf[col] for _, col in top_terms)), 4),
+                'sources': sources
+            })
+        # Câu hỏi xuất hiện ở nhiều video nhất đứng đầu, sau đó theo độ đặc trưng của từ khóa
+        entries.sort(key=lambda entry: (-entry['video_count'], -entry['occurrences'], -entry['score']))
+        return entries, len(questions)
+
+    def _similar_pairs(self, rows, cols, weights, count: int):
+        """
+        Các cặp câu hỏi (i < j) có cosine TF-IDF >= similarity.
+        Nhân ma trận thưa chỉ sinh các cặp có chung ít nhất một từ, không duyệt mọi cặp câu hỏi
+        """
+        matrix = sparse.csr_matrix((weights, (rows, cols)), shape=(count, int(cols.max()) + 1))
+        similar = sparse.triu(matrix @ matrix.T, k=1).tocoo()
+        mask = similar.data >= self.similarity - 1e-9
+        return zip(similar.row[mask].tolist(), similar.col[mask].tolist())
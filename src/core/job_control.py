@@ -0,0 +1,58 @@
+import os
+import threading
+import time
+from .retry import FailureReason
+
+
+class JobControl:
+    """
+    Điều khiển một job: hủy hợp tác (cooperative cancellation) và ngân sách thời gian tổng.
+    Các worker kiểm tra stop_reason giữa các video; video đang tải dở vẫn chạy xong
+    (thời gian bị giới hạn bởi timeout của từng request).
+    """
+
+    def __init__(self, budget_seconds: float = None):
+        self.budget_seconds = budget_seconds
+        self.deadline = time.monotonic() + budget_seconds if budget_seconds else None
+        self._cancel_event = threading.Event()
+        self._reason = None
+
+    @classmethod
+    def from_env(cls):
+        """Tạo JobControl với ngân sách thời gian từ biến môi trường JOB_DEADLINE_SECONDS (0 = không giới hạn)"""
+        budget = float(os.environ.get('JOB_DEADLINE_SECONDS', 0))
+        return cls(budget if budget > 0 else None)
+
+    def cancel(self, reason: str = FailureReason.CANCELLED):
+        """Yêu cầu dừng job (gọi được từ bất kỳ luồng nào)"""
+        if not self._cancel_event.is_set():
+            self._reason = reason
+            self._cancel_event.set()
+
+    def remaining(self) -> float:
+        """Số giây còn lại của ngân sách, None nếu không giới hạn"""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    @property
+    def stop_reason(self) -> str:
+        """Lý do dừng (cancelled / deadline_exceeded), None nếu job vẫn được chạy tiếp"""
+        if self._cancel_event.is_set():
+            return self._reason
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            return FailureReason.DEADLINE_EXCEEDED
+        return None
+
+    def wait(self, seconds: float) -> bool:
+        """
+        Chờ tối đa seconds giây, kết thúc sớm nếu job bị hủy hoặc hết ngân sách
+        Returns:
+            True nếu job cần dừng
+        """
+        remaining = self.remaining()
+        if remaining is not None and remaining < seconds:
+            self._cancel_event.wait(remaining)
+            return True
+        self._cancel_event.wait(seconds)
+        return self.stop_reason is not None
@@ -0,0 +1,164 @@
+import copy
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from ..utils.error_handler import ErrorHandler
+from ..utils.metrics import Metrics
+
+
+class MetadataCache:
+    """
+    Cache thông tin playlist/video lấy từ yt-dlp, dùng chung cho cả process.
+    - Còn hạn (TTL): trả về ngay.
+    - Quá hạn nhưng chưa quá max_stale: trả về bản cũ và làm mới trong nền
+      (stale-while-revalidate).
+    - Quá max_stale hoặc chưa có: tải đồng bộ.
+    Dữ liệu được giữ trong bộ nhớ (LRU) và có thể lưu xuống đĩa để dùng lại sau khi khởi động lại.
+    """
+    _instance = None
+    _initialized = False
+
+    # TTL (giây) theo loại dữ liệu
+    DEFAULT_TTLS = {
+        'playlist': 3600,
+        'playlist_videos': 600,
+        'video': 24 * 3600,
+        'tracks': 24 * 3600
+    }
+
+    def __new__(cls):
+        # Singleton pattern - các phiên người dùng dùng chung một cache
+        if cls._instance is None:
+            cls._instance = super(MetadataCache, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if not MetadataCache._initialized:
+            self.error_handler = ErrorHandler()
+            self.metrics = Metrics()
+            self.ttls = dict(self.DEFAULT_TTLS)
+            self.stale_factor = 4         # dùng bản cũ tối đa ttl * stale_factor giây
+            self.max_entries = int(os.environ.get('METADATA_CACHE_SIZE', 10000))
+            self.persist = os.environ.get('METADATA_CACHE_BACKEND', 'disk') == 'disk'
+            self.cache_dir = os.path.join(os.path.dirname(__file__), '..', 'data', 'cache', 'metadata')
+
+            self._entries = OrderedDict()
+            self._refreshing = set()
+            self._lock = threading.Lock()
+            MetadataCache._initialized = True
+
+    def _get_ttl(self, kind: str) -> float:
+        return self.ttls.get(kind, 3600)
+
+    def _disk_path(self, kind: str, key: str) -> str:
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, kind, f"{digest}.json")
+
+    def _read_disk(self, kind: str, key: str) -> dict:
+        if not self.persist:
+            return None
+        path = self._disk_path(kind, key)
+        try:
+            if os.path.exists(path):
+                with open(path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+        except Exception as e:
+            self.error_handler.log_warning(f"Không đọc được metadata cache {path}: {str(e)}")
+        return None
+
+    def _write_disk(self, kind: str, key: str, entry: dict):
+        if not self.persist:
+            return
+        path = self._disk_path(kind, key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            self.error_handler.log_warning(f"Không ghi được metadata cache {path}: {str(e)}")
+
+    def _lookup(self, kind: str, key: str) -> dict:
+        """Tìm entry trong bộ nhớ, nếu không có thì đọc từ đĩa"""
+        cache_key = (kind, key)
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is not None:
+                self._entries.move_to_end(cache_key)
+                return entry
+
+        entry = self._read_disk(kind, key)
+        if entry is not None:
+            self._store_memory(kind, key, entry)
+        return entry
+
+    def _store_memory(self, kind: str, key: str, entry: dict):
+        with self._lock:
+            self._entries[(kind, key)] = entry
+            self._entries.move_to_end((kind, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def put(self, kind: str, key: str, value):
+        """Lưu giá trị vào cache"""
+        entry = {'value': value, 'fetched_at': time.time()}
+        self._store_memory(kind, key, entry)
+        self._write_disk(kind, key, entry)
+
+    def peek(self, kind: str, key: str):
+        """Lấy giá trị đã cache (kể cả đã cũ) mà không tải lại, None nếu chưa có"""
+        entry = self._lookup(kind, key)
+        return copy.deepcopy(entry['value']) if entry else None
+
+    def _fetch_and_store(self, kind: str, key: str, fetch_fn):
+        value = fetch_fn()
+        if value:
+            # Không cache kết quả lỗi (None/rỗng) để lần sau tải lại
+            self.put(kind, key, value)
+        return value
+
+    def _refresh_in_background(self, kind: str, key: str, fetch_fn):
+        """Làm mới entry trong luồng nền, mỗi khóa chỉ một luồng cùng lúc"""
+        with self._lock:
+            if (kind, key) in self._refreshing:
+                return
+            self._refreshing.add((kind, key))
+
+        def run():
+            try:
+                self._fetch_and_store(kind, key, fetch_fn)
+                self.metrics.increment('metadata_cache.refreshes')
+            except Exception as e:
+                self.error_handler.log_warning(f"Làm mới metadata cache thất bại ({kind}:{key}): {str(e)}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard((kind, key))
+
+        threading.Thread(target=run, name=f'metadata-refresh-{kind}', daemon=True).start()
+
+    def get_or_fetch(self, kind: str, key: str, fetch_fn):
+        """
+        Lấy giá trị từ cache hoặc gọi fetch_fn để tải
+        Args:
+            kind: Loại dữ liệu ('playlist', 'playlist_videos', 'video'...)
+            key: Khóa (vd: playlist ID, video ID)
+            fetch_fn: Hàm không tham số trả về giá trị mới (None nếu lỗi)
+        """
+        entry = self._lookup(kind, key)
+        if entry is not None:
+            age = time.time() - entry['fetched_at']
+            ttl = self._get_ttl(kind)
+            if age < ttl:
+                self.metrics.increment('metadata_cache.hits')
+                return copy.deepcopy(entry['value'])
+            if age < ttl * self.stale_factor:
+                self.metrics.increment('metadata_cache.stale_hits')
+                self._refresh_in_background(kind, key, fetch_fn)
+                return copy.deepcopy(entry['value'])
+
+        self.metrics.increment('metadata_cache.misses')
+        return copy.deepcopy(self._fetch_and_store(kind, key, fetch_fn))
@@ -0,0 +1,230 @@
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import zlib
+from ..utils.error_handler import ErrorHandler
+
+try:
+    import numpy as np
+except ImportError:  # numpy là phụ thuộc tùy chọn, thiếu thì tính chữ ký bằng Python thuần (chậm hơn)
+    np = None
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+# Số shingle xử lý mỗi lượt khi tính bằng numpy (giới hạn bộ nhớ tạm: chunk x num_perm x 8 byte)
+_SIGNATURE_CHUNK = 4096
+
+
+class MinHasher:
+    """Tính chữ ký MinHash từ nội dung transcript (shingle theo từ)"""
+
+    def __init__(self, num_perm: int = 64, shingle_size: int = 5, seed: int = 1):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        # Các hàm hash dạng (a * x + b) mod p, cố định theo seed để chữ ký ổn định giữa các lần chạy
+        rng = random.Random(seed)
+        self.permutations = [
+            (rng.randint(1, _MERSENNE_PRIME - 1), rng.randint(0, _MERSENNE_PRIME - 1))
+            for _ in range(num_perm)
+        ]
+        if np is not None:
+            a = np.array([a for a, _ in self.permutations], dtype=np.uint64)
+            self._a_hi = a >> np.uint64(32)
+            self._a_lo = a & np.uint64(_MAX_HASH)
+            self._b = np.array([b for _, b in self.permutations], dtype=np.uint64)
+
+    def _shingles(self, text: str) -> set:
+        words = re.findall(r'\w+', text.lower())
+        if len(words) < self.shingle_size:
+            return {' '.join(words)} if words else set()
+        return {
+            ' '.join(words[i:i + self.shingle_size])
+            for i in range(len(words) - self.shingle_size + 1)
+        }
+
+    def signature(self, text: str) -> list:
+        """Chữ ký MinHash gồm num_perm giá trị"""
+        hashes = [zlib.crc32(shingle.encode('utf-8')) for shingle in self._shingles(text)]
+        if not hashes:
+            return [_MAX_HASH] * self.num_perm
+        if np is not None:
+            return self._signature_numpy(hashes)
+        return [
+            min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+            for a, b in self.permutations
+        ]
+
+    def _signature_numpy(self, hashes: list) -> list:
+        """
+        Cùng kết quả với cách tính thuần Python nhưng tính (a * h + b) mod p cho mọi shingle và
+        hoán vị cùng lúc. a * h có thể tới 2^93 nên được tách để mọi phép tính nằm trong uint64:
+        a = a_hi * 2^32 + a_lo, và vì 2^61 ≡ 1 (mod p) nên x * 2^32 ≡ (x >> 29) + ((x & (2^29 - 1)) << 32).
+        """
+        prime = np.uint64(_MERSENNE_PRIME)
+        shift_61 = np.uint64(61)
+        signature = np.full(self.num_perm, _MAX_HASH, dtype=np.uint64)
+        values = np.array(hashes, dtype=np.uint64)
+        for start in range(0, len(values), _SIGNATURE_CHUNK):
+            h = values[start:start + _SIGNATURE_CHUNK, None]
+            high = self._a_hi * h  # < 2^61
+            high = (high >> np.uint64(29)) + ((high & np.uint64((1 << 29) - 1)) << np.uint64(32))
+            low = self._a_lo * h  # < 2^64
+            low = (low >> shift_61) + (low & prime)
+            total = high + low + self._b  # < 2^63
+            total = (total >> shift_61) + (total & prime)
+            total = np.where(total >= prime, total - prime, total)
+            np.minimum(signature, (total & np.uint64(_MAX_HASH)).min(axis=0), out=signature)
+        return [int(value) for value in signature]
+
+    @staticmethod
+    def similarity(signature_a: list, signature_b: list) -> float:
+        """Ước lượng độ tương đồng Jaccard từ hai chữ ký"""
+        matches = sum(1 for a, b in zip(signature_a, signature_b) if a == b)
+        return matches / len(signature_a)
+
+
+def transcript_text(transcript: list) -> str:
+    """Ghép nội dung các segment thành một đoạn văn bản"""
+    return ' '.join(entry.get('text', '') for entry in transcript)
+
+
+class NearDuplicateIndex:
+    """
+    Chỉ mục LSH trên chữ ký MinHash của toàn bộ transcript đã lưu.
+    Truy vấn chỉ so sánh với các transcript rơi vào cùng bucket (không quét toàn bộ kho).
+    Chữ ký được ghi nối tiếp vào log index/minhash trên backend lưu trữ (file JSONL trên đĩa
+    cục bộ, mỗi chữ ký một object trên S3), nạp vào bộ nhớ khi khởi động và đọc tiếp trước mỗi lần
+    kiểm tra để thấy chữ ký do process/node khác ghi.
+    """
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    def __new__(cls, backend):
+        # Một chỉ mục dùng chung cho mọi DataStorage cùng trỏ tới một kho lưu trữ trong process
+        with cls._instances_lock:
+            instance = cls._instances.get(backend.location)
+            if instance is None:
+                instance = super(NearDuplicateIndex, cls).__new__(cls)
+                instance._initialized = False
+                cls._instances[backend.location] = instance
+        return instance
+
+    def __init__(self, backend):
+        if not self._initialized:
+            self.error_handler = ErrorHandler()
+            self.backend = backend
+            self.bands = 8
+            self.rows = 8
+            self.hasher = MinHasher(num_perm=self.bands * self.rows)
+            self.threshold = float(os.environ.get('NEAR_DUPLICATE_THRESHOLD', 0.8))
+            self.index_log = 'index/minhash'
+
+            self._lock = threading.Lock()
+            self._entries = {}
+            self._buckets = {}
+            # Vị trí đã đọc tới trong log (xem StorageBackend.read_new_records)
+            self._cursor = None
+            self.refresh()
+            if self._entries:
+                self.error_handler.log_info(f"Đã nạp {len(self._entries)} chữ ký MinHash")
+            self._initialized = True
+
+    def _band_keys(self, signature: list) -> list:
+        keys = []
+        for band in range(self.bands):
+            chunk = signature[band * self.rows:(band + 1) * self.rows]
+            digest = hashlib.md5(','.join(map(str, chunk)).encode('ascii')).hexdigest()[:16]
+            keys.append(f"{band}:{digest}")
+        return keys
+
+    def _insert(self, entry: dict):
+        """Thêm entry vào bộ nhớ (gọi khi đang giữ lock)"""
+        if entry['id'] in self._entries:
+            return
+        # Thứ tự thêm vào chỉ mục: bản xuất hiện trước được coi là bản gốc
+        entry.setdefault('seq', len(self._entries))
+        self._entries[entry['id']] = entry
+        for key in self._band_keys(entry['signature']):
+            self._buckets.setdefault(key, []).append(entry['id'])
+
+    def refresh(self):
+        """Nạp các chữ ký được ghi thêm vào log kể từ lần đọc trước (kể cả của process/node khác)"""
+        with self._lock:
+            try:
+                lines, self._cursor = self.backend.read_new_records(self.index_log, self._cursor)
+                for line in lines:
+                    self._insert(json.loads(line))
+            except Exception as e:
+                self.error_handler.log_error("MinHash Index Load Error", str(e), {"location": self.backend.location})
+
+    def compute_signature(self, transcript: list) -> list:
+        return self.hasher.signature(transcript_text(transcript))
+
+    def find_similar(self, signature: list, exclude_video_id: str = None, before_seq: int = None) -> list:
+        """
+        Tìm các transcript gần trùng với chữ ký
+        Args:
+            signature: Chữ ký MinHash cần so sánh
+            exclude_video_id: Bỏ qua các bản của chính video này
+            before_seq: Chỉ xét các transcript được thêm vào chỉ mục trước thứ tự này
+        Returns:
+            Danh sách (similarity, entry) sắp xếp giảm dần theo độ tương đồng
+        """
+        with self._lock:
+            candidates = set()
+            for key in self._band_keys(signature):
+                candidates.update(self._buckets.get(key, []))
+            entries = [self._entries[entry_id] for entry_id in candidates]
+
+        matches = []
+        for entry in entries:
+            if exclude_video_id and entry['video_id'] == exclude_video_id:
+                continue
+            if before_seq is not None and entry['seq'] >= before_seq:
+                continue
+            similarity = self.hasher.similarity(signature, entry['signature'])
+            if similarity >= self.threshold:
+                matches.append((similarity, entry))
+        matches.sort(key=lambda match: -match[0])
+        return matches
+
+    def add(self, entry_id: str, video_id: str, language: str, signature: list) -> dict:
+        """Thêm chữ ký vào chỉ mục (nếu đã có thì trả về entry cũ)"""
+        entry = {'id': entry_id, 'video_id': video_id, 'language': language, 'signature': signature}
+        with self._lock:
+            if entry_id in self._entries:
+                return self._entries[entry_id]
+            self._insert(entry)
+            try:
+                self.backend.append_record(self.index_log, json.dumps(entry))
+            except Exception as e:
+                self.error_handler.log_error("MinHash Index Write Error", str(e), {"video_id": video_id})
+            return entry
+
+    def get(self, entry_id: str) -> dict:
+        with self._lock:
+            return self._entries.get(entry_id)
+
+    def check(self, entry_id: str, video_id: str, language: str, transcript: list) -> dict:
+        """
+        Đăng ký transcript vào chỉ mục và kiểm tra có gần trùng với transcript đã có không
+        Returns:
+            {'video_id', 'object', 'similarity'} của bản gốc gần trùng nhất, hoặc None
+        """
+        self.refresh()
+        entry = self.get(entry_id)
+        if entry is None:
+            entry = self.add(entry_id, video_id, language, self.compute_signature(transcript))
+
+        matches = self.find_similar(entry['signature'], exclude_video_id=video_id, before_seq=entry['seq'])
+        if not matches:
+            return None
+        similarity, original = matches[0]
+        return {
+            'video_id': original['video_id'],
+            'object': original['id'],
+            'similarity': round(similarity, 3)
+        }
@@ -0,0 +1,80 @@
+import json
+import os
+import threading
+import time
+from ..utils.error_handler import ErrorHandler
+from .storage_backends import create_storage_backend
+
+
+class NegativeCache:
+    """
+    Cache lưu các video lỗi vĩnh viễn (không có phụ đề, tắt phụ đề...)
+    để không phải tải lại trong các lần chạy sau cho đến khi hết hạn TTL.
+    Mỗi mục là một bản ghi riêng negative_cache/<video_id>/<ngôn ngữ>.json trên StorageBackend
+    (cùng kho với DataStorage), nên nhiều process/node ghi đồng thời không ghi đè mục của nhau.
+    """
+    PREFIX = 'negative_cache'
+
+    def __init__(self, backend=None, ttl_seconds: int = 7 * 24 * 3600):
+        self.error_handler = ErrorHandler()
+        if backend is None:
+            backend = create_storage_backend(os.path.join(os.path.dirname(__file__), '..', 'data'))
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        # Các mục còn hạn đã đọc/ghi trong process này
+        self._entries = {}
+
+    def _key(self, video_id: str, language: str) -> str:
+        return f"{self.PREFIX}/{video_id}/{language}.json"
+
+    def _read(self, key: str) -> dict:
+        """Đọc một mục từ backend, None nếu không có hoặc lỗi"""
+        try:
+            data = self.backend.read_bytes(key)
+            return json.loads(data) if data else None
+        except Exception as e:
+            self.error_handler.log_error("Negative Cache Load Error", str(e), {"key": key})
+            return None
+
+    def get(self, video_id: str, language: str) -> str:
+        """Trả về loại lỗi đã cache, hoặc None nếu không có/đã hết hạn"""
+        key = self._key(video_id, language)
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            # Mục có thể do process/node khác ghi
+            entry = self._read(key)
+        if not entry or entry.get('expires_at', 0) <= time.time():
+            with self._lock:
+                self._entries.pop(key, None)
+            return None
+        with self._lock:
+            self._entries[key] = entry
+        return entry['reason']
+
+    def add(self, video_id: str, language: str, reason: str):
+        """Thêm video lỗi vĩnh viễn vào cache"""
+        now = time.time()
+        key = self._key(video_id, language)
+        entry = {
+            'reason': reason,
+            'created_at': now,
+            'expires_at': now + self.ttl_seconds
+        }
+        with self._lock:
+            self._entries[key] = entry
+        try:
+            self.backend.write_bytes(key, json.dumps(entry, ensure_ascii=False).encode('utf-8'))
+        except Exception as e:
+            self.error_handler.log_error("Negative Cache Save Error", str(e), {"key": key})
+
+    def remove(self, video_id: str, language: str):
+        """Xóa video khỏi cache (ví dụ khi tải lại thành công)"""
+        key = self._key(video_id, language)
+        with self._lock:
+            self._entries.pop(key, None)
+        try:
+            self.backend.delete(key)
+        except Exception as e:
+            self.error_handler.log_error("Negative Cache Save Error", str(e), {"key": key})
@@ -0,0 +1,66 @@
+import hashlib
+import json
+from ..utils.error_handler import ErrorHandler
+
+
+class TranscriptObjectStore:
+    """
+    Kho lưu trữ transcript theo nội dung (content-addressed).
+    Mỗi transcript chỉ được lưu một lần dưới khóa là hash của
+    (video_id, ngôn ngữ, nội dung transcript); playlist chỉ tham chiếu tới khóa này.
+    """
+
+    def __init__(self, backend):
+        self.error_handler = ErrorHandler()
+        self.backend = backend
+
+    @staticmethod
+    def compute_key(video_id: str, language: str, transcript: list) -> str:
+        """Tính khóa object từ video_id, ngôn ngữ và nội dung transcript"""
+        payload = json.dumps(
+            [video_id, language, transcript],
+            ensure_ascii=False,
+            sort_keys=True,
+            separators=(',', ':')
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _object_key(self, key: str) -> str:
+        """Khóa lưu trữ của object (chia thư mục theo 2 ký tự đầu của khóa)"""
+        return f"objects/{key[:2]}/{key}.json"
+
+    def exists(self, key: str) -> bool:
+        """Kiểm tra object đã tồn tại chưa"""
+        return self.backend.exists(self._object_key(key))
+
+    def put(self, transcript_data: dict) -> tuple:
+        """
+        Lưu transcript vào kho nếu chưa có
+        Returns:
+            (key, created): khóa object và cờ cho biết có ghi file mới hay không
+        """
+        video_id = transcript_data['video_id']
+        language = transcript_data['metadata']['language']
+        key = self.compute_key(video_id, language, transcript_data['transcript'])
+
+        if self.exists(key):
+            self.error_handler.log_debug(f"Object {key[:12]} đã tồn tại, bỏ qua ghi file")
+            return key, False
+
+        obj = {
+            'video_id': video_id,
+            'language': language,
+            'language_name': transcript_data['metadata'].get('language_name', language),
+            'transcript': transcript_data['transcript']
+        }
+        self.backend.write_bytes(self._object_key(key), json.dumps(obj, ensure_ascii=False).encode('utf-8'))
+
+        self.error_handler.log_debug(f"Đã lưu object {key[:12]} cho video {video_id}")
+        return key, True
+
+    def get(self, key: str) -> dict:
+        """Đọc object theo khóa"""
+        data = self.backend.read_bytes(self._object_key(key))
+        if data is None:
+            raise FileNotFoundError(f"Object {key} không tồn tại")
+        return json.loads(data)
@@ -0,0 +1,435 @@
+import os
+import time
+import uuid
+from datetime import datetime
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from ..utils.error_handler import ErrorHandler
+from ..utils.profiler import propagate_profiling
+from .job_control import JobControl
+from .progress import ProgressBus, ProgressEvent
+from .retry import FailureReason, classify_error
+from .scheduler import FetchScheduler
+
+
+class VideoResult:
+    """
+    Kết quả xử lý một video trong phạm vi một request: transcript đã tải được dùng lại
+    cho lưu trữ và nút tải xuống, nội dung text chỉ được tạo một lần.
+    """
+
+    def __init__(self, video: dict, transcript_data: dict, data_storage):
+        self.video = video
+        self.transcript_data = transcript_data
+        self._data_storage = data_storage
+        self._text = None
+
+    @property
+    def success(self) -> bool:
+        return self.video.get('status') == 'success'
+
+    @property
+    def title(self) -> str:
+        return self.video['title']
+
+    @property
+    def text(self) -> str:
+        if self._text is None and self.transcript_data:
+            self._text = self._data_storage.render_text(self.transcript_data)
+        return self._text
+
+    @property
+    def filename(self) -> str:
+        return self._data_storage.build_text_filename(self.title, self.video['video_id'])
+
+
+class TranscriptPipeline:
+    """
+    Luồng xử lý chính: tải transcript -> lưu trữ, không phụ thuộc giao diện.
+    Tiến trình được phát qua ProgressBus để UI (Streamlit, console) tự hiển thị.
+    """
+
+    def __init__(self, transcript_extractor, data_storage):
+        self.transcript_extractor = transcript_extractor
+        self.data_storage = data_storage
+        self.error_handler = ErrorHandler()
+        # Mọi lượt tải đều đi qua bộ điều phối chung (công bằng giữa người dùng, hạn mức)
+        self.scheduler = FetchScheduler()
+        # Số luồng tải transcript song song (tốc độ thực tế vẫn do RateLimiter điều tiết)
+        self.max_workers = int(os.environ.get('WORKER_THREADS', 4))
+
+    def process_video(self, video: dict, playlist_id: str, language: str, control: JobControl = None) -> bool:
+        """
+        Tải và lưu transcript cho một video
+        Cập nhật video['status'] và khi lỗi thì ghi video['error_type'], video['error']
+        """
+        return self.process_video_for_playlists(video, [playlist_id], language, control)
+
+    def process_single(self, video: dict, playlist_id: str, language: str, resolve_title=None,
+                       user_id: str = None) -> VideoResult:
+        """
+        Xử lý một video cho request tương tác: tải transcript một lần và trả về
+        VideoResult dùng chung cho lưu trữ và hiển thị
+        Args:
+            resolve_title: Hàm trả về tiêu đề video (vd: chờ metadata tải song song),
+                           được gọi sau khi tải xong transcript và trước khi lưu
+        """
+        transcript_data = self._fetch(video, language, user_id=user_id, priority=FetchScheduler.INTERACTIVE)
+        if transcript_data and resolve_title:
+            title = resolve_title()
+            if title:
+                video['title'] = transcript_data['title'] = title
+        if transcript_data and not self._store(video, [playlist_id], transcript_data):
+            transcript_data = None
+        return VideoResult(video, transcript_data, self.data_storage)
+
+    def process_video_for_playlists(self, video: dict, playlist_ids: list, language: str, control: JobControl = None,
+                                    user_id: str = None) -> bool:
+        """Tải transcript một lần và lưu tham chiếu vào tất cả playlist chứa video"""
+        transcript_data = self._fetch(video, language, control, user_id)
+        return bool(transcript_data) and self._store(video, playlist_ids, transcript_data)
+
+    def _fetch(self, video: dict, language: str, control: JobControl = None, user_id: str = None,
+               priority: int = FetchScheduler.BULK) -> dict:
+        """Tải transcript; khi lỗi thì ghi video['status'], video['error_type'], video['error']"""
+        try:
+            # Mỗi lần thử tải giữ một lượt của FetchScheduler (trả lại khi chờ thử lại)
+            transcript_data, failure_reason = self.transcript_extractor.fetch_transcript(
+                video['video_id'],
+                video['title'],
+                language,
+                control=control,
+                user_id=user_id,
+                priority=priority
+            )
+            if transcript_data:
+                return transcript_data
+            self._mark_failed(video, failure_reason, failure_reason)
+        except Exception as e:
+            self._mark_failed(video, classify_error(e), str(e))
+        return None
+
+    def _store(self, video: dict, playlist_ids: list, transcript_data: dict) -> bool:
+        """Lưu transcript vào tất cả playlist chứa video"""
+        try:
+            saved = True
+            for playlist_id in playlist_ids:
+                saved = self.data_storage.save_transcript(
+                    playlist_id,
+                    video['video_id'],
+                    video['title'],
+                    dict(transcript_data)
+                ) and saved
+        except Exception as e:
+            self._mark_failed(video, classify_error(e), str(e))
+            return False
+
+        if not saved:
+            self._mark_failed(video, 'storage_error', 'storage_error')
+            return False
+        video['status'] = 'success'
+        video.pop('error_type', None)
+        video.pop('error', None)
+        return True
+
+    @staticmethod
+    def _mark_failed(video: dict, error_type: str, error: str):
+        video['status'] = 'failed'
+        video['error_type'] = error_type
+        video['error'] = error
+
+    def build_work_set(self, playlists: list) -> tuple:
+        """
+        Gộp video của nhiều playlist thành tập công việc không trùng lặp
+        Args:
+            playlists: Danh sách dict {'playlist_id', 'videos'}
+        Returns:
+            (unique_videos, membership): danh sách video duy nhất theo thứ tự xuất hiện
+            và dict video_id -> danh sách playlist_id chứa video đó
+        """
+        unique_videos = []
+        membership = {}
+        for playlist in playlists:
+            for video in playlist['videos']:
+                video_id = video['video_id']
+                if video_id not in membership:
+                    membership[video_id] = []
+                    unique_videos.append(video)
+                if playlist['playlist_id'] not in membership[video_id]:
+                    membership[video_id].append(playlist['playlist_id'])
+        return unique_videos, membership
+
+    def run(self, videos: list, playlist_id: str, language: str, bus: ProgressBus = None, job_id: str = None,
+            control: JobControl = None, user_id: str = None) -> dict:
+        """
+        Xử lý danh sách video của một playlist và phát sự kiện tiến trình
+        Returns:
+            dict gồm success_count, failed_count, failed_videos
+        """
+        return self.run_batch([{'playlist_id': playlist_id, 'videos': videos}], language, bus, job_id, control, user_id)
+
+    def run_batch(self, playlists: list, language: str, bus: ProgressBus = None, job_id: str = None,
+                  control: JobControl = None, user_id: str = None) -> dict:
+        """
+        Xử lý nhiều playlist trong một job: mỗi video chỉ được tải một lần
+        trên một worker pool dùng chung, kết quả được lưu vào từng playlist chứa video.
+        Sự kiện tiến trình được phát từ luồng gọi hàm (an toàn cho Streamlit).
+        Job dừng giữa các video khi bị hủy hoặc hết ngân sách thời gian (control);
+        các video chưa xử lý được đánh dấu lỗi cancelled/deadline_exceeded.
+        Lượt tải được cấp bởi FetchScheduler theo user_id (ưu tiên thấp hơn request tương tác).
+        Returns:
+            dict gồm success_count, failed_count, failed_videos (theo video duy nhất),
+            playlists: playlist_id -> {success_count, failed_count, total}
+            và stop_reason (None nếu job chạy hết)
+        """
+        bus = bus or ProgressBus()
+        job_id = job_id or uuid.uuid4().hex
+        control = control or JobControl.from_env()
+        unique_videos, membership = self.build_work_set(playlists)
+        total = len(unique_videos)
+        success_count = 0
+        failed_count = 0
+        failed_videos = []
+        playlist_stats = {
+            playlist['playlist_id']: {'success_count': 0, 'failed_count': 0, 'total': len(playlist['videos'])}
+            for playlist in playlists
+        }
+
+        duplicates = sum(len(playlist['videos']) for playlist in playlists) - total
+        if duplicates:
+            self.error_handler.log_info(f"Bỏ qua {duplicates} video trùng lặp giữa các playlist")
+        self._save_playlist_metadata(playlists)
+
+        bus.emit(ProgressEvent(ProgressEvent.JOB_STARTED, job_id, total))
+
+        def work(video):
+            # Kiểm tra hủy/hết thời gian trước mỗi video để giải phóng worker nhanh
+            stop_reason = control.stop_reason
+            if stop_reason:
+                video['status'] = 'failed'
+                video['error_type'] = stop_reason
+                video['error'] = f"Job dừng trước khi xử lý video ({stop_reason})"
+                return False, None
+            started = time.monotonic()
+            success = self.process_video_for_playlists(
+                video, membership[video['video_id']], language, control, user_id
+            )
+            return success, time.monotonic() - started
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='transcript-worker') as executor:
+                # Khi job đang được profile, mẫu của các worker cũng được tính cho job này
+                task = propagate_profiling(work)
+                futures = {executor.submit(task, video): video for video in unique_videos}
+                pending = set(futures)
+                try:
+                    while pending:
+                        done, pending = wait(pending, timeout=bus.TICK_INTERVAL, return_when=FIRST_COMPLETED)
+                        # Gửi tiến trình bị gộp khi các video tiếp theo xử lý lâu
+                        bus.tick()
+                        for future in done:
+                            video = futures[future]
+                            success, elapsed = future.result()
+                            if success:
+                                success_count += 1
+                            else:
+                                failed_count += 1
+                                failed_videos.append(video)
+                            for playlist_id in membership[video['video_id']]:
+                                playlist_stats[playlist_id]['success_count' if success else 'failed_count'] += 1
+
+                            if elapsed is not None:
+                                bus.emit(ProgressEvent(
+                                    ProgressEvent.VIDEO_FINISHED, job_id, total, success_count + failed_count,
+                                    success_count, failed_count, video, elapsed
+                                ))
+                except BaseException:
+                    # Job bị ngắt giữa chừng (Ctrl+C, Streamlit dừng/chạy lại script):
+                    # báo các worker bỏ qua video còn lại thay vì chạy hết trong nền
+                    control.cancel()
+                    raise
+        finally:
+            self._sync_duplicates(playlists, unique_videos)
+            self._flush_job_state(playlists, job_id, language, control.stop_reason)
+
+        stop_reason = control.stop_reason
+        if stop_reason:
+            self.error_handler.log_warning(
+                f"Job {job_id} dừng sớm ({stop_reason}): {success_count}/{total} video thành công"
+            )
+
+        bus.emit(ProgressEvent(
+            ProgressEvent.JOB_FINISHED, job_id, total, total,
+            success_count, failed_count
+        ))
+
+        return {
+            'success_count': success_count,
+            'failed_count': failed_count,
+            'failed_videos': failed_videos,
+            'playlists': playlist_stats,
+            'membership': membership,
+            'stop_reason': stop_reason
+        }
+
+    def run_distributed(self, playlists: list, language: str, work_queue, bus: ProgressBus = None,
+                        job_id: str = None, control: JobControl = None, user_id: str = None,
+                        poll_interval: float = 0.5, worker_timeout: float = None) -> dict:
+        """
+        Như run_batch nhưng các video được đưa vào hàng đợi chung (WorkQueue) để các
+        worker (python worker.py) xử lý; hàm này theo dõi kết quả và phát sự kiện
+        tiến trình về session đã gửi job.
+        Khi job bị hủy/hết thời gian, các video chưa được worker nhận bị đánh dấu lỗi,
+        video đang xử lý dở vẫn được chờ tới khi xong hoặc lease hết hạn.
+        Args:
+            worker_timeout: Số giây chờ khi chưa worker nào nhận task của job và hàng đợi không có
+                            worker nào đang chạy; quá hạn thì dừng job với lỗi no_worker
+                            (mặc định WORK_QUEUE_WORKER_TIMEOUT hoặc 60, 0 để chờ mãi)
+        Returns:
+            dict cùng dạng với run_batch
+        """
+        bus = bus or ProgressBus()
+        job_id = job_id or uuid.uuid4().hex
+        control = control or JobControl.from_env()
+        unique_videos, membership = self.build_work_set(playlists)
+        videos_by_id = {video['video_id']: video for video in unique_videos}
+        total = len(unique_videos)
+        success_count = 0
+        failed_count = 0
+        failed_videos = []
+        playlist_stats = {
+            playlist['playlist_id']: {'success_count': 0, 'failed_count': 0, 'total': len(playlist['videos'])}
+            for playlist in playlists
+        }
+
+        if worker_timeout is None:
+            worker_timeout = float(os.environ.get('WORK_QUEUE_WORKER_TIMEOUT', 60))
+
+        self._save_playlist_metadata(playlists)
+        work_queue.submit_job(job_id, unique_videos, membership, language, user_id)
+        bus.emit(ProgressEvent(ProgressEvent.JOB_STARTED, job_id, total))
+
+        last_seq = 0
+        worker_seen = False
+        idle_since = time.monotonic()
+        try:
+            while success_count + failed_count < total:
+                if not worker_seen and worker_timeout > 0:
+                    progress = work_queue.job_progress(job_id)
+                    worker_seen = bool(progress['leased'] or progress['success'] or progress['failed'])
+                    if not worker_seen and work_queue.active_leases():
+                        # Có worker nhưng đang bận với job khác: tiếp tục chờ
+                        idle_since = time.monotonic()
+                    elif not worker_seen and time.monotonic() - idle_since >= worker_timeout:
+                        self.error_handler.log_error(
+                            "Work Queue Error",
+                            f"Không có worker nào nhận video của job {job_id} sau {worker_timeout:.0f}s, "
+                            f"hãy chạy python worker.py",
+                            {"job_id": job_id, "total": total}
+                        )
+                        control.cancel(FailureReason.NO_WORKER)
+
+                stop_reason = control.stop_reason
+                if stop_reason:
+                    # Gọi lại mỗi vòng để thu hồi cả các lease hết hạn của worker đã chết
+                    work_queue.cancel_job(job_id, stop_reason)
+
+                for task in work_queue.completed_tasks(job_id, last_seq):
+                    last_seq = task['completed_seq']
+                    video = videos_by_id[task['video_id']]
+                    success = task['status'] == 'success'
+                    if success:
+                        success_count += 1
+                        video['status'] = 'success'
+                        video.pop('error_type', None)
+                        video.pop('error', None)
+                    else:
+                        failed_count += 1
+                        failed_videos.append(video)
+                        self._mark_failed(video, task['error_type'], task['error'])
+                    for playlist_id in membership[video['video_id']]:
+                        playlist_stats[playlist_id]['success_count' if success else 'failed_count'] += 1
+
+                    if task['elapsed'] is not None:
+                        bus.emit(ProgressEvent(
+                            ProgressEvent.VIDEO_FINISHED, job_id, total, success_count + failed_count,
+                            success_count, failed_count, video, task['elapsed']
+                        ))
+
+                bus.tick()
+                if success_count + failed_count < total:
+                    control.wait(poll_interval)
+        except BaseException:
+            control.cancel()
+            work_queue.cancel_job(job_id, FailureReason.CANCELLED)
+            raise
+        finally:
+            self._sync_duplicates(playlists, unique_videos)
+            self._flush_job_state(playlists, job_id, language, control.stop_reason)
+
+        stop_reason = control.stop_reason
+        if stop_reason:
+            self.error_handler.log_warning(
+                f"Job {job_id} dừng sớm ({stop_reason}): {success_count}/{total} video thành công"
+            )
+
+        bus.emit(ProgressEvent(
+            ProgressEvent.JOB_FINISHED, job_id, total, total,
+            success_count, failed_count
+        ))
+
+        return {
+            'success_count': success_count,
+            'failed_count': failed_count,
+            'failed_videos': failed_videos,
+            'playlists': playlist_stats,
+            'membership': membership,
+            'stop_reason': stop_reason
+        }
+
+    def _save_playlist_metadata(self, playlists: list):
+        """Lưu tiêu đề/kênh của playlist (dùng khi xuất dữ liệu theo kênh) nếu được cung cấp"""
+        for playlist in playlists:
+            if 'title' in playlist:
+                self.data_storage.save_metadata(playlist['playlist_id'], {
+                    'playlist_id': playlist['playlist_id'],
+                    'title': playlist['title'],
+                    'channel': playlist.get('channel', ''),
+                    'updated': datetime.now().isoformat()
+                })
+
+    def _sync_duplicates(self, playlists: list, unique_videos: list):
+        """Đồng bộ trạng thái cho các bản sao của video trong những playlist khác"""
+        results_by_id = {video['video_id']: video for video in unique_videos}
+        for playlist in playlists:
+            for video in playlist['videos']:
+                source = results_by_id[video['video_id']]
+                if source is not video:
+                    for key in ('status', 'error_type', 'error'):
+                        if key in source:
+                            video[key] = source[key]
+                        else:
+                            video.pop(key, None)
+
+    def _flush_job_state(self, playlists: list, job_id: str, language: str, stop_reason: str):
+        """
+        Ghi trạng thái job dừng sớm vào DataStorage (video đã xong đã được lưu trong lúc chạy),
+        hoặc xóa trạng thái cũ khi job chạy hết
+        """
+        for playlist in playlists:
+            playlist_id = playlist['playlist_id']
+            if not stop_reason:
+                self.data_storage.clear_job_state(playlist_id)
+                continue
+            videos = playlist['videos']
+            self.data_storage.save_job_state(playlist_id, {
+                'job_id': job_id,
+                'status': stop_reason,
+                'language': language,
+                'total': len(videos),
+                'success_count': sum(1 for video in videos if video.get('status') == 'success'),
+                # Video cần chạy lại: chưa xử lý hoặc lỗi không phải vĩnh viễn
+                'pending_video_ids': [
+                    video['video_id'] for video in videos
+                    if video.get('status') != 'success' and not FailureReason.is_permanent(video.get('error_type'))
+                ]
+            })
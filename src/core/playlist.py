@@ -1,15 +1,21 @@
 from yt_dlp import YoutubeDL
 from urllib.parse import urlparse, parse_qs
 from ..utils.error_handler import ErrorHandler
+from .rate_limiter import RateLimiter
+from .metadata_cache import MetadataCache
+from .transport import REQUEST_TIMEOUT
 
 
 class PlaylistHandler:
     def __init__(self):
         self.error_handler = ErrorHandler()
+        self.rate_limiter = RateLimiter()
+        self.metadata_cache = MetadataCache()
         self.ydl_opts = {
             'quiet': True,
             'extract_flat': True,
-            'force_generic_extractor': True
+            'force_generic_extractor': True,
+            'socket_timeout': REQUEST_TIMEOUT
         }
 
     def validate_playlist_url(self, url: str) -> bool:
@@ -35,13 +41,15 @@ class PlaylistHandler:
                 'quiet': True,
                 'extract_flat': True,
                 'force_generic_extractor': True,
-                'no_warnings': False
+                'no_warnings': False,
+                'socket_timeout': REQUEST_TIMEOUT
             }
             
             with YoutubeDL(ydl_opts) as ydl:
                 try:
                     self.error_handler.log_info("Đang thử tải thông tin playlist...")
-                    info = ydl.extract_info(url, download=False, process=False)
+                    with self.rate_limiter.request():
+                        info = ydl.extract_info(url, download=False, process=False)
                     
                     if not info:
                         self.error_handler.log_error("Playlist Access Error", "Không thể truy cập playlist")
@@ -65,13 +73,38 @@ class PlaylistHandler:
             self.error_handler.log_error("URL Validation Error", str(e), {"url": url})
             return False
 
+    def _playlist_cache_key(self, url: str) -> str:
+        """Khóa cache cho playlist: ID playlist nếu có, nếu không thì dùng URL"""
+        try:
+            return parse_qs(urlparse(url).query)['list'][0]
+        except Exception:
+            return url
+
+    def _video_cache_key(self, url: str) -> str:
+        """Khóa cache cho video: video ID nếu có, nếu không thì dùng URL"""
+        try:
+            if 'youtu.be' in url:
+                return url.split('/')[-1].split('?')[0]
+            return parse_qs(urlparse(url).query)['v'][0]
+        except Exception:
+            return url
+
     def get_playlist_info(self, url: str) -> dict:
-        """Lấy thông tin playlist bao gồm ID, tên và channel"""
+        """Lấy thông tin playlist bao gồm ID, tên và channel (có cache)"""
+        return self.metadata_cache.get_or_fetch(
+            'playlist',
+            self._playlist_cache_key(url),
+            lambda: self._fetch_playlist_info(url)
+        )
+
+    def _fetch_playlist_info(self, url: str) -> dict:
+        """Tải thông tin playlist từ YouTube"""
         try:
             self.error_handler.log_info("Bắt đầu lấy thông tin playlist...")
             with YoutubeDL(self.ydl_opts) as ydl:
                 self.error_handler.log_info("Đang tải thông tin từ YouTube...")
-                playlist_dict = ydl.extract_info(url, download=False)
+                with self.rate_limiter.request():
+                    playlist_dict = ydl.extract_info(url, download=False)
                 
                 if not playlist_dict:
                     self.error_handler.log_error("Empty playlist dict", "Không lấy được thông tin playlist")
@@ -108,7 +141,16 @@ class PlaylistHandler:
             return None
 
     def get_playlist_videos(self, url: str) -> list:
-        """Lấy danh sách các video từ playlist"""
+        """Lấy danh sách các video từ playlist (có cache)"""
+        videos = self.metadata_cache.get_or_fetch(
+            'playlist_videos',
+            self._playlist_cache_key(url),
+            lambda: self._fetch_playlist_videos(url)
+        )
+        return videos or []
+
+    def _fetch_playlist_videos(self, url: str) -> list:
+        """Tải danh sách các video từ playlist trên YouTube"""
         try:
             self.error_handler.log_info(f"Bắt đầu tải thông tin playlist: {url}")
             
@@ -117,15 +159,19 @@ class PlaylistHandler:
                 'quiet': False,  # Hiện output để debug
                 'extract_flat': True,
                 'force_generic_extractor': False,  # Thử dùng extractor mặc định trước
-                'ignoreerrors': True,  # Bỏ qua video lỗi
+                # Chỉ bỏ qua lỗi tải video; lỗi khi trích xuất danh sách (vd: 429 khi tải trang tiếp theo)
+                # phải được ném ra để RateLimiter giảm tốc độ thay vì trả về danh sách thiếu video
+                'ignoreerrors': 'only_download',
                 'no_warnings': False,
-                'verbose': True
+                'verbose': True,
+                'socket_timeout': REQUEST_TIMEOUT
             }
             
             with YoutubeDL(ydl_opts) as ydl:
                 try:
                     self.error_handler.log_info("Đang trích xuất thông tin playlist...")
-                    playlist_dict = ydl.extract_info(url, download=False)
+                    with self.rate_limiter.request():
+                        playlist_dict = ydl.extract_info(url, download=False)
                     
                     if not playlist_dict:
                         self.error_handler.log_error("Playlist Info Error", "Không thể tải thông tin playlist")
@@ -194,11 +240,24 @@ class PlaylistHandler:
             self.error_handler.log_error("Video ID Extraction Error", str(e), {"url": url})
             return None
 
+    def peek_video_info(self, url: str) -> dict:
+        """Lấy thông tin video đã có trong cache mà không gọi yt-dlp (None nếu chưa có)"""
+        return self.metadata_cache.peek('video', self._video_cache_key(url))
+
     def get_video_info(self, url: str) -> dict:
-        """Lấy thông tin của video đơn lẻ"""
+        """Lấy thông tin của video đơn lẻ (có cache)"""
+        return self.metadata_cache.get_or_fetch(
+            'video',
+            self._video_cache_key(url),
+            lambda: self._fetch_video_info(url)
+        )
+
+    def _fetch_video_info(self, url: str) -> dict:
+        """Tải thông tin của video đơn lẻ từ YouTube"""
         try:
             with YoutubeDL(self.ydl_opts) as ydl:
-                video_dict = ydl.extract_info(url, download=False)
+                with self.rate_limiter.request():
+                    video_dict = ydl.extract_info(url, download=False)
                 if not video_dict:
                     return None
                     
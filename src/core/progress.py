@@ -0,0 +1,146 @@
+import threading
+import time
+from ..utils.error_handler import ErrorHandler
+from ..utils.metrics import Metrics
+
+
+class ProgressEvent:
+    """Sự kiện tiến trình của một job (playlist hoặc batch)"""
+    JOB_STARTED = 'job_started'
+    VIDEO_FINISHED = 'video_finished'
+    JOB_FINISHED = 'job_finished'
+
+    def __init__(self, kind: str, job_id: str, total: int, completed: int = 0,
+                 success_count: int = 0, failed_count: int = 0, video: dict = None,
+                 elapsed: float = None):
+        self.kind = kind
+        self.job_id = job_id
+        self.total = total
+        self.completed = completed
+        self.success_count = success_count
+        self.failed_count = failed_count
+        self.video = video
+        self.elapsed = elapsed
+        self.timestamp = time.time()
+
+    @property
+    def progress(self) -> float:
+        return self.completed / self.total if self.total else 1.0
+
+    @property
+    def is_boundary(self) -> bool:
+        """Sự kiện bắt đầu/kết thúc job luôn được gửi, không bị gộp"""
+        return self.kind in (self.JOB_STARTED, self.JOB_FINISHED)
+
+
+class _Subscription:
+    """Một subscriber kèm bộ gộp sự kiện theo thời gian"""
+
+    def __init__(self, callback, max_updates_per_second: float = None):
+        self.callback = callback
+        self.min_interval = 1.0 / max_updates_per_second if max_updates_per_second else 0.0
+        self.last_sent = 0.0
+        self.pending = None
+        self.lock = threading.Lock()
+
+    def offer(self, event: ProgressEvent) -> list:
+        """Trả về các sự kiện cần gửi ngay; sự kiện đến quá dày sẽ được gộp lại"""
+        with self.lock:
+            now = time.monotonic()
+            if event.is_boundary:
+                # Gửi sự kiện đang chờ (nếu có) trước sự kiện kết thúc để không mất cập nhật cuối
+                to_send = [self.pending] if self.pending and event.kind == ProgressEvent.JOB_FINISHED else []
+                self.pending = None
+                self.last_sent = now
+                return to_send + [event]
+            if now - self.last_sent >= self.min_interval:
+                self.pending = None
+                self.last_sent = now
+                return [event]
+            # Sự kiện mới thay thế sự kiện chờ cũ (các số liệu trong sự kiện là lũy kế)
+            self.pending = event
+            return []
+
+    def due(self) -> list:
+        """Sự kiện đang chờ nếu đã đủ min_interval kể từ lần gửi trước (trailing edge)"""
+        with self.lock:
+            now = time.monotonic()
+            if self.pending is None or now - self.last_sent < self.min_interval:
+                return []
+            event, self.pending = self.pending, None
+            self.last_sent = now
+            return [event]
+
+
+class ProgressBus:
+    """
+    Kênh phát sự kiện tiến trình giữa phần xử lý và giao diện.
+    Code xử lý chỉ gọi emit(); giao diện Streamlit, thanh tqdm và metrics
+    đăng ký nhận sự kiện với tần suất tối đa riêng.
+    Callback luôn chạy trên luồng gọi emit()/tick() (không dùng timer riêng vì Streamlit
+    chỉ cập nhật giao diện từ luồng của script); luồng phát sự kiện gọi tick() định kỳ
+    trong lúc chờ để sự kiện bị gộp được gửi đi khi không còn sự kiện mới.
+    """
+    # Chu kỳ gọi tick() gợi ý cho vòng lặp phát sự kiện (giây)
+    TICK_INTERVAL = 0.25
+
+    def __init__(self):
+        self.error_handler = ErrorHandler()
+        self._subscriptions = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, callback, max_updates_per_second: float = None):
+        """
+        Đăng ký nhận sự kiện
+        Args:
+            callback: Hàm nhận một ProgressEvent
+            max_updates_per_second: Số lần cập nhật tối đa mỗi giây (None = nhận mọi sự kiện)
+        """
+        subscription = _Subscription(callback, max_updates_per_second)
+        with self._lock:
+            self._subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+
+    def emit(self, event: ProgressEvent):
+        """Phát sự kiện tới tất cả subscriber"""
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            self._deliver(subscription, subscription.offer(event))
+
+    def tick(self):
+        """Gửi các sự kiện bị gộp đã đến hạn (gọi định kỳ khi tiến trình tạm không có sự kiện mới)"""
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            self._deliver(subscription, subscription.due())
+
+    def _deliver(self, subscription: _Subscription, events: list):
+        for pending_event in events:
+            try:
+                subscription.callback(pending_event)
+            except Exception as e:
+                # Lỗi ở giao diện không được làm dừng quá trình xử lý
+                self.error_handler.log_error("Progress Subscriber Error", str(e), {
+                    "event": pending_event.kind,
+                    "job_id": pending_event.job_id
+                })
+
+
+def metrics_subscriber(event: ProgressEvent):
+    """Subscriber ghi số liệu xử lý video vào Metrics"""
+    metrics = Metrics()
+    if event.kind == ProgressEvent.JOB_STARTED:
+        metrics.increment('jobs.started')
+    elif event.kind == ProgressEvent.VIDEO_FINISHED:
+        status = event.video.get('status') if event.video else None
+        metrics.increment('videos.success' if status == 'success' else 'videos.failed')
+        if event.elapsed is not None:
+            metrics.observe('video.process_time', event.elapsed)
+    elif event.kind == ProgressEvent.JOB_FINISHED:
+        metrics.increment('jobs.finished')
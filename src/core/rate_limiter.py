@@ -0,0 +1,108 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from ..utils.error_handler import ErrorHandler
+from ..utils.metrics import Metrics
+from .retry import FailureReason, classify_error
+
+
+class RateLimiter:
+    """
+    Bộ điều tiết tốc độ request tới YouTube dùng chung cho cả process.
+    Token bucket với tốc độ điều chỉnh theo AIMD: tăng dần khi request thành công,
+    giảm một nửa và tạm dừng khi bị YouTube chặn (429).
+    """
+    _instance = None
+    _initialized = False
+
+    def __new__(cls):
+        # Singleton pattern - mọi luồng và mọi phiên dùng chung một bucket
+        if cls._instance is None:
+            cls._instance = super(RateLimiter, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if not RateLimiter._initialized:
+            self.error_handler = ErrorHandler()
+            self.metrics = Metrics()
+
+            self.min_rate = float(os.environ.get('YT_RATE_MIN', 0.2))
+            self.max_rate = float(os.environ.get('YT_RATE_MAX', 10.0))
+            self.rate = float(os.environ.get('YT_RATE_INITIAL', 2.0))
+            self.burst = float(os.environ.get('YT_RATE_BURST', 3.0))
+            self.additive_increase = 0.1    # req/s cộng thêm sau mỗi request thành công
+            self.decrease_factor = 0.5      # hệ số giảm khi bị chặn
+            self.cooldown_seconds = 30.0    # thời gian tạm dừng tăng tốc sau khi bị chặn
+
+            self._lock = threading.Lock()
+            self._tokens = self.burst
+            self._last_refill = time.monotonic()
+            self._blocked_until = 0.0
+            self._cooldown_until = 0.0
+            self.metrics.set_gauge('rate_limiter.rate', self.rate)
+            RateLimiter._initialized = True
+
+    def _refill(self, now: float):
+        """Nạp lại token theo thời gian đã trôi qua (gọi khi đang giữ lock)"""
+        elapsed = now - self._last_refill
+        self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+        self._last_refill = now
+
+    def acquire(self):
+        """Chờ cho đến khi được phép gửi một request"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self._blocked_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    break
+                wait = max(self._blocked_until - now, (1 - self._tokens) / self.rate)
+            time.sleep(wait)
+            waited += wait
+
+        if waited:
+            self.metrics.observe('rate_limiter.wait', waited)
+
+    def on_success(self):
+        """Tăng tốc độ tuyến tính sau một request thành công"""
+        with self._lock:
+            if time.monotonic() < self._cooldown_until:
+                return
+            self.rate = min(self.max_rate, self.rate + self.additive_increase)
+            rate = self.rate
+        self.metrics.set_gauge('rate_limiter.rate', rate)
+
+    def on_throttle(self, backoff_seconds: float = 5.0):
+        """Giảm tốc độ theo cấp số nhân và tạm dừng khi bị YouTube chặn"""
+        with self._lock:
+            now = time.monotonic()
+            self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+            self._tokens = 0
+            self._blocked_until = max(self._blocked_until, now + backoff_seconds)
+            self._cooldown_until = now + self.cooldown_seconds
+            rate = self.rate
+        self.metrics.set_gauge('rate_limiter.rate', rate)
+        self.metrics.increment('rate_limiter.throttled')
+        self.error_handler.log_warning(f"Bị YouTube giới hạn request, giảm tốc độ xuống {rate:.2f} req/s")
+
+    @contextmanager
+    def request(self):
+        """
+        Bao một request tới YouTube: chờ token, sau đó báo kết quả cho bộ điều tiết
+        Ví dụ:
+            with rate_limiter.request():
+                ydl.extract_info(url, download=False)
+        """
+        self.acquire()
+        self.metrics.increment('rate_limiter.requests')
+        try:
+            yield
+        except Exception as e:
+            if classify_error(e) == FailureReason.RATE_LIMITED:
+                self.on_throttle()
+            raise
+        else:
+            self.on_success()
@@ -0,0 +1,165 @@
+import random
+import time
+
+
+class FailureReason:
+    """Các loại lỗi khi tải transcript"""
+    NO_TRANSCRIPT = 'no_transcript'
+    TRANSCRIPTS_DISABLED = 'transcripts_disabled'
+    VIDEO_UNAVAILABLE = 'video_unavailable'
+    NOT_TRANSLATABLE = 'not_translatable'
+    INVALID_VIDEO = 'invalid_video'
+    RATE_LIMITED = 'rate_limited'
+    SERVER_ERROR = 'server_error'
+    TIMEOUT = 'timeout'
+    NETWORK_ERROR = 'network_error'
+    CANCELLED = 'cancelled'
+    DEADLINE_EXCEEDED = 'deadline_exceeded'
+    QUOTA_EXCEEDED = 'quota_exceeded'
+    NO_WORKER = 'no_worker'
+    UNKNOWN = 'unknown'
+
+    # Lỗi vĩnh viễn: thử lại cũng không có kết quả khác
+    PERMANENT = {
+        NO_TRANSCRIPT,
+        TRANSCRIPTS_DISABLED,
+        VIDEO_UNAVAILABLE,
+        NOT_TRANSLATABLE,
+        INVALID_VIDEO
+    }
+
+    # Lỗi tạm thời: nên thử lại sau một khoảng chờ
+    TRANSIENT = {
+        RATE_LIMITED,
+        SERVER_ERROR,
+        TIMEOUT,
+        NETWORK_ERROR
+    }
+
+    @classmethod
+    def is_permanent(cls, reason: str) -> bool:
+        return reason in cls.PERMANENT
+
+    @classmethod
+    def is_transient(cls, reason: str) -> bool:
+        return reason in cls.TRANSIENT
+
+
+# Ánh xạ tên exception (youtube_transcript_api, requests, yt-dlp) sang loại lỗi.
+# Dùng tên class thay vì import trực tiếp để không phụ thuộc phiên bản thư viện.
+_ERROR_NAME_REASONS = {
+    'NoTranscriptFound': FailureReason.NO_TRANSCRIPT,
+    'NoTranscriptAvailable': FailureReason.NO_TRANSCRIPT,
+    'TranscriptsDisabled': FailureReason.TRANSCRIPTS_DISABLED,
+    'VideoUnavailable': FailureReason.VIDEO_UNAVAILABLE,
+    'VideoUnplayable': FailureReason.VIDEO_UNAVAILABLE,
+    'AgeRestricted': FailureReason.VIDEO_UNAVAILABLE,
+    'NotTranslatable': FailureReason.NOT_TRANSLATABLE,
+    'TranslationLanguageNotAvailable': FailureReason.NOT_TRANSLATABLE,
+    'InvalidVideoId': FailureReason.INVALID_VIDEO,
+    'TooManyRequests': FailureReason.RATE_LIMITED,
+    'RequestBlocked': FailureReason.RATE_LIMITED,
+    'IpBlocked': FailureReason.RATE_LIMITED,
+    'Timeout': FailureReason.TIMEOUT,
+    'ConnectTimeout': FailureReason.TIMEOUT,
+    'ReadTimeout': FailureReason.TIMEOUT,
+    'TimeoutError': FailureReason.TIMEOUT,
+    'ConnectionError': FailureReason.NETWORK_ERROR,
+    'ProxyError': FailureReason.NETWORK_ERROR,
+    'SSLError': FailureReason.NETWORK_ERROR,
+    'ChunkedEncodingError': FailureReason.NETWORK_ERROR,
+}
+
+
+def _reason_from_status(status_code) -> str:
+    """Phân loại lỗi theo HTTP status code"""
+    if status_code is None:
+        return None
+    if status_code == 429:
+        return FailureReason.RATE_LIMITED
+    if 500 <= status_code < 600:
+        return FailureReason.SERVER_ERROR
+    if status_code in (404, 410):
+        return FailureReason.VIDEO_UNAVAILABLE
+    return None
+
+
+def classify_error(error: Exception) -> str:
+    """Xác định loại lỗi (FailureReason) từ một exception"""
+    if isinstance(error, TranscriptFetchError):
+        return error.reason
+
+    for cls in type(error).__mro__:
+        reason = _ERROR_NAME_REASONS.get(cls.__name__)
+        if reason:
+            return reason
+
+    # Lỗi HTTP từ requests (HTTPError) có response kèm status code
+    response = getattr(error, 'response', None)
+    reason = _reason_from_status(getattr(response, 'status_code', None))
+    if reason:
+        return reason
+
+    # YouTubeRequestFailed và lỗi của yt-dlp chỉ mang status code trong thông điệp
+    message = str(error)
+    if 'Too Many Requests' in message or 'HTTP Error 429' in message:
+        return FailureReason.RATE_LIMITED
+    if 'timed out' in message.lower():
+        return FailureReason.TIMEOUT
+    for code in ('500', '502', '503', '504'):
+        if f"{code} Server Error" in message or f"HTTP Error {code}" in message:
+            return FailureReason.SERVER_ERROR
+
+    return FailureReason.UNKNOWN
+
+
+class TranscriptFetchError(Exception):
+    """Lỗi tải transcript đã được phân loại"""
+
+    def __init__(self, reason: str, message: str = ''):
+        super().__init__(message or reason)
+        self.reason = reason
+
+    @property
+    def permanent(self) -> bool:
+        return FailureReason.is_permanent(self.reason)
+
+
+class RetryPolicy:
+    """Chính sách thử lại với exponential backoff và full jitter"""
+
+    def __init__(self, max_attempts: int = 4, base_delay: float = 1.0, max_delay: float = 30.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def get_delay(self, attempt: int) -> float:
+        """Thời gian chờ trước lần thử thứ attempt + 1 (attempt bắt đầu từ 1)"""
+        ceiling = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        return random.uniform(0, ceiling)
+
+    def call(self, func, on_retry=None, control=None):
+        """
+        Gọi func, tự động thử lại khi gặp lỗi tạm thời
+        Args:
+            func: Hàm không tham số cần gọi
+            on_retry: Callback (attempt, reason, delay) được gọi trước mỗi lần chờ
+            control: JobControl của job; không thử lại nữa khi job bị hủy hoặc hết thời gian
+        """
+        attempt = 1
+        while True:
+            try:
+                return func()
+            except Exception as e:
+                reason = classify_error(e)
+                if not FailureReason.is_transient(reason) or attempt >= self.max_attempts:
+                    raise
+
+                delay = self.get_delay(attempt)
+                if on_retry:
+                    on_retry(attempt, reason, delay)
+                if control is None:
+                    time.sleep(delay)
+                elif control.wait(delay):
+                    raise
+                attempt += 1
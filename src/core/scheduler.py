@@ -0,0 +1,189 @@
+import heapq
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date
+from ..utils.error_handler import ErrorHandler
+from ..utils.metrics import Metrics
+from .retry import FailureReason, TranscriptFetchError
+
+
+class _Waiter:
+    """Một yêu cầu tải transcript đang chờ được cấp lượt"""
+
+    def __init__(self, user_id: str, priority: int, charged: bool):
+        self.user_id = user_id
+        self.priority = priority
+        # Có được tính vào hạn mức ngày không (lần thử lại của cùng một video thì không)
+        self.charged = charged
+        self.event = threading.Event()
+        self.granted = False
+        self.abandoned = False
+        self.enqueued_at = time.monotonic()
+
+
+class _UserState:
+    def __init__(self):
+        self.running = 0
+        self.last_finish = 0.0
+        self.day = date.today()
+        self.used_today = 0
+
+
+class FetchScheduler:
+    """
+    Bộ điều phối trung tâm cho mọi lượt tải transcript trong process.
+    - Giới hạn số lượt tải đồng thời toàn hệ thống và theo từng người dùng
+    - Xếp hàng công bằng có trọng số (weighted fair queueing) giữa người dùng
+    - Request tương tác (video đơn lẻ) luôn được ưu tiên trước công việc hàng loạt (playlist)
+    - Hạn mức số video mỗi ngày cho từng người dùng
+    """
+    INTERACTIVE = 0
+    BULK = 1
+
+    _instance = None
+    _initialized = False
+
+    def __new__(cls):
+        # Singleton pattern - hàng đợi dùng chung cho mọi session
+        if cls._instance is None:
+            cls._instance = super(FetchScheduler, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if not FetchScheduler._initialized:
+            self.error_handler = ErrorHandler()
+            self.metrics = Metrics()
+            self.max_concurrency = int(os.environ.get('SCHEDULER_MAX_CONCURRENCY', 8))
+            self.user_concurrency = int(os.environ.get('SCHEDULER_USER_CONCURRENCY', 4))
+            # Số video tối đa mỗi người dùng mỗi ngày (0 = không giới hạn)
+            self.daily_quota = int(os.environ.get('SCHEDULER_DAILY_QUOTA', 0))
+            # Trọng số theo người dùng, vd: "admin@example.com:4,team@example.com:2" (mặc định 1)
+            self.weights = {}
+            for item in os.environ.get('SCHEDULER_USER_WEIGHTS', '').split(','):
+                if ':' in item:
+                    user_id, weight = item.rsplit(':', 1)
+                    self.weights[user_id.strip()] = float(weight)
+
+            self._lock = threading.Lock()
+            self._queue = []
+            self._sequence = itertools.count()
+            self._users = {}
+            self._running = 0
+            self._virtual_time = 0.0
+            FetchScheduler._initialized = True
+
+    def _user(self, user_id: str) -> _UserState:
+        state = self._users.get(user_id)
+        if state is None:
+            state = self._users[user_id] = _UserState()
+        if state.day != date.today():
+            state.day = date.today()
+            state.used_today = 0
+        return state
+
+    def _enqueue(self, user_id: str, priority: int, charge: bool = True) -> _Waiter:
+        with self._lock:
+            state = self._user(user_id)
+            if charge:
+                if self.daily_quota and state.used_today >= self.daily_quota:
+                    self.metrics.increment('scheduler.quota_exceeded')
+                    raise TranscriptFetchError(
+                        FailureReason.QUOTA_EXCEEDED,
+                        f"Đã dùng hết hạn mức {self.daily_quota} video hôm nay"
+                    )
+                state.used_today += 1
+
+            # Thẻ thời gian ảo: người dùng có nhiều yêu cầu chờ sẽ bị xếp sau người dùng mới
+            start = max(self._virtual_time, state.last_finish)
+            state.last_finish = start + 1.0 / self.weights.get(user_id, 1.0)
+            waiter = _Waiter(user_id, priority, charge)
+            heapq.heappush(self._queue, (priority, start, next(self._sequence), waiter))
+            self._dispatch()
+            return waiter
+
+    def _dispatch(self):
+        """Cấp lượt cho các yêu cầu đủ điều kiện theo thứ tự ưu tiên (gọi khi đang giữ lock)"""
+        deferred = []
+        while self._queue and self._running < self.max_concurrency:
+            entry = heapq.heappop(self._queue)
+            waiter = entry[-1]
+            if waiter.abandoned:
+                continue
+            state = self._user(waiter.user_id)
+            if state.running >= self.user_concurrency:
+                deferred.append(entry)
+                continue
+            self._running += 1
+            state.running += 1
+            self._virtual_time = max(self._virtual_time, entry[1])
+            waiter.granted = True
+            waiter.event.set()
+        for entry in deferred:
+            heapq.heappush(self._queue, entry)
+        self.metrics.set_gauge('scheduler.running', self._running)
+        self.metrics.set_gauge('scheduler.queued', len(self._queue))
+
+    def _abandon(self, waiter: _Waiter) -> bool:
+        """Rút yêu cầu khỏi hàng đợi; False nếu yêu cầu vừa được cấp lượt"""
+        with self._lock:
+            if waiter.granted:
+                return False
+            waiter.abandoned = True
+            if waiter.charged:
+                self._user(waiter.user_id).used_today -= 1
+            return True
+
+    def _release(self, waiter: _Waiter):
+        with self._lock:
+            self._running -= 1
+            self._user(waiter.user_id).running -= 1
+            self._dispatch()
+
+    @contextmanager
+    def slot(self, user_id: str = None, priority: int = BULK, control=None, charge: bool = True):
+        """
+        Chờ tới lượt rồi thực hiện một lượt tải (một lần gọi backend, không gồm thời gian chờ thử lại)
+        Ví dụ:
+            with scheduler.slot(user_id, FetchScheduler.INTERACTIVE):
+                backend.fetch(...)
+        Args:
+            charge: Tính vào hạn mức ngày (False cho lần thử lại của cùng một video)
+        Raises:
+            TranscriptFetchError: hết hạn mức ngày, hoặc job bị hủy/hết thời gian khi đang chờ
+        """
+        stop_reason = control.stop_reason if control is not None else None
+        if stop_reason:
+            raise TranscriptFetchError(stop_reason, f"Job đã dừng ({stop_reason})")
+        waiter = self._enqueue(user_id or 'anonymous', priority, charge)
+        while not waiter.event.wait(0.2):
+            stop_reason = control.stop_reason if control is not None else None
+            if stop_reason and self._abandon(waiter):
+                raise TranscriptFetchError(stop_reason, f"Job dừng khi đang chờ lượt tải ({stop_reason})")
+        self.metrics.observe('scheduler.wait_time', time.monotonic() - waiter.enqueued_at)
+        try:
+            stop_reason = control.stop_reason if control is not None else None
+            if stop_reason:
+                # Job dừng ngay khi vừa được cấp lượt: trả lượt cho người khác, không tính vào hạn mức
+                if waiter.charged:
+                    with self._lock:
+                        self._user(waiter.user_id).used_today -= 1
+                raise TranscriptFetchError(stop_reason, f"Job dừng khi đang chờ lượt tải ({stop_reason})")
+            yield
+        finally:
+            self._release(waiter)
+
+    def usage(self, user_id: str = None) -> dict:
+        """Số liệu sử dụng của người dùng: đang chạy, đang chờ, đã dùng hôm nay và hạn mức"""
+        user_id = user_id or 'anonymous'
+        with self._lock:
+            state = self._user(user_id)
+            queued = sum(1 for entry in self._queue if entry[-1].user_id == user_id and not entry[-1].abandoned)
+            return {
+                'running': state.running,
+                'queued': queued,
+                'used_today': state.used_today,
+                'daily_quota': self.daily_quota
+            }
@@ -1,16 +1,31 @@
+import difflib
 import json
 import os
 import re
+import uuid
 from datetime import datetime
 from ..utils.error_handler import ErrorHandler
+from ..utils.metrics import Metrics
+from .object_store import TranscriptObjectStore
+from .near_duplicate import NearDuplicateIndex
+from .storage_backends import create_storage_backend
 
 
 
 class DataStorage:
-    def __init__(self):
+    def __init__(self, backend=None):
         self.error_handler = ErrorHandler()
+        self.metrics = Metrics()
         self.base_path = os.path.join(os.path.dirname(__file__), '..', 'data')
-        self._ensure_directories()
+        # Backend lưu trữ: đĩa cục bộ (mặc định) hoặc S3 khi chạy nhiều node (STORAGE_BACKEND)
+        if backend is None:
+            self._ensure_directories()
+            backend = create_storage_backend(self.base_path)
+        self.backend = backend
+        self.object_store = TranscriptObjectStore(self.backend)
+        self.near_duplicate_index = NearDuplicateIndex(self.backend)
+        # 'flag': chỉ đánh dấu video gần trùng, 'skip': không lưu/xuất video gần trùng
+        self.near_duplicate_mode = os.environ.get('NEAR_DUPLICATE_MODE', 'flag')
 
     def _ensure_directories(self):
         """Đảm bảo các thư mục cần thiết tồn tại"""
@@ -42,28 +57,24 @@ class DataStorage:
         
         return filename
 
-    def create_playlist_directory(self, playlist_id: str) -> tuple:
-        """Tạo thư mục cho playlist và các thư mục con"""
-        # Tạo thư mục gốc cho playlist
-        playlist_path = os.path.join(self.base_path, 'playlists', playlist_id)
-        if not os.path.exists(playlist_path):
-            os.makedirs(playlist_path)
-            
-        # Tạo thư mục con cho JSON
-        json_path = os.path.join(playlist_path, 'json')
-        if not os.path.exists(json_path):
-            os.makedirs(json_path)
-            
-        # Tạo thư mục con cho TXT
-        txt_path = os.path.join(playlist_path, 'txt')
-        if not os.path.exists(txt_path):
-            os.makedirs(txt_path)
-            
-        self.error_handler.log_info(f"Created directory structure at {playlist_path}")
-        return playlist_path, json_path, txt_path
+    @staticmethod
+    def _playlist_key(playlist_id: str, *parts: str) -> str:
+        """Khóa lưu trữ trong thư mục của playlist (vd: playlists/<id>/refs/<video_id>.json)"""
+        return '/'.join(('playlists', playlist_id) + parts)
+
+    def _write_json(self, key: str, data: dict):
+        """Ghi JSON vào backend (backend cục bộ ghi file tạm rồi đổi tên để tránh file bị ghi dở)"""
+        self.backend.write_bytes(key, json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8'))
+
+    def _read_json(self, key: str, default=None):
+        """Đọc JSON từ backend, trả về default nếu không tồn tại"""
+        data = self.backend.read_bytes(key)
+        if data is None:
+            return default
+        return json.loads(data)
 
-    def _create_text_content(self, transcript_data: dict) -> str:
-        """Tạo nội dung cho file text từ transcript data"""
+    def render_text(self, transcript_data: dict) -> str:
+        """Tạo nội dung dạng text (metadata + transcript có mốc thời gian) từ transcript data"""
         text_content = []
         
         # Thêm metadata
@@ -81,31 +92,73 @@ class DataStorage:
         
         return '\n'.join(text_content)
 
+    def _build_base_filename(self, video_title: str, video_id: str) -> str:
+        """Tạo tên file cơ bản cho video"""
+        return f"{self._sanitize_filename(video_title, 30)}_{video_id}"
+
+    def build_text_filename(self, video_title: str, video_id: str) -> str:
+        """Tên file .txt khi tải transcript của một video (nội dung từ render_text)"""
+        return f"{self._sanitize_filename(video_title)}_{video_id}.txt"
+
     def save_transcript(self, playlist_id: str, video_id: str, video_title: str, transcript_data: dict):
-        """Lưu transcript vào cả file JSON và TXT"""
+        """
+        Lưu transcript vào kho object và ghi tham chiếu cho playlist.
+        Nội dung trùng (cùng video, ngôn ngữ, transcript) chỉ được lưu một lần.
+        """
         try:
-            # Tạo các thư mục cần thiết
-            _, json_path, txt_path = self.create_playlist_directory(playlist_id)
-            
-            # Tạo tên file cơ bản
-            base_filename = f"{self._sanitize_filename(video_title, 30)}_{video_id}"
-            
             # Đảm bảo transcript_data có đầy đủ thông tin
             if 'title' not in transcript_data:
                 transcript_data['title'] = video_title
             
-            # Lưu file JSON với đầy đủ thông tin
-            json_file_path = os.path.join(json_path, f"{base_filename}.json")
-            with open(json_file_path, 'w', encoding='utf-8') as f:
-                json.dump(transcript_data, f, ensure_ascii=False, indent=2)
+            language = transcript_data['metadata']['language']
+            ref_path = self._playlist_key(playlist_id, 'refs', f"{video_id}.json")
+            object_key = self.object_store.compute_key(video_id, language, transcript_data['transcript'])
+            
+            # Khóa object là hash nội dung: nếu transcript không đổi thì giữ nguyên file,
+            # kể cả download_date, để backup/rsync không thấy file bị sửa
+            previous_ref = self._read_json(ref_path)
+            if (previous_ref and previous_ref.get('content_hash') == object_key
+                    and previous_ref.get('title') == video_title):
+                self.metrics.increment('storage.unchanged')
+                self.error_handler.log_debug(f"Transcript của video {video_id} không thay đổi, bỏ qua ghi file")
+                return True
+            
+            ref = {
+                'video_id': video_id,
+                'title': video_title,
+                'filename': self._build_base_filename(video_title, video_id),
+                'language': language,
+                'download_date': transcript_data['metadata'].get('download_date'),
+                'content_hash': object_key,
+                'object': None
+            }
             
-            # Tạo và lưu file TXT với đầy đủ thông tin
-            txt_content = self._create_text_content(transcript_data)
-            txt_file_path = os.path.join(txt_path, f"{base_filename}.txt")
-            with open(txt_file_path, 'w', encoding='utf-8') as f:
-                f.write(txt_content)
+            # Kiểm tra transcript gần trùng (reupload, bản chỉnh sửa lại...) qua MinHash/LSH
+            near_duplicate = self.near_duplicate_index.check(
+                object_key, video_id, language, transcript_data['transcript']
+            )
+            if near_duplicate:
+                ref['near_duplicate_of'] = near_duplicate
+                if self.near_duplicate_mode == 'skip':
+                    # Chỉ ghi tham chiếu đánh dấu, không lưu và không xuất transcript
+                    self._write_json(ref_path, ref)
+                    self._touch_playlist(playlist_id)
+                    self.error_handler.log_info(
+                        f"Bỏ qua video {video_id} - {video_title}: gần trùng với {near_duplicate['video_id']} "
+                        f"({near_duplicate['similarity']:.0%})"
+                    )
+                    return True
             
-            self.error_handler.log_info(f"Saved transcript for video {video_id} - {video_title} in both JSON and TXT formats")
+            object_key, created = self.object_store.put(transcript_data)
+            ref['object'] = object_key
+            if previous_ref and previous_ref.get('object') and previous_ref['object'] != object_key:
+                ref['previous_object'] = previous_ref['object']
+                self._record_change(playlist_id, video_id, previous_ref['object'], object_key, transcript_data['transcript'])
+            self._write_json(ref_path, ref)
+            self._touch_playlist(playlist_id)
+            
+            status = "new object" if created else "existing object"
+            self.error_handler.log_info(f"Saved transcript reference for video {video_id} - {video_title} ({status} {object_key[:12]})")
             return True
         except Exception as e:
             self.error_handler.log_error("Storage Error", str(e), {
@@ -115,14 +168,290 @@ class DataStorage:
             })
             return False
 
+    def _segment_diff(self, old_segments: list, new_segments: list) -> list:
+        """
+        Diff gọn ở mức segment giữa hai phiên bản transcript
+        Returns:
+            Danh sách thay đổi {'op', 'old': [i1, i2], 'new': [j1, j2], 'segments'}
+            với segments là nội dung mới (bỏ trống khi xóa)
+        """
+        def as_key(segment):
+            return (segment.get('text'), segment.get('start'), segment.get('duration'))
+        
+        matcher = difflib.SequenceMatcher(
+            None, [as_key(s) for s in old_segments], [as_key(s) for s in new_segments], autojunk=False
+        )
+        changes = []
+        for op, i1, i2, j1, j2 in matcher.get_opcodes():
+            if op == 'equal':
+                continue
+            changes.append({
+                'op': op,
+                'old': [i1, i2],
+                'new': [j1, j2],
+                'segments': new_segments[j1:j2]
+            })
+        return changes
+
+    def _record_change(self, playlist_id: str, video_id: str, previous_key: str, current_key: str, transcript: list):
+        """Ghi diff của transcript vừa thay đổi vào log playlists/<id>/changes"""
+        try:
+            previous = self.object_store.get(previous_key)
+            changes = self._segment_diff(previous['transcript'] if previous else [], transcript)
+            entry = {
+                'video_id': video_id,
+                'date': datetime.now().isoformat(),
+                'previous_object': previous_key,
+                'object': current_key,
+                'changes': changes
+            }
+            self.backend.append_record(self._playlist_key(playlist_id, 'changes'), json.dumps(entry, ensure_ascii=False))
+            self.metrics.increment('storage.changed')
+            self.error_handler.log_info(f"Transcript của video {video_id} đã thay đổi ({len(changes)} đoạn khác biệt)")
+        except Exception as e:
+            self.error_handler.log_error("Change Log Error", str(e), {
+                "playlist_id": playlist_id,
+                "video_id": video_id
+            })
+
+    def get_playlist_changes(self, playlist_id: str) -> list:
+        """Lấy lịch sử thay đổi transcript của playlist"""
+        return [json.loads(line) for line in self.backend.read_records(self._playlist_key(playlist_id, 'changes'))]
+
+    def get_playlist_refs(self, playlist_id: str, include_legacy: bool = False) -> list:
+        """
+        Lấy danh sách tham chiếu transcript của playlist
+        Args:
+            include_legacy: Thêm tham chiếu cho transcript lưu theo cấu trúc cũ (xem get_legacy_refs)
+        """
+        refs = []
+        for key in self.backend.list(self._playlist_key(playlist_id, 'refs') + '/'):
+            if key.endswith('.json'):
+                ref = self._read_json(key)
+                if ref is not None:
+                    refs.append(ref)
+        if include_legacy:
+            refs.extend(self.get_legacy_refs(playlist_id, {ref['video_id'] for ref in refs}))
+        return refs
+
+    def get_legacy_refs(self, playlist_id: str, skip_video_ids: set = None) -> list:
+        """
+        Tham chiếu cho transcript lưu theo cấu trúc cũ (playlists/<id>/json/*.json, trước khi có kho object).
+        Tham chiếu có 'legacy_key' trỏ tới file cũ thay cho 'object'; content_hash được tính như khóa object
+        nên nội dung trùng với object đã lưu vẫn nhận ra được.
+        Args:
+            skip_video_ids: Video đã có tham chiếu mới (bỏ qua bản cũ)
+        """
+        refs = []
+        prefix = self._playlist_key(playlist_id, 'json') + '/'
+        for key in self.backend.list(prefix):
+            if not key.endswith('.json'):
+                continue
+            transcript_data = self._read_json(key)
+            if not transcript_data or transcript_data.get('video_id') in (skip_video_ids or ()):
+                continue
+            language = transcript_data['metadata']['language']
+            refs.append({
+                'video_id': transcript_data['video_id'],
+                'title': transcript_data.get('title'),
+                'filename': key[len(prefix):-len('.json')],
+                'language': language,
+                'download_date': transcript_data['metadata'].get('download_date'),
+                'content_hash': self.object_store.compute_key(
+                    transcript_data['video_id'], language, transcript_data['transcript']
+                ),
+                'object': None,
+                'legacy_key': key
+            })
+        return refs
+
+    def list_playlist_ids(self) -> list:
+        """Danh sách ID các playlist đã lưu trên backend"""
+        return sorted({key.split('/')[1] for key in self.backend.list('playlists/') if key.count('/') >= 2})
+
+    def get_playlist_metadata(self, playlist_id: str) -> dict:
+        """Metadata của playlist (tiêu đề, kênh...), None nếu chưa có"""
+        return self._read_json(self._playlist_key(playlist_id, 'metadata.json'))
+
+    def load_analysis(self, name: str) -> dict:
+        """
+        Đọc tài liệu phân tích dẫn xuất từ transcript (vd: cache FAQ), None nếu chưa có
+        Args:
+            name: Tên tương đối trong analysis/, không có đuôi (vd: 'faq/v1/playlists/<id>')
+        """
+        return self._read_json(f"analysis/{name}.json")
+
+    def save_analysis(self, name: str, document: dict):
+        """Ghi tài liệu phân tích (dựng lại được từ transcript nên có thể ghi đè bất kỳ lúc nào)"""
+        self._write_json(f"analysis/{name}.json", document)
+
+    def get_transcript_ref(self, playlist_id: str, video_id: str) -> dict:
+        """Lấy tham chiếu transcript của một video trong playlist, None nếu chưa có"""
+        return self._read_json(self._playlist_key(playlist_id, 'refs', f"{video_id}.json"))
+
+    def load_transcript(self, ref: dict) -> dict:
+        """Dựng lại transcript_data đầy đủ từ tham chiếu và object (hoặc file cũ nếu là tham chiếu cũ)"""
+        if ref.get('legacy_key'):
+            transcript_data = self._read_json(ref['legacy_key'])
+            transcript_data['metadata'].setdefault('language_name', transcript_data['metadata']['language'])
+            return dict(transcript_data, title=ref.get('title'))
+        obj = self.object_store.get(ref['object'])
+        return {
+            'video_id': ref['video_id'],
+            'title': ref['title'],
+            'transcript': obj['transcript'],
+            'metadata': {
+                'language': obj['language'],
+                'language_name': obj.get('language_name', obj['language']),
+                'download_date': ref.get('download_date')
+            }
+        }
+
+    def _touch_playlist(self, playlist_id: str):
+        """
+        Đổi revision của playlist sau mỗi lần nội dung xuất ra (ref, metadata) thay đổi.
+        Gọi sau khi đã ghi dữ liệu để bản xuất dựng theo revision cũ không bị dùng lại.
+        """
+        self._write_json(self._playlist_key(playlist_id, 'revision.json'), {
+            'revision': uuid.uuid4().hex,
+            'updated': datetime.now().isoformat()
+        })
+
+    def get_playlist_revision(self, playlist_id: str) -> str:
+        """
+        Revision hiện tại của playlist, dùng làm khóa cache cho file xuất (ZIP...).
+        Chỉ đọc một file nhỏ nên không phụ thuộc số video trong playlist.
+        """
+        key = self._playlist_key(playlist_id, 'revision.json')
+        revision = self._read_json(key)
+        if revision is None:
+            # Playlist lưu trước khi có revision
+            self._touch_playlist(playlist_id)
+            revision = self._read_json(key)
+        return revision['revision']
+
+    def load_playlist_export(self, playlist_id: str, revision: str, extension: str = 'zip') -> bytes:
+        """Đọc file xuất đã dựng cho đúng revision, None nếu chưa có hoặc đã cũ"""
+        return self.backend.read_bytes(self._playlist_key(playlist_id, 'exports', f"{revision}.{extension}"))
+
+    def save_playlist_export(self, playlist_id: str, revision: str, data: bytes, extension: str = 'zip'):
+        """Lưu file xuất của một revision và xóa các bản của revision cũ"""
+        key = self._playlist_key(playlist_id, 'exports', f"{revision}.{extension}")
+        try:
+            self.backend.write_bytes(key, data)
+            for old_key in self.backend.list(self._playlist_key(playlist_id, 'exports') + '/'):
+                if old_key != key and old_key.endswith(f".{extension}"):
+                    self.backend.delete(old_key)
+        except Exception as e:
+            self.error_handler.log_error("Export Cache Error", str(e), {"playlist_id": playlist_id})
+
+    def iter_playlist_files(self, playlist_id: str):
+        """
+        Sinh ra các file (arcname, nội dung) của playlist từ các object được tham chiếu.
+        Dùng khi xuất ZIP: các file JSON/TXT được tạo lại thay vì lưu nhiều bản sao trên đĩa.
+        """
+        written = set()
+        for ref in self.get_playlist_refs(playlist_id):
+            if not ref.get('object'):
+                # Video gần trùng đã bị bỏ qua khi lưu
+                continue
+            try:
+                transcript_data = self.load_transcript(ref)
+            except Exception as e:
+                self.error_handler.log_error("Object Read Error", str(e), {
+                    "playlist_id": playlist_id,
+                    "video_id": ref.get('video_id'),
+                    "object": ref.get('object')
+                })
+                continue
+            
+            written.add(f"json/{ref['filename']}.json")
+            yield (
+                f"json/{ref['filename']}.json",
+                json.dumps(transcript_data, ensure_ascii=False, indent=2)
+            )
+            written.add(f"txt/{ref['filename']}.txt")
+            yield (
+                f"txt/{ref['filename']}.txt",
+                self.render_text(transcript_data)
+            )
+        
+        # Giữ tương thích với các playlist đã lưu theo cấu trúc cũ (json/, txt/)
+        for folder in ['json', 'txt']:
+            folder_prefix = self._playlist_key(playlist_id, folder) + '/'
+            for key in self.backend.list(folder_prefix):
+                arcname = f"{folder}/{key[len(folder_prefix):]}"
+                if arcname not in written:
+                    yield arcname, self.backend.read_bytes(key)
+        
+        metadata = self._read_json(self._playlist_key(playlist_id, 'metadata.json'))
+        if metadata is not None:
+            yield 'metadata.json', json.dumps(metadata, ensure_ascii=False, indent=2)
+
+    def get_near_duplicate_clusters(self, playlist_id: str) -> list:
+        """
+        Nhóm các video gần trùng trong playlist
+        Returns:
+            Danh sách cụm, mỗi cụm gồm bản gốc và các video gần trùng với nó
+        """
+        clusters = {}
+        titles = {}
+        for ref in self.get_playlist_refs(playlist_id):
+            titles[ref['video_id']] = ref['title']
+            near_duplicate = ref.get('near_duplicate_of')
+            if near_duplicate:
+                cluster = clusters.setdefault(near_duplicate['video_id'], {
+                    'original': {'video_id': near_duplicate['video_id']},
+                    'duplicates': []
+                })
+                cluster['duplicates'].append({
+                    'video_id': ref['video_id'],
+                    'title': ref['title'],
+                    'similarity': near_duplicate['similarity'],
+                    'skipped': not ref.get('object')
+                })
+        
+        for original_id, cluster in clusters.items():
+            # Bản gốc có thể nằm ở playlist khác
+            cluster['original']['title'] = titles.get(original_id)
+            cluster['original']['in_playlist'] = original_id in titles
+        return list(clusters.values())
+
+    def save_job_state(self, playlist_id: str, state: dict):
+        """Lưu trạng thái job bị dừng sớm (video chưa xử lý) vào playlists/<id>/job_state.json"""
+        try:
+            state = dict(state, updated=datetime.now().isoformat())
+            self._write_json(self._playlist_key(playlist_id, 'job_state.json'), state)
+            self.error_handler.log_info(
+                f"Saved job state for playlist {playlist_id} ({len(state.get('pending_video_ids', []))} pending)"
+            )
+            return True
+        except Exception as e:
+            self.error_handler.log_error("Job State Storage Error", str(e), {
+                "playlist_id": playlist_id
+            })
+            return False
+
+    def get_job_state(self, playlist_id: str) -> dict:
+        """Lấy trạng thái job dừng sớm gần nhất của playlist (None nếu job trước đã chạy hết)"""
+        return self._read_json(self._playlist_key(playlist_id, 'job_state.json'))
+
+    def clear_job_state(self, playlist_id: str):
+        """Xóa trạng thái job dừng sớm khi playlist đã được xử lý hết"""
+        state_key = self._playlist_key(playlist_id, 'job_state.json')
+        if self.backend.exists(state_key):
+            self.backend.delete(state_key)
+
     def save_metadata(self, playlist_id: str, metadata: dict):
         """Lưu metadata của playlist"""
         try:
-            playlist_path, _, _ = self.create_playlist_directory(playlist_id)
-            file_path = os.path.join(playlist_path, "metadata.json")
-            
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(metadata, f, ensure_ascii=False, indent=2)
+            metadata_key = self._playlist_key(playlist_id, 'metadata.json')
+            previous = self._read_json(metadata_key)
+            if previous is not None and dict(previous, updated=None) == dict(metadata, updated=None):
+                # Không đổi nội dung: giữ nguyên file và revision (bản ZIP đã dựng vẫn dùng được)
+                return True
+            self._write_json(metadata_key, metadata)
+            self._touch_playlist(playlist_id)
             
             self.error_handler.log_info(f"Saved metadata for playlist {playlist_id}")
             return True
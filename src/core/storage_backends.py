@@ -0,0 +1,284 @@
+import io
+import os
+import shutil
+import threading
+import time
+import uuid
+try:
+    import boto3
+    from boto3.s3.transfer import TransferConfig
+    from botocore.exceptions import ClientError
+except ImportError:
+    boto3 = None
+
+
+class StorageBackend:
+    """
+    Nơi lưu dữ liệu của DataStorage, truy cập theo khóa dạng đường dẫn tương đối
+    (vd: 'playlists/<id>/refs/<video_id>.json', 'objects/ab/<hash>.json')
+    """
+    name = 'base'
+    # Bản ghi có thể xuất hiện muộn hơn thời điểm ghi trong tên (upload chậm, lệch đồng hồ giữa các node):
+    # khi đọc tiếp log, các khóa trong khoảng này trước khóa mới nhất được liệt kê lại
+    RECORD_LOOKBACK_NS = 5 * 60 * 10 ** 9
+
+    @property
+    def location(self) -> str:
+        """Định danh kho lưu trữ: hai backend cùng location dùng chung dữ liệu"""
+        return f"{self.name}:{id(self)}"
+
+    def read_bytes(self, key: str) -> bytes:
+        """Đọc nội dung theo khóa, None nếu không tồn tại"""
+        raise NotImplementedError
+
+    def write_bytes(self, key: str, data: bytes):
+        self.write_stream(key, io.BytesIO(data))
+
+    def write_stream(self, key: str, fileobj):
+        """Ghi nội dung từ file-like object (đọc theo từng phần, không cần giữ toàn bộ trong bộ nhớ)"""
+        raise NotImplementedError
+
+    def exists(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        raise NotImplementedError
+
+    def list(self, prefix: str) -> list:
+        """Danh sách khóa (đã sắp xếp) bắt đầu bằng prefix"""
+        raise NotImplementedError
+
+    def append_record(self, log_key: str, line: str):
+        """
+        Ghi thêm một bản ghi (một dòng JSON) vào log log_key, an toàn khi nhiều node cùng ghi.
+        Mặc định mỗi bản ghi là một object riêng <log_key>/<thời điểm>-<uuid>.json vì object store
+        không hỗ trợ append (đọc-sửa-ghi cả file sẽ làm mất bản ghi của node ghi đồng thời).
+        """
+        self.write_bytes(f"{log_key}/{time.time_ns():020d}-{uuid.uuid4().hex}.json", line.encode('utf-8'))
+
+    def read_records(self, log_key: str) -> list:
+        """Các bản ghi của log theo thứ tự ghi (gồm cả file <log_key>.jsonl nếu có)"""
+        lines = []
+        data = self.read_bytes(f"{log_key}.jsonl")
+        if data:
+            lines.extend(line for line in data.decode('utf-8').splitlines() if line.strip())
+        for key in self.list(f"{log_key}/"):
+            lines.append(self.read_bytes(key).decode('utf-8').strip())
+        return lines
+
+    def read_new_records(self, log_key: str, cursor=None) -> tuple:
+        """
+        Đọc tiếp log: các bản ghi được ghi thêm sau cursor, để không phải đọc lại toàn bộ log
+        Args:
+            cursor: Giá trị trả về từ lần đọc trước (None để đọc từ đầu)
+        Returns:
+            (danh sách bản ghi mới, cursor cho lần đọc sau)
+        """
+        offset, seen = cursor or (0, frozenset())
+        lines, offset = self._read_log_file(log_key, offset)
+
+        prefix = f"{log_key}/"
+        start_after = None
+        if seen:
+            newest = max(self._record_time(prefix, key) for key in seen)
+            start_after = f"{prefix}{max(newest - self.RECORD_LOOKBACK_NS, 0):020d}"
+        keys = self._list_after(prefix, start_after)
+        for key in keys:
+            if key not in seen:
+                lines.append(self.read_bytes(key).decode('utf-8').strip())
+        if keys:
+            # Chỉ cần nhớ các khóa còn nằm trong khoảng được liệt kê lại
+            oldest = max(self._record_time(prefix, key) for key in keys) - self.RECORD_LOOKBACK_NS
+            seen = frozenset(key for key in seen.union(keys) if self._record_time(prefix, key) >= oldest)
+        return lines, (offset, seen)
+
+    @staticmethod
+    def _record_time(prefix: str, key: str) -> int:
+        """Thời điểm ghi (ns) trong tên object của bản ghi <prefix><time_ns>-<uuid>.json"""
+        return int(key[len(prefix):].split('-', 1)[0])
+
+    def _list_after(self, prefix: str, start_after: str = None) -> list:
+        """Các khóa (đã sắp xếp) bắt đầu bằng prefix và lớn hơn start_after"""
+        return [key for key in self.list(prefix) if start_after is None or key > start_after]
+
+    def _read_log_file(self, log_key: str, offset: int) -> tuple:
+        """Các dòng hoàn chỉnh của <log_key>.jsonl sau byte offset, và offset mới"""
+        data = self.read_bytes(f"{log_key}.jsonl") or b''
+        # Bỏ dòng cuối chưa ghi xong, sẽ được đọc ở lần sau
+        end = data.rfind(b'\n') + 1
+        if end <= offset:
+            return [], offset
+        return [line for line in data[offset:end].decode('utf-8').splitlines() if line.strip()], end
+
+
+class LocalStorageBackend(StorageBackend):
+    """Lưu trên đĩa cục bộ (mặc định)"""
+    name = 'local'
+
+    def __init__(self, base_path: str):
+        self.base_path = base_path
+
+    @property
+    def location(self) -> str:
+        return f"local:{os.path.realpath(self.base_path)}"
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.base_path, *key.split('/'))
+
+    def read_bytes(self, key: str) -> bytes:
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def write_stream(self, key: str, fileobj):
+        # Ghi ra file tạm rồi đổi tên để tránh file bị ghi dở
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            shutil.copyfileobj(fileobj, f)
+        os.replace(tmp_path, path)
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self._path(key))
+
+    def delete(self, key: str):
+        path = self._path(key)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def list(self, prefix: str) -> list:
+        root = self._path(prefix.rstrip('/'))
+        if not os.path.isdir(root):
+            return []
+        keys = []
+        for dirpath, _, filenames in os.walk(root):
+            for filename in filenames:
+                if filename.endswith('.tmp'):
+                    continue
+                relative = os.path.relpath(os.path.join(dirpath, filename), self.base_path)
+                keys.append(relative.replace(os.sep, '/'))
+        return sorted(keys)
+
+    def append_record(self, log_key: str, line: str):
+        # Trên đĩa cục bộ append vào một file <log_key>.jsonl (mỗi lần ghi một dòng là nguyên tử)
+        path = self._path(f"{log_key}.jsonl")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(line + '\n')
+
+    def _read_log_file(self, log_key: str, offset: int) -> tuple:
+        # Chỉ đọc phần được ghi thêm sau offset
+        path = self._path(f"{log_key}.jsonl")
+        if not os.path.exists(path):
+            return [], offset
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            data = f.read()
+        end = data.rfind(b'\n') + 1
+        if not end:
+            return [], offset
+        return [line for line in data[:end].decode('utf-8').splitlines() if line.strip()], offset + end
+
+
+class S3StorageBackend(StorageBackend):
+    """
+    Lưu trên object store tương thích S3 (AWS S3, MinIO...) để nhiều node dùng chung dữ liệu.
+    File lớn được tải lên theo multipart; endpoint_url cho phép chạy với MinIO/moto khi kiểm thử.
+    """
+    name = 's3'
+
+    def __init__(self, bucket: str, prefix: str = '', endpoint_url: str = None, region_name: str = None,
+                 multipart_threshold: int = 8 * 1024 * 1024, multipart_chunksize: int = 8 * 1024 * 1024):
+        if boto3 is None:
+            raise ImportError("S3 storage backend cần thư viện boto3 (pip install boto3)")
+        self.bucket = bucket
+        self.prefix = prefix.strip('/')
+        # boto3 client an toàn khi dùng chung giữa các luồng
+        self.client = boto3.client('s3', endpoint_url=endpoint_url, region_name=region_name)
+        self.transfer_config = TransferConfig(
+            multipart_threshold=multipart_threshold,
+            multipart_chunksize=multipart_chunksize
+        )
+
+    @property
+    def location(self) -> str:
+        return f"s3://{self.bucket}/{self.prefix}"
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    @staticmethod
+    def _is_not_found(error: Exception) -> bool:
+        code = error.response.get('Error', {}).get('Code')
+        return code in ('404', 'NoSuchKey', 'NotFound')
+
+    def read_bytes(self, key: str) -> bytes:
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=self._key(key))
+        except ClientError as e:
+            if self._is_not_found(e):
+                return None
+            raise
+        return response['Body'].read()
+
+    def write_stream(self, key: str, fileobj):
+        self.client.upload_fileobj(fileobj, self.bucket, self._key(key), Config=self.transfer_config)
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+            return True
+        except ClientError as e:
+            if self._is_not_found(e):
+                return False
+            raise
+
+    def delete(self, key: str):
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+
+    def list(self, prefix: str) -> list:
+        full_prefix = self._key(prefix)
+        strip = len(self.prefix) + 1 if self.prefix else 0
+        keys = []
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=full_prefix):
+            for item in page.get('Contents', []):
+                keys.append(item['Key'][strip:])
+        return sorted(keys)
+
+    def _list_after(self, prefix: str, start_after: str = None) -> list:
+        # S3 liệt kê theo thứ tự khóa nên StartAfter bỏ qua phần log đã đọc mà không tốn request
+        if start_after is None:
+            return self.list(prefix)
+        strip = len(self.prefix) + 1 if self.prefix else 0
+        keys = []
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self._key(prefix),
+                                       StartAfter=self._key(start_after)):
+            for item in page.get('Contents', []):
+                keys.append(item['Key'][strip:])
+        return sorted(keys)
+
+
+def create_storage_backend(base_path: str) -> StorageBackend:
+    """
+    Tạo backend theo biến môi trường STORAGE_BACKEND ('local' mặc định hoặc 's3').
+    Với s3: STORAGE_S3_BUCKET, STORAGE_S3_PREFIX, STORAGE_S3_ENDPOINT_URL, STORAGE_S3_REGION;
+    thông tin đăng nhập lấy theo cấu hình chuẩn của boto3 (AWS_ACCESS_KEY_ID...).
+    """
+    backend = os.environ.get('STORAGE_BACKEND', 'local').lower()
+    if backend == 's3':
+        bucket = os.environ.get('STORAGE_S3_BUCKET', '').strip()
+        if not bucket:
+            raise ValueError("STORAGE_BACKEND=s3 cần cấu hình biến môi trường STORAGE_S3_BUCKET")
+        return S3StorageBackend(
+            bucket=bucket,
+            prefix=os.environ.get('STORAGE_S3_PREFIX', ''),
+            endpoint_url=os.environ.get('STORAGE_S3_ENDPOINT_URL') or None,
+            region_name=os.environ.get('STORAGE_S3_REGION') or None,
+            multipart_chunksize=int(os.environ.get('STORAGE_S3_MULTIPART_CHUNKSIZE', 8 * 1024 * 1024))
+        )
+    return LocalStorageBackend(base_path)
@@ -1,11 +1,63 @@
-from youtube_transcript_api import YouTubeTranscriptApi
-from youtube_transcript_api._errors import NoTranscriptFound, TranscriptsDisabled
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from youtube_transcript_api import NoTranscriptFound, TranscriptsDisabled
 from ..utils.error_handler import ErrorHandler
+from ..utils.metrics import Metrics
+from ..utils.profiler import propagate_profiling
+from .metadata_cache import MetadataCache
+from .negative_cache import NegativeCache
+from .rate_limiter import RateLimiter
+from .scheduler import FetchScheduler
+from .transport import HttpTransport
+from .retry import FailureReason, RetryPolicy, classify_error
+from .transcript_backends import create_backends, normalize_segments
 from datetime import datetime
 
+_HEDGE_EXECUTOR = None
+_HEDGE_EXECUTOR_LOCK = threading.Lock()
+
+
+def _hedge_executor() -> ThreadPoolExecutor:
+    """
+    Luồng dùng chung để chạy backend khi hedging. Mọi lượt tải đều giữ một slot của FetchScheduler
+    và mỗi slot có tối đa một request chính và một request dự phòng chạy cùng lúc.
+    """
+    global _HEDGE_EXECUTOR
+    with _HEDGE_EXECUTOR_LOCK:
+        if _HEDGE_EXECUTOR is None:
+            _HEDGE_EXECUTOR = ThreadPoolExecutor(
+                max_workers=FetchScheduler().max_concurrency * 2,
+                thread_name_prefix='transcript-hedge'
+            )
+        return _HEDGE_EXECUTOR
+
+
 class TranscriptExtractor:
+    # Lỗi do không được cấp lượt tải (không phải lỗi của video): không ghi log lỗi tải, để nơi gọi xử lý
+    SCHEDULER_REASONS = frozenset({
+        FailureReason.QUOTA_EXCEEDED, FailureReason.CANCELLED, FailureReason.DEADLINE_EXCEEDED
+    })
+
     def __init__(self):
         self.error_handler = ErrorHandler()
+        self.retry_policy = RetryPolicy()
+        self.rate_limiter = RateLimiter()
+        self.transport = HttpTransport()
+        self.negative_cache = NegativeCache()
+        self.metadata_cache = MetadataCache()
+        self.metrics = Metrics()
+        self.scheduler = FetchScheduler()
+        # Backend theo thứ tự ưu tiên; backend sau chỉ được gọi khi backend trước chậm hoặc lỗi tạm thời
+        self.backends = create_backends(
+            os.environ.get('TRANSCRIPT_BACKENDS', 'youtube_transcript_api,yt_dlp').split(','),
+            self.rate_limiter,
+            self.transport
+        )
+        # Số giây chờ backend chính trước khi gửi request dự phòng (<= 0 để tắt hedging)
+        self.hedge_delay = float(os.environ.get('TRANSCRIPT_HEDGE_DELAY', 4))
         # Định nghĩa các ngôn ngữ phổ biến
         self.common_languages = {
             'en': 'English',
@@ -28,22 +80,38 @@ class TranscriptExtractor:
             title: Tiêu đề video
             language_code: Mã ngôn ngữ cần tải
         """
+        transcript_data, _ = self.fetch_transcript(video_id, title, language_code)
+        return transcript_data
+
+    def fetch_transcript(self, video_id: str, title: str, language_code: str = 'en', control=None,
+                         user_id: str = None, priority: int = FetchScheduler.BULK) -> tuple:
+        """
+        Tải transcript kèm loại lỗi nếu thất bại
+        Lỗi tạm thời (429, 5xx, timeout) được tự động thử lại với backoff,
+        lỗi vĩnh viễn được ghi vào negative cache để bỏ qua ở các lần chạy sau.
+        control (JobControl) dừng việc thử lại khi job bị hủy hoặc hết thời gian.
+        Mỗi lần thử chờ một lượt của FetchScheduler theo user_id/priority (xem _in_slot).
+        Returns:
+            (transcript_data, failure_reason): một trong hai giá trị là None
+        Raises:
+            TranscriptFetchError: không được cấp lượt tải (hết hạn mức ngày, job dừng khi đang chờ)
+        """
+        cached_reason = self.negative_cache.get(video_id, language_code)
+        if cached_reason:
+            self.error_handler.log_info(f"Bỏ qua video {title}: lỗi vĩnh viễn đã được cache ({cached_reason})")
+            return None, cached_reason
+
+        def on_retry(attempt, reason, delay):
+            self.error_handler.log_warning(
+                f"Lỗi tạm thời ({reason}) khi tải video {title}, thử lại lần {attempt + 1} sau {delay:.1f}s"
+            )
+
         try:
-            # Thử tải transcript với ngôn ngữ được chọn
-            try:
-                transcript = YouTubeTranscriptApi.get_transcript(video_id, languages=[language_code])
-            except NoTranscriptFound:
-                # Nếu không tìm thấy, thử tải bản tiếng Anh và dịch
-                if language_code != 'en':
-                    try:
-                        transcript_list = YouTubeTranscriptApi.list_transcripts(video_id)
-                        transcript = transcript_list.find_transcript(['en']).translate(language_code).fetch()
-                        self.error_handler.log_info(f"Đã dịch transcript từ tiếng Anh sang {language_code}")
-                    except:
-                        self.error_handler.log_warning(f"Không thể dịch transcript sang {language_code}")
-                        raise
-                else:
-                    raise
+            transcript = self.retry_policy.call(
+                self._in_slot(lambda: self._fetch_segments(video_id, language_code), control, user_id, priority),
+                on_retry=on_retry,
+                control=control
+            )
             
             transcript_data = {
                 "video_id": video_id,
@@ -57,18 +125,145 @@ class TranscriptExtractor:
             }
             
             self.error_handler.log_info(f"Đã tải transcript cho video {video_id} - {title}")
-            return transcript_data
-
-        except NoTranscriptFound:
-            self.error_handler.log_warning(f"Không tìm thấy phụ đề {language_code} cho video {title}")
-            return None
-        except TranscriptsDisabled:
-            self.error_handler.log_warning(f"Video {title} đã tắt phụ đề")
-            return None
+            return transcript_data, None
+
         except Exception as e:
-            self.error_handler.log_error("Lỗi tải transcript", str(e), {
-                "video_id": video_id,
-                "title": title,
-                "language": language_code
-            })
-            return None
\ No newline at end of file
+            reason = classify_error(e)
+            if reason in self.SCHEDULER_REASONS:
+                raise
+            if isinstance(e, NoTranscriptFound):
+                self.error_handler.log_warning(f"Không tìm thấy phụ đề {language_code} cho video {title}")
+            elif isinstance(e, TranscriptsDisabled):
+                self.error_handler.log_warning(f"Video {title} đã tắt phụ đề")
+            else:
+                self.error_handler.log_error("Lỗi tải transcript", str(e), {
+                    "video_id": video_id,
+                    "title": title,
+                    "language": language_code,
+                    "reason": reason
+                })
+            
+            if FailureReason.is_permanent(reason):
+                self.negative_cache.add(video_id, language_code, reason)
+            return None, reason
+
+    def list_tracks(self, video_id: str, control=None, user_id: str = None,
+                    priority: int = FetchScheduler.BULK) -> dict:
+        """
+        Lấy danh sách phụ đề có sẵn của video (không tải nội dung), có cache.
+        Video tắt phụ đề/không tồn tại cũng được cache; lỗi tạm thời thì không.
+        Khi chưa có trong cache, request đi qua một lượt của FetchScheduler như khi tải transcript.
+        Returns:
+            dict {'tracks': [...], 'error_type': None hoặc loại lỗi}
+        """
+        failure = {}
+
+        def fetch():
+            try:
+                tracks = self.retry_policy.call(
+                    self._in_slot(lambda: self.backends[0].list_tracks(video_id), control, user_id, priority),
+                    control=control
+                )
+                return {'tracks': tracks, 'error_type': None}
+            except Exception as e:
+                reason = classify_error(e)
+                if FailureReason.is_permanent(reason):
+                    return {'tracks': [], 'error_type': reason}
+                self.error_handler.log_warning(f"Không lấy được danh sách phụ đề của video {video_id}: {reason}")
+                failure['error_type'] = reason
+                return None
+
+        result = self.metadata_cache.get_or_fetch('tracks', video_id, fetch)
+        return result or {'tracks': [], 'error_type': failure.get('error_type', FailureReason.UNKNOWN)}
+
+    def _in_slot(self, func, control, user_id: str, priority: int):
+        """
+        Bọc func để mỗi lần thử chạy trong một lượt riêng của FetchScheduler: lượt được trả lại trong lúc
+        RetryPolicy chờ backoff nên không chiếm chỗ của người dùng khác. Chỉ lần thử đầu tính vào hạn mức ngày.
+        """
+        attempts = itertools.count()
+
+        def attempt():
+            with self.scheduler.slot(user_id, priority, control, charge=next(attempts) == 0):
+                return func()
+        return attempt
+
+    def _fetch_segments(self, video_id: str, language_code: str) -> list:
+        """Tải danh sách segment của transcript (một lần thử, không bắt lỗi)"""
+        if len(self.backends) == 1 or self.hedge_delay <= 0:
+            return normalize_segments(self.backends[0].fetch(video_id, language_code))
+        return self._fetch_hedged(video_id, language_code)
+
+    @staticmethod
+    def _submit_fetch(backend, video_id: str, language_code: str) -> tuple:
+        """
+        Gửi request tới backend qua executor dùng chung
+        Returns:
+            (future, started): started['at'] là thời điểm request thực sự bắt đầu chạy
+            (None khi còn chờ luồng trống trong executor)
+        """
+        started = {'at': None}
+        fetch = propagate_profiling(backend.fetch)
+
+        def run():
+            started['at'] = time.monotonic()
+            return fetch(video_id, language_code)
+        return _hedge_executor().submit(run), started
+
+    def _fetch_hedged(self, video_id: str, language_code: str) -> list:
+        """
+        Gọi backend chính; nếu chạy quá hedge_delay chưa xong (hoặc lỗi tạm thời) thì gửi thêm
+        request tới backend kế tiếp và lấy kết quả thành công đầu tiên.
+        Thời gian chờ tính từ lúc request bắt đầu chạy, không tính thời gian xếp hàng trong executor.
+        Nếu tất cả đều lỗi, ném lỗi của backend chính.
+        """
+        primary = self.backends[0]
+        remaining = list(self.backends[1:])
+        future, started = self._submit_fetch(primary, video_id, language_code)
+        futures = {future: primary}
+        deadline = time.monotonic() + self.hedge_delay
+        errors = {}
+
+        try:
+            while futures:
+                timeout = max(0.0, deadline - time.monotonic()) if remaining else None
+                done, _ = wait(futures, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    backend = futures.pop(future)
+                    try:
+                        segments = future.result()
+                    except Exception as e:
+                        errors[backend] = e
+                        self.error_handler.log_debug(f"Backend {backend.name} lỗi với video {video_id}: {e}")
+                        continue
+                    self.metrics.increment(f'transcript.backend.{backend.name}')
+                    return normalize_segments(segments)
+
+                if not done and futures:
+                    # Request mới nhất chưa chạy (executor đang bận) hoặc chưa chạy đủ hedge_delay: chờ tiếp
+                    if started['at'] is None:
+                        deadline = time.monotonic() + self.hedge_delay
+                        continue
+                    if time.monotonic() < started['at'] + self.hedge_delay:
+                        deadline = started['at'] + self.hedge_delay
+                        continue
+
+                # Backend đang chạy quá hạn, hoặc mọi backend đã lỗi nhưng lỗi có thể khắc phục ở backend khác
+                timed_out = not done
+                failed_transient = not futures and not FailureReason.is_permanent(classify_error(errors[primary]))
+                if remaining and (timed_out or failed_transient):
+                    backend = remaining.pop(0)
+                    self.metrics.increment('transcript.hedged')
+                    self.error_handler.log_info(
+                        f"Gửi request dự phòng qua {backend.name} cho video {video_id} "
+                        f"({'quá ' + str(self.hedge_delay) + 's' if timed_out else 'backend chính lỗi'})"
+                    )
+                    future, started = self._submit_fetch(backend, video_id, language_code)
+                    futures[future] = backend
+                    deadline = time.monotonic() + self.hedge_delay
+        finally:
+            # Request thua: hủy nếu còn xếp hàng trong executor, nếu đã chạy thì bỏ qua kết quả
+            for future in futures:
+                future.cancel()
+
+        raise errors[primary]
@@ -0,0 +1,192 @@
+import re
+from importlib.metadata import PackageNotFoundError, version
+from yt_dlp import YoutubeDL
+from youtube_transcript_api import NoTranscriptFound, YouTubeTranscriptApi
+from ..utils.error_handler import ErrorHandler
+from .retry import FailureReason, TranscriptFetchError
+from .transport import REQUEST_TIMEOUT
+
+
+def _package_major(package: str, default: int = 0) -> int:
+    """Phiên bản chính (major) của package đã cài, default nếu không xác định được"""
+    try:
+        match = re.match(r'\d+', version(package))
+    except PackageNotFoundError:
+        return default
+    return int(match.group()) if match else default
+
+
+# API công khai của youtube_transcript_api khác nhau giữa 0.6.x (classmethod list_transcripts)
+# và 1.x (instance YouTubeTranscriptApi(http_client=...).list)
+YOUTUBE_TRANSCRIPT_API_MAJOR = _package_major('youtube-transcript-api')
+
+
+def list_transcripts(video_id: str, http_client):
+    """
+    Danh sách phụ đề của video qua API công khai của youtube_transcript_api
+    Args:
+        http_client: requests.Session của HttpTransport (proxy, keep-alive)
+    """
+    if YOUTUBE_TRANSCRIPT_API_MAJOR >= 1:
+        return YouTubeTranscriptApi(http_client=http_client).list(video_id)
+    # 0.6.x không nhận session từ bên ngoài, chỉ dùng lại proxy của session
+    return YouTubeTranscriptApi.list_transcripts(video_id, proxies=http_client.proxies or None)
+
+
+def normalize_segments(segments) -> list:
+    """
+    Chuẩn hóa segment của mọi backend về cùng một dạng
+    {'text': str, 'start': float, 'duration': float}
+    """
+    normalized = []
+    for segment in segments:
+        if not isinstance(segment, dict):
+            # Một số phiên bản youtube_transcript_api trả về object thay vì dict
+            segment = {
+                'text': getattr(segment, 'text', ''),
+                'start': getattr(segment, 'start', 0),
+                'duration': getattr(segment, 'duration', 0)
+            }
+        normalized.append({
+            'text': segment.get('text') or '',
+            'start': float(segment.get('start') or 0),
+            'duration': float(segment.get('duration') or 0)
+        })
+    return normalized
+
+
+class TranscriptBackend:
+    """Nguồn tải transcript; fetch() trả về danh sách segment hoặc ném exception"""
+    name = 'base'
+
+    def __init__(self, rate_limiter, transport):
+        self.rate_limiter = rate_limiter
+        self.transport = transport
+        self.error_handler = ErrorHandler()
+
+    def fetch(self, video_id: str, language_code: str) -> list:
+        raise NotImplementedError
+
+    def list_tracks(self, video_id: str) -> list:
+        """
+        Danh sách phụ đề có sẵn (không tải nội dung phụ đề)
+        Returns:
+            list dict {'language', 'name', 'generated', 'translatable'}
+        """
+        raise NotImplementedError
+
+
+class YouTubeTranscriptApiBackend(TranscriptBackend):
+    """Tải phụ đề qua youtube_transcript_api (backend chính)"""
+    name = 'youtube_transcript_api'
+
+    def list_tracks(self, video_id: str) -> list:
+        with self.rate_limiter.request(), self.transport.session() as http_client:
+            return [
+                {
+                    'language': transcript.language_code,
+                    'name': transcript.language,
+                    'generated': transcript.is_generated,
+                    'translatable': transcript.is_translatable
+                }
+                for transcript in list_transcripts(video_id, http_client)
+            ]
+
+    def fetch(self, video_id: str, language_code: str) -> list:
+        with self.rate_limiter.request(), self.transport.session() as http_client:
+            transcript_list = list_transcripts(video_id, http_client)
+
+            # Thử tải transcript với ngôn ngữ được chọn
+            try:
+                return transcript_list.find_transcript([language_code]).fetch()
+            except NoTranscriptFound:
+                # Nếu không tìm thấy, thử tải bản tiếng Anh và dịch
+                if language_code == 'en':
+                    raise
+                try:
+                    transcript = transcript_list.find_transcript(['en']).translate(language_code).fetch()
+                    self.error_handler.log_info(f"Đã dịch transcript từ tiếng Anh sang {language_code}")
+                    return transcript
+                except:
+                    self.error_handler.log_warning(f"Không thể dịch transcript sang {language_code}")
+                    raise
+
+
+class YtDlpSubtitleBackend(TranscriptBackend):
+    """Tải phụ đề qua yt-dlp (định dạng json3), dùng làm backend dự phòng"""
+    name = 'yt_dlp'
+
+    def __init__(self, rate_limiter, transport, timeout: float = REQUEST_TIMEOUT):
+        super().__init__(rate_limiter, transport)
+        self.timeout = timeout
+
+    def _select_track(self, info: dict, language_code: str) -> dict:
+        """Ưu tiên phụ đề do người đăng tạo, sau đó tới phụ đề tự động (gồm cả bản dịch tự động)"""
+        for source in ('subtitles', 'automatic_captions'):
+            for track in (info.get(source) or {}).get(language_code) or []:
+                if track.get('ext') == 'json3' and track.get('url'):
+                    return track
+        raise TranscriptFetchError(
+            FailureReason.NO_TRANSCRIPT,
+            f"yt-dlp không tìm thấy phụ đề {language_code} cho video {info.get('id')}"
+        )
+
+    @staticmethod
+    def _parse_json3(document: dict) -> list:
+        segments = []
+        for event in document.get('events') or []:
+            text = ''.join(seg.get('utf8', '') for seg in event.get('segs') or []).strip()
+            if not text:
+                continue
+            segments.append({
+                'text': text,
+                'start': event.get('tStartMs', 0) / 1000,
+                'duration': event.get('dDurationMs', 0) / 1000
+            })
+        return segments
+
+    def _extract_info(self, video_id: str, http_client) -> dict:
+        ydl_opts = {
+            'quiet': True,
+            'no_warnings': True,
+            'skip_download': True,
+            'socket_timeout': self.timeout
+        }
+        proxy = (http_client.proxies or {}).get('https')
+        if proxy:
+            ydl_opts['proxy'] = proxy
+
+        with self.rate_limiter.request(), YoutubeDL(ydl_opts) as ydl:
+            return ydl.extract_info(f"https://www.youtube.com/watch?v={video_id}", download=False)
+
+    def list_tracks(self, video_id: str) -> list:
+        with self.transport.session() as http_client:
+            info = self._extract_info(video_id, http_client)
+        tracks = []
+        for source, generated in (('subtitles', False), ('automatic_captions', True)):
+            for language, formats in (info.get(source) or {}).items():
+                if any(track.get('ext') == 'json3' for track in formats or []):
+                    tracks.append({'language': language, 'name': language, 'generated': generated, 'translatable': False})
+        return tracks
+
+    def fetch(self, video_id: str, language_code: str) -> list:
+        with self.transport.session() as http_client:
+            info = self._extract_info(video_id, http_client)
+            track = self._select_track(info, language_code)
+
+            with self.rate_limiter.request():
+                response = http_client.get(track['url'], timeout=self.timeout)
+                response.raise_for_status()
+            return self._parse_json3(response.json())
+
+
+BACKENDS = {
+    YouTubeTranscriptApiBackend.name: YouTubeTranscriptApiBackend,
+    YtDlpSubtitleBackend.name: YtDlpSubtitleBackend
+}
+
+
+def create_backends(names: list, rate_limiter, transport) -> list:
+    """Tạo danh sách backend theo thứ tự ưu tiên, bỏ qua tên không hợp lệ"""
+    backends = [BACKENDS[name](rate_limiter, transport) for name in names if name in BACKENDS]
+    return backends or [YouTubeTranscriptApiBackend(rate_limiter, transport)]
@@ -0,0 +1,335 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from ..utils.error_handler import ErrorHandler
+
+
+class WorkQueue:
+    """
+    Hàng đợi công việc bền vững dùng chung giữa nhiều tiến trình worker.
+    Mỗi video của job là một task; worker nhận task theo lease có thời hạn,
+    gia hạn bằng heartbeat, task có lease hết hạn được giao lại cho worker khác.
+    """
+
+    def submit_job(self, job_id: str, videos: list, membership: dict, language: str, user_id: str = None) -> int:
+        """Tạo job với mỗi video (không trùng lặp) là một task, trả về số task"""
+        raise NotImplementedError
+
+    def lease(self, worker_id: str, lease_seconds: float) -> dict:
+        """Nhận một task đang chờ (hoặc có lease đã hết hạn), None nếu không có"""
+        raise NotImplementedError
+
+    def heartbeat(self, task_id: int, worker_id: str, lease_seconds: float) -> bool:
+        """Gia hạn lease; False nếu worker đã mất lease"""
+        raise NotImplementedError
+
+    def complete(self, task_id: int, worker_id: str, status: str, error_type: str = None,
+                 error: str = None, elapsed: float = None) -> bool:
+        """Ghi kết quả task; False nếu worker đã mất lease"""
+        raise NotImplementedError
+
+    def cancel_job(self, job_id: str, reason: str):
+        """Dừng job: các task chưa được nhận (hoặc lease đã hết hạn) bị đánh dấu lỗi reason"""
+        raise NotImplementedError
+
+    def job_progress(self, job_id: str) -> dict:
+        """Số task theo trạng thái: total, queued, leased, active (lease còn hạn), success, failed"""
+        raise NotImplementedError
+
+    def completed_tasks(self, job_id: str, after_seq: int = 0) -> list:
+        """Các task đã xong theo thứ tự hoàn thành, sau vị trí after_seq"""
+        raise NotImplementedError
+
+    def active_leases(self) -> int:
+        """Số task (của mọi job) đang được worker xử lý với lease còn hạn"""
+        raise NotImplementedError
+
+
+class SQLiteWorkQueue(WorkQueue):
+    """
+    Hàng đợi trên SQLite (WAL) cho nhiều tiến trình worker trên cùng một máy.
+    Không đặt file hàng đợi trên ổ mạng (NFS, SMB...): WAL cần bộ nhớ chia sẻ giữa các
+    tiến trình và khóa file qua mạng không đáng tin cậy, hàng đợi có thể bị hỏng.
+    """
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS jobs (
+            job_id TEXT PRIMARY KEY,
+            language TEXT NOT NULL,
+            user_id TEXT,
+            created REAL NOT NULL,
+            cancelled TEXT
+        );
+        CREATE TABLE IF NOT EXISTS tasks (
+            task_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            job_id TEXT NOT NULL,
+            video_id TEXT NOT NULL,
+            title TEXT,
+            playlist_ids TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'queued',
+            worker_id TEXT,
+            lease_expires REAL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            error_type TEXT,
+            error TEXT,
+            elapsed REAL,
+            completed_seq INTEGER,
+            UNIQUE (job_id, video_id)
+        );
+        CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks (status, task_id);
+        CREATE INDEX IF NOT EXISTS idx_tasks_completed ON tasks (job_id, completed_seq);
+    """
+
+    def __init__(self, path: str, max_attempts: int = 5):
+        self.error_handler = ErrorHandler()
+        self.path = path
+        self.max_attempts = max_attempts
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._connect().executescript(self._SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        # Mỗi luồng một kết nối (kết nối SQLite không dùng chung giữa các luồng)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA busy_timeout=30000')
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        """Giao dịch ghi độc quyền (BEGIN IMMEDIATE) để nhiều worker không nhận trùng task"""
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        else:
+            conn.execute('COMMIT')
+
+    @staticmethod
+    def _finish(conn, task_id: int, job_id: str, status: str, error_type: str = None,
+                error: str = None, elapsed: float = None):
+        """Đánh dấu task hoàn thành và gán số thứ tự hoàn thành trong job"""
+        conn.execute(
+            """UPDATE tasks SET status = ?, error_type = ?, error = ?, elapsed = ?, lease_expires = NULL,
+                   completed_seq = (SELECT COALESCE(MAX(completed_seq), 0) + 1 FROM tasks WHERE job_id = ?)
+               WHERE task_id = ?""",
+            (status, error_type, error, elapsed, job_id, task_id)
+        )
+
+    def submit_job(self, job_id: str, videos: list, membership: dict, language: str, user_id: str = None) -> int:
+        with self._transaction() as conn:
+            conn.execute(
+                'INSERT INTO jobs (job_id, language, user_id, created) VALUES (?, ?, ?, ?)',
+                (job_id, language, user_id, time.time())
+            )
+            conn.executemany(
+                'INSERT OR IGNORE INTO tasks (job_id, video_id, title, playlist_ids) VALUES (?, ?, ?, ?)',
+                [
+                    (job_id, video['video_id'], video.get('title'), json.dumps(membership[video['video_id']]))
+                    for video in videos
+                ]
+            )
+        self.error_handler.log_info(f"Đã đưa job {job_id} vào hàng đợi ({len(videos)} video)")
+        return len(videos)
+
+    def lease(self, worker_id: str, lease_seconds: float) -> dict:
+        now = time.time()
+        with self._transaction() as conn:
+            while True:
+                row = conn.execute(
+                    """SELECT t.*, j.language, j.user_id FROM tasks t JOIN jobs j ON j.job_id = t.job_id
+                       WHERE j.cancelled IS NULL
+                         AND (t.status = 'queued' OR (t.status = 'leased' AND t.lease_expires < ?))
+                       ORDER BY t.task_id LIMIT 1""",
+                    (now,)
+                ).fetchone()
+                if row is None:
+                    return None
+                if row['attempts'] >= self.max_attempts:
+                    # Worker liên tục chết khi xử lý video này: dừng giao lại
+                    self._finish(conn, row['task_id'], row['job_id'], 'failed', 'lease_expired',
+                                 f"Lease hết hạn sau {row['attempts']} lần nhận")
+                    continue
+                if row['status'] == 'leased':
+                    self.error_handler.log_warning(
+                        f"Lease của worker {row['worker_id']} cho video {row['video_id']} đã hết hạn, giao lại"
+                    )
+                conn.execute(
+                    """UPDATE tasks SET status = 'leased', worker_id = ?, lease_expires = ?, attempts = attempts + 1
+                       WHERE task_id = ?""",
+                    (worker_id, now + lease_seconds, row['task_id'])
+                )
+                return {
+                    'task_id': row['task_id'],
+                    'job_id': row['job_id'],
+                    'video_id': row['video_id'],
+                    'title': row['title'],
+                    'playlist_ids': json.loads(row['playlist_ids']),
+                    'language': row['language'],
+                    'user_id': row['user_id'],
+                    'attempts': row['attempts'] + 1
+                }
+
+    def heartbeat(self, task_id: int, worker_id: str, lease_seconds: float) -> bool:
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                """UPDATE tasks SET lease_expires = ?
+                   WHERE task_id = ? AND worker_id = ? AND status = 'leased'""",
+                (time.time() + lease_seconds, task_id, worker_id)
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, task_id: int, worker_id: str, status: str, error_type: str = None,
+                 error: str = None, elapsed: float = None) -> bool:
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT job_id FROM tasks WHERE task_id = ? AND worker_id = ? AND status = 'leased'",
+                (task_id, worker_id)
+            ).fetchone()
+            if row is None:
+                return False
+            self._finish(conn, task_id, row['job_id'], status, error_type, error, elapsed)
+            return True
+
+    def cancel_job(self, job_id: str, reason: str):
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute('UPDATE jobs SET cancelled = ? WHERE job_id = ? AND cancelled IS NULL', (reason, job_id))
+            rows = conn.execute(
+                """SELECT task_id FROM tasks WHERE job_id = ?
+                     AND (status = 'queued' OR (status = 'leased' AND lease_expires < ?))""",
+                (job_id, now)
+            ).fetchall()
+            for row in rows:
+                self._finish(conn, row['task_id'], job_id, 'failed', reason,
+                             f"Job dừng trước khi xử lý video ({reason})")
+
+    def job_progress(self, job_id: str) -> dict:
+        rows = self._connect().execute(
+            """SELECT status, COUNT(*) AS count, SUM(CASE WHEN lease_expires >= ? THEN 1 ELSE 0 END) AS active
+               FROM tasks WHERE job_id = ? GROUP BY status""",
+            (time.time(), job_id)
+        ).fetchall()
+        progress = {'total': 0, 'queued': 0, 'leased': 0, 'active': 0, 'success': 0, 'failed': 0}
+        for row in rows:
+            progress[row['status']] = row['count']
+            progress['total'] += row['count']
+            if row['status'] == 'leased':
+                progress['active'] = row['active'] or 0
+        return progress
+
+    def completed_tasks(self, job_id: str, after_seq: int = 0) -> list:
+        rows = self._connect().execute(
+            """SELECT video_id, status, error_type, error, elapsed, completed_seq FROM tasks
+               WHERE job_id = ? AND completed_seq > ? ORDER BY completed_seq""",
+            (job_id, after_seq)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def active_leases(self) -> int:
+        row = self._connect().execute(
+            "SELECT COUNT(*) AS count FROM tasks WHERE status = 'leased' AND lease_expires >= ?",
+            (time.time(),)
+        ).fetchone()
+        return row['count']
+
+
+class QueueWorker:
+    """
+    Worker lấy task từ hàng đợi chung, tải và lưu transcript qua TranscriptPipeline.
+    Có thể chạy nhiều tiến trình worker cùng một hàng đợi (với SQLite: trên cùng máy).
+    """
+
+    def __init__(self, pipeline, work_queue: WorkQueue, worker_id: str = None,
+                 lease_seconds: float = None, threads: int = None):
+        self.pipeline = pipeline
+        self.work_queue = work_queue
+        self.error_handler = ErrorHandler()
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.lease_seconds = lease_seconds or float(os.environ.get('WORK_QUEUE_LEASE_SECONDS', 120))
+        self.threads = threads or pipeline.max_workers
+
+    def run(self, stop_event: threading.Event, idle_sleep: float = 1.0):
+        """Chạy các luồng worker tới khi stop_event được set (hoặc Ctrl+C)"""
+        self.error_handler.log_info(f"Worker {self.worker_id} bắt đầu với {self.threads} luồng")
+        threads = [
+            threading.Thread(target=self._loop, args=(stop_event, idle_sleep), name=f"queue-worker-{i}", daemon=True)
+            for i in range(self.threads)
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(0.5)
+        except KeyboardInterrupt:
+            # Dừng nhận task mới, chờ các video đang xử lý dở chạy xong
+            stop_event.set()
+            for thread in threads:
+                thread.join()
+            raise
+
+    def _loop(self, stop_event: threading.Event, idle_sleep: float):
+        while not stop_event.is_set():
+            try:
+                task = self.work_queue.lease(self.worker_id, self.lease_seconds)
+            except Exception as e:
+                self.error_handler.log_error("Work Queue Lease Error", str(e), {"worker_id": self.worker_id})
+                task = None
+            if task is None:
+                stop_event.wait(idle_sleep)
+                continue
+            self.process_task(task)
+
+    def process_task(self, task: dict) -> bool:
+        """Xử lý một task đã nhận, gia hạn lease trong lúc chạy"""
+        done = threading.Event()
+
+        def keep_alive():
+            while not done.wait(self.lease_seconds / 3):
+                if not self.work_queue.heartbeat(task['task_id'], self.worker_id, self.lease_seconds):
+                    self.error_handler.log_warning(f"Worker {self.worker_id} mất lease của video {task['video_id']}")
+                    return
+
+        heartbeat = threading.Thread(target=keep_alive, name='queue-heartbeat', daemon=True)
+        heartbeat.start()
+        video = {'video_id': task['video_id'], 'title': task['title'] or task['video_id']}
+        started = time.monotonic()
+        try:
+            self.pipeline.process_video_for_playlists(
+                video, task['playlist_ids'], task['language'], user_id=task['user_id']
+            )
+        finally:
+            done.set()
+            heartbeat.join()
+
+        return self.work_queue.complete(
+            task['task_id'], self.worker_id, video['status'],
+            video.get('error_type'), video.get('error'), time.monotonic() - started
+        )
+
+
+def create_work_queue(backend: str = None) -> WorkQueue:
+    """
+    Tạo hàng đợi theo backend hoặc biến môi trường WORK_QUEUE_BACKEND (hiện hỗ trợ 'sqlite', mặc định)
+    và WORK_QUEUE_PATH (mặc định src/data/queue/work_queue.sqlite)
+    """
+    backend = (backend or os.environ.get('WORK_QUEUE_BACKEND') or 'sqlite').lower()
+    if backend != 'sqlite':
+        raise ValueError(f"Work queue backend không được hỗ trợ: {backend}")
+    default_path = os.path.join(os.path.dirname(__file__), '..', 'data', 'queue', 'work_queue.sqlite')
+    return SQLiteWorkQueue(
+        os.environ.get('WORK_QUEUE_PATH', default_path),
+        max_attempts=int(os.environ.get('WORK_QUEUE_MAX_ATTEMPTS', 5))
+    )
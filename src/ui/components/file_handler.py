@@ -1,30 +1,40 @@
-import os
 import zipfile
 import io
 import re
+from ...utils.profiler import profile_job
 
 class FileHandler:
     def __init__(self, data_storage):
         self.data_storage = data_storage
 
-    def create_zip_file(self, playlist_id: str) -> bytes:
-        """Tạo file ZIP từ các file transcript"""
+    def create_zip_file(self, playlist_id: str, profile: bool = None) -> bytes:
+        """
+        Tạo file ZIP từ các transcript được playlist tham chiếu.
+        ZIP đã dựng được lưu theo revision của playlist và chỉ dựng lại khi playlist thay đổi.
+        Args:
+            playlist_id: ID của playlist
+            profile: Bật profiling khi phải dựng lại ZIP (None = theo PROFILE_JOBS)
+        """
+        # Đọc revision trước khi dựng: nếu playlist đổi trong lúc dựng, lần sau sẽ dựng lại
+        revision = self.data_storage.get_playlist_revision(playlist_id)
+        zip_data = self.data_storage.load_playlist_export(playlist_id, revision)
+        if zip_data is not None:
+            return zip_data
+
+        with profile_job('zip', enabled=profile, playlist_id=playlist_id) as profile_tags:
+            zip_data = self._build_zip(playlist_id)
+            profile_tags['size'] = len(zip_data)
+        self.data_storage.save_playlist_export(playlist_id, revision, zip_data)
+        return zip_data
+
+    def _build_zip(self, playlist_id: str) -> bytes:
+        """Ghi các file của playlist vào ZIP trong bộ nhớ"""
         memory_file = io.BytesIO()
         
         with zipfile.ZipFile(memory_file, 'w', zipfile.ZIP_DEFLATED) as zf:
-            playlist_path = os.path.join(self.data_storage.base_path, 'playlists', playlist_id)
-            
-            for folder in ['json', 'txt']:
-                folder_path = os.path.join(playlist_path, folder)
-                if os.path.exists(folder_path):
-                    for file in os.listdir(folder_path):
-                        file_path = os.path.join(folder_path, file)
-                        arcname = os.path.join(folder, file)
-                        zf.write(file_path, arcname)
-                
-            metadata_path = os.path.join(playlist_path, 'metadata.json')
-            if os.path.exists(metadata_path):
-                zf.write(metadata_path, 'metadata.json')
+            # Dựng lại file JSON/TXT từ các object mà playlist tham chiếu (trên backend lưu trữ dùng chung)
+            for arcname, content in self.data_storage.iter_playlist_files(playlist_id):
+                zf.writestr(arcname, content)
         
         memory_file.seek(0)
         return memory_file.getvalue()
@@ -0,0 +1,221 @@
+import math
+from collections import deque
+import streamlit as st
+
+# Số log lỗi tối đa giữ trong session (log cũ hơn bị loại bỏ)
+ERROR_LOG_LIMIT = 500
+
+
+def create_error_log() -> deque:
+    """Tạo bộ đệm vòng cho log lỗi"""
+    return deque(maxlen=ERROR_LOG_LIMIT)
+
+
+class ResultsStore:
+    """
+    Lưu kết quả xử lý video dạng cột gọn nhẹ (chỉ ID, tiêu đề, trạng thái, loại lỗi)
+    thay vì giữ toàn bộ dict của từng video trong session.
+    """
+
+    def __init__(self):
+        self.video_ids = []
+        self.titles = []
+        self.statuses = []
+        self.error_types = []
+        self._index = {}
+
+    def __len__(self):
+        return len(self.video_ids)
+
+    def add_videos(self, videos: list):
+        """Thêm hoặc cập nhật nhiều video"""
+        for video in videos:
+            self.update(video)
+
+    def update(self, video: dict):
+        """Thêm hoặc cập nhật kết quả của một video"""
+        row = self._index.get(video['video_id'])
+        if row is None:
+            self._index[video['video_id']] = len(self.video_ids)
+            self.video_ids.append(video['video_id'])
+            self.titles.append(video.get('title') or '')
+            self.statuses.append(video.get('status', 'pending'))
+            self.error_types.append(video.get('error_type'))
+        else:
+            self.statuses[row] = video.get('status', self.statuses[row])
+            self.error_types[row] = video.get('error_type')
+
+    def count(self, status: str) -> int:
+        return self.statuses.count(status)
+
+    def error_type_counts(self) -> dict:
+        """Số video lỗi theo từng loại lỗi"""
+        counts = {}
+        for status, error_type in zip(self.statuses, self.error_types):
+            if status == 'failed':
+                key = error_type or 'unknown'
+                counts[key] = counts.get(key, 0) + 1
+        return counts
+
+    def filter_rows(self, status: str = None, error_type: str = None) -> list:
+        """Danh sách chỉ số dòng thỏa điều kiện lọc"""
+        return [
+            row for row in range(len(self.video_ids))
+            if (status is None or self.statuses[row] == status)
+            and (error_type is None or (self.error_types[row] or 'unknown') == error_type)
+        ]
+
+    def get_video(self, row: int) -> dict:
+        return {
+            'video_id': self.video_ids[row],
+            'title': self.titles[row],
+            'status': self.statuses[row],
+            'error_type': self.error_types[row]
+        }
+
+    def get_videos(self, status: str = None) -> list:
+        """Dựng lại danh sách dict video (vd: để thử lại các video lỗi)"""
+        return [self.get_video(row) for row in self.filter_rows(status)]
+
+
+class ResultsView:
+    """Hiển thị kết quả theo trang và bộ lọc, chi phí render không phụ thuộc kích thước playlist"""
+
+    PAGE_SIZES = [25, 50, 100]
+
+    def _paginate(self, total: int, key: str) -> tuple:
+        """Hiển thị bộ chọn trang, trả về (start, end)"""
+        col1, col2 = st.columns(2)
+        with col1:
+            page_size = st.selectbox("Số dòng mỗi trang", self.PAGE_SIZES, key=f"{key}_page_size")
+        page_count = max(1, math.ceil(total / page_size))
+        with col2:
+            page = st.number_input(
+                f"Trang (1-{page_count})",
+                min_value=1,
+                max_value=page_count,
+                value=1,
+                # Đổi bộ lọc/kích thước trang thì số trang được đặt lại về 1
+                key=f"{key}_page_{total}_{page_size}"
+            )
+        start = (page - 1) * page_size
+        return start, min(start + page_size, total)
+
+    def render_videos(self, store: ResultsStore):
+        """Hiển thị danh sách video có lọc và phân trang"""
+        if not len(store):
+            return
+
+        with st.expander("Xem chi tiết từng video"):
+            filters = {
+                f"Tất cả ({len(store)})": (None, None),
+                f"🟢 Thành công ({store.count('success')})": ('success', None),
+                f"🔴 Thất bại ({store.count('failed')})": ('failed', None)
+            }
+            for error_type, count in sorted(store.error_type_counts().items()):
+                filters[f"🔴 Lỗi {error_type} ({count})"] = ('failed', error_type)
+
+            selected = st.selectbox("Lọc", list(filters.keys()), key="results_filter")
+            status, error_type = filters[selected]
+            rows = store.filter_rows(status, error_type)
+
+            if not rows:
+                st.caption("Không có video nào")
+                return
+
+            start, end = self._paginate(len(rows), "results")
+            lines = []
+            for row in rows[start:end]:
+                status_color = "🟢" if store.statuses[row] == 'success' else "🔴"
+                line = f"{status_color} **{store.titles[row] or 'Unknown Title'}**"
+                if store.statuses[row] == 'failed':
+                    line += f" — `{store.error_types[row] or 'unknown'}`"
+                lines.append(line)
+
+            # Gộp cả trang vào một phần tử markdown
+            st.markdown("  \n".join(lines))
+            st.caption(f"Hiển thị {start + 1}-{end} / {len(rows)}")
+
+    def render_near_duplicates(self, near_duplicates: dict, playlists: list):
+        """Hiển thị các cụm video gần trùng (reupload, bản chỉnh sửa lại...) theo playlist"""
+        titles = {playlist['playlist_id']: playlist['title'] for playlist in playlists}
+        total = sum(len(cluster['duplicates']) for clusters in near_duplicates.values() for cluster in clusters)
+        if not total:
+            return
+
+        with st.expander(f"Video gần trùng lặp ({total})"):
+            for playlist_id, clusters in near_duplicates.items():
+                if not clusters:
+                    continue
+                if len(near_duplicates) > 1:
+                    st.markdown(f"**📑 {titles.get(playlist_id, playlist_id)}**")
+                lines = []
+                for cluster in clusters:
+                    original = cluster['original']
+                    original_title = original['title'] or original['video_id']
+                    if not original['in_playlist']:
+                        original_title += " (playlist khác)"
+                    lines.append(f"🎥 **{original_title}**")
+                    for duplicate in cluster['duplicates']:
+                        note = " — đã bỏ qua" if duplicate['skipped'] else ""
+                        lines.append(f"&nbsp;&nbsp;↳ {duplicate['title']} ({duplicate['similarity']:.0%}){note}")
+                st.markdown("  \n".join(lines))
+
+    def render_coverage(self, report):
+        """Hiển thị kết quả quét trước: số video dùng được, ước lượng thời gian và ma trận ngôn ngữ x video"""
+        total = len(report.videos)
+        usable = len(report.usable_ids())
+        # Video lỗi tạm thời khi quét vẫn được thử khi trích xuất
+        attempted = total - len(report.unavailable_ids())
+        st.write(f"### 🔍 Phụ đề {report.language}: {usable}/{total} video có thể trích xuất")
+        if attempted > usable:
+            st.caption(f"⚠️ {attempted - usable} video chưa quét được (lỗi tạm thời), vẫn sẽ được thử khi trích xuất")
+
+        col1, col2 = st.columns(2)
+        with col1:
+            st.metric("Video có phụ đề", f"{usable}/{total}")
+        with col2:
+            eta = report.estimate_seconds(attempted)
+            if eta is None:
+                st.metric("Thời gian ước tính", "chưa có số liệu")
+            else:
+                full_eta = report.estimate_seconds(total)
+                st.metric(
+                    "Thời gian ước tính", self._format_duration(eta),
+                    delta=f"-{self._format_duration(full_eta - eta)}" if full_eta > eta else None,
+                    delta_color="inverse"
+                )
+
+        with st.expander("Ma trận ngôn ngữ x video", expanded=total <= 50):
+            st.caption("✅ phụ đề gốc · 🤖 phụ đề tự động · 🌐 dịch từ tiếng Anh · — không có")
+            st.dataframe(report.matrix(), hide_index=True)
+
+    @staticmethod
+    def _format_duration(seconds: float) -> str:
+        if seconds < 60:
+            return f"{seconds:.0f} giây"
+        if seconds < 3600:
+            return f"{seconds / 60:.0f} phút"
+        return f"{seconds / 3600:.1f} giờ"
+
+    def render_error_logs(self, error_logs):
+        """Hiển thị log lỗi (mới nhất trước) theo trang"""
+        if not error_logs:
+            return
+
+        with st.expander("Xem log lỗi chi tiết"):
+            logs = list(reversed(error_logs))
+            if len(error_logs) == error_logs.maxlen:
+                st.caption(f"Chỉ giữ {error_logs.maxlen} log lỗi gần nhất")
+
+            start, end = self._paginate(len(logs), "error_logs")
+            entries = []
+            for log in logs[start:end]:
+                retry_status = "Lần thử lại" if log.get('is_retry') else "Lần đầu"
+                entries.append(
+                    f"**Video:** {log.get('title', 'Unknown Title')}  \n"
+                    f"**Error:** {log.get('error', 'Unknown Error')}  \n"
+                    f"**Loại lỗi:** {log.get('error_type', 'unknown')}  \n"
+                    f"**Trạng thái:** {retry_status}"
+                )
+            st.markdown("\n\n---\n\n".join(entries))
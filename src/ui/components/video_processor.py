@@ -1,8 +1,18 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
 import streamlit as st
 from ...core.transcript import TranscriptExtractor
 from ...core.storage import DataStorage
 from ...core.playlist import PlaylistHandler
+from ...core.retry import FailureReason
+from ...core.pipeline import TranscriptPipeline
+from ...core.progress import ProgressBus, ProgressEvent, metrics_subscriber
+from ...core.job_control import JobControl
+from ...core.coverage import LanguageCoverageScanner
+from ...core.work_queue import create_work_queue
 from ...utils.error_handler import ErrorHandler
+from ...utils.profiler import is_profiling_enabled, profile_job
+from .results_view import ResultsStore, create_error_log
 
 class VideoProcessor:
     def __init__(self, transcript_extractor, data_storage, error_handler, playlist_handler):
@@ -10,133 +20,312 @@ class VideoProcessor:
         self.data_storage = data_storage
         self.error_handler = error_handler
         self.playlist_handler = playlist_handler
+        self.pipeline = TranscriptPipeline(transcript_extractor, data_storage)
+        self.coverage_scanner = LanguageCoverageScanner(transcript_extractor)
+        # Số lần cập nhật giao diện tối đa mỗi giây khi xử lý playlist
+        self.ui_updates_per_second = float(os.environ.get('UI_UPDATES_PER_SECOND', 4))
+        # Khi đặt WORK_QUEUE_BACKEND, job playlist được đưa vào hàng đợi chung cho các worker (worker.py)
+        self.work_queue = create_work_queue() if os.environ.get('WORK_QUEUE_BACKEND') else None
         
-    def process_video(self, video, playlist_id, language, video_status_container):
-        """Xử lý một video riêng lẻ"""
-        try:
-            transcript_data = self.transcript_extractor.download_transcript(
-                video['video_id'],
-                video['title'],
-                language
-            )
+    def current_user_id(self) -> str:
+        """ID người dùng đang đăng nhập, dùng cho hàng đợi công bằng và hạn mức"""
+        user = st.session_state.get('user')
+        return getattr(user, 'id', None) or getattr(user, 'email', None) or 'anonymous'
+
+    def process_single_video(self, video_url: str, video_id: str, language: str, fetch_metadata: bool = True):
+        """
+        Xử lý video đơn lẻ: tiêu đề lấy từ cache metadata nếu có; nếu không thì
+        thông tin video được tải song song với transcript (hoặc bỏ qua khi fetch_metadata=False)
+        Returns:
+            VideoResult của request
+        """
+        video_info = self.playlist_handler.peek_video_info(video_url)
+        video = {
+            'video_id': video_id,
+            'title': video_info['title'] if video_info else video_id,
+            'url': video_url,
+            'status': 'pending'
+        }
+        
+        if video_info or not fetch_metadata:
+            result = self.pipeline.process_single(video, 'single_videos', language, user_id=self.current_user_id())
+        else:
+            executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='video-info')
+            info_future = executor.submit(self.playlist_handler.get_video_info, video_url)
             
-            if transcript_data:
-                if self.data_storage.save_transcript(
-                    playlist_id,
-                    video['video_id'],
-                    video['title'],
-                    transcript_data
-                ):
-                    video['status'] = 'success'
-                    return True
+            def resolve_title():
+                info = info_future.result()
+                return info['title'] if info else None
             
-            return False
-                
-        except Exception as e:
-            st.session_state.results['error_logs'].append({
-                'video_id': video['video_id'],
-                'title': video['title'],
-                'error': str(e),
-                'is_retry': False
-            })
-            video['status'] = 'failed'
-            return False
+            try:
+                result = self.pipeline.process_single(
+                    video, 'single_videos', language, resolve_title, user_id=self.current_user_id()
+                )
+            finally:
+                # Không chờ metadata nếu tải transcript thất bại (kết quả vẫn được cache khi xong)
+                executor.shutdown(wait=False)
+        
+        if not result.success:
+            self._log_failed_video(video)
+        return result
 
-    def process_playlist(self, playlist_url: str, language: str, retry_videos=None):
-        """Xử lý toàn bộ playlist"""
-        try:
-            self.error_handler.log_info("Bắt đầu xử lý playlist...")
-            
-            # Nếu là retry thì dùng videos đã có
-            if retry_videos:
-                videos = retry_videos
-                playlist_id = st.session_state.results['playlist_id']
+    def _log_failed_video(self, video):
+        """Ghi lỗi của video vào log hiển thị trên giao diện"""
+        st.session_state.results['error_logs'].append({
+            'video_id': video['video_id'],
+            'title': video['title'],
+            'error': video.get('error'),
+            'error_type': video.get('error_type'),
+            'is_retry': video.get('is_retry', False)
+        })
+
+    def _create_progress_renderer(self):
+        """Tạo subscriber hiển thị tiến trình trên Streamlit"""
+        # Tạo container cho progress bar và status
+        progress_container = st.container()
+        with progress_container:
+            progress_text = st.empty()
+            progress_bar = st.progress(0)
+            current_video_container = st.empty()  # Container cho tên video hiện tại
+            stats_container = st.empty()  # Container cho thống kê
+        
+        def render(event: ProgressEvent):
+            if event.kind == ProgressEvent.JOB_FINISHED:
+                # Xóa container tên video sau khi hoàn thành
+                progress_bar.progress(1.0)
+                current_video_container.empty()
             else:
-                # Lấy thông tin playlist
-                playlist_info = self.playlist_handler.get_playlist_info(playlist_url)
-                if not playlist_info:
-                    st.error("Không thể lấy thông tin playlist")
-                    return
-                    
-                playlist_id = playlist_info['id']
-                videos = self.playlist_handler.get_playlist_videos(playlist_url)
-                
-                # Cập nhật session state
-                st.session_state.results.update({
-                    'playlist_id': playlist_id,
-                    'playlist_title': playlist_info['title'],
-                    'playlist_uploader': playlist_info['channel']
-                })
-            
-            total_videos = len(videos)
-            self.error_handler.log_info(f"Tìm thấy {total_videos} video")
-            
-            # Tạo container cho progress bar và status
-            progress_container = st.container()
-            with progress_container:
-                progress_text = st.empty()
-                progress_bar = st.progress(0)
-                current_video_container = st.empty()  # Container cho tên video hiện tại
-                stats_container = st.empty()  # Container cho thống kê
-            
-            success_count = 0
-            failed_count = 0
-            
-            # Xử lý từng video
-            for i, video in enumerate(videos):
-                current = i + 1
-                progress = current / total_videos
+                progress = event.progress
                 
                 # Cập nhật progress bar và text
                 progress_bar.progress(progress)
-                progress_text.write(f"⏳ Đang xử lý: {current}/{total_videos} videos ({int(progress * 100)}%)")
-                
-                # Hiển thị tên video đang xử lý
-                current_video_container.info(f"🎥 Video hiện tại: {video['title']}")
-                
-                # Xử lý video và cập nhật thống kê
-                if self.process_video(video, playlist_id, language, None):  # Truyền None cho video_status_container
-                    success_count += 1
-                else:
-                    failed_count += 1
-                    st.session_state.results['failed_videos'].append(video)
+                progress_text.write(f"⏳ Đã xử lý: {event.completed}/{event.total} videos ({int(progress * 100)}%)")
                 
-                # Cập nhật số liệu trong một dòng
-                stats_container.info(f"✅ Thành công: {success_count}/{total_videos} | ❌ Thất bại: {failed_count}/{total_videos}")
+                # Hiển thị tên video vừa xử lý xong (các video được tải song song)
+                if event.video:
+                    current_video_container.info(f"🎥 Video vừa xử lý: {event.video['title']}")
+            
+            # Cập nhật số liệu trong một dòng
+            stats_container.info(f"✅ Thành công: {event.success_count}/{event.total} | ❌ Thất bại: {event.failed_count}/{event.total}")
+        
+        return render
+
+    def profiling_enabled(self) -> bool:
+        """Profiling bật qua toggle trên giao diện hoặc biến môi trường PROFILE_JOBS"""
+        return bool(st.session_state.get('profiling_enabled')) or is_profiling_enabled()
+
+    def process_playlist(self, playlist_url: str, language: str, retry_videos=None):
+        """Xử lý toàn bộ playlist"""
+        if retry_videos:
+            self._run_job(self._group_by_playlist(retry_videos), language, is_retry=True)
+        else:
+            self.process_playlists([playlist_url], language)
+
+    def _resolve_playlists(self, playlist_urls: list) -> list:
+        """Lấy thông tin và danh sách video của các playlist (bỏ qua playlist lỗi/rỗng)"""
+        playlists = []
+        for playlist_url in playlist_urls:
+            # Lấy thông tin playlist
+            playlist_info = self.playlist_handler.get_playlist_info(playlist_url)
+            if not playlist_info:
+                st.error(f"Không thể lấy thông tin playlist: {playlist_url}")
+                continue
+            videos = self.playlist_handler.get_playlist_videos(playlist_url)
+            if not videos:
+                st.warning(f"Playlist không có video nào: {playlist_info['title']}")
+                continue
+            playlists.append({
+                'playlist_id': playlist_info['id'],
+                'title': playlist_info['title'],
+                'channel': playlist_info['channel'],
+                'videos': videos
+            })
+        return playlists
+
+    def prescan_playlists(self, playlist_urls: list, language: str):
+        """
+        Quét trước danh sách phụ đề của các video (không tải nội dung) và lưu báo cáo
+        vào session để hiển thị ma trận ngôn ngữ và ước lượng thời gian trước khi trích xuất
+        """
+        try:
+            playlists = self._resolve_playlists(playlist_urls)
+            if not playlists:
+                st.error("Không có playlist nào để quét")
+                return
+
+            unique_videos, _ = self.pipeline.build_work_set(playlists)
+            progress_bar = st.progress(0, text=f"🔍 Đang quét phụ đề của {len(unique_videos)} video...")
+
+            def on_progress(completed, total):
+                progress_bar.progress(completed / total, text=f"🔍 Đã quét {completed}/{total} video")
+
+            report = self.coverage_scanner.scan(
+                unique_videos, language, on_progress=on_progress, user_id=self.current_user_id()
+            )
+            progress_bar.empty()
+            st.session_state.coverage = {'urls': playlist_urls, 'language': language, 'report': report}
+        except Exception as e:
+            self.error_handler.log_error("Coverage Scan Error", str(e))
+            st.error(f"Lỗi khi quét phụ đề: {str(e)}")
+
+    def process_playlists(self, playlist_urls: list, language: str, coverage=None):
+        """
+        Xử lý nhiều playlist trong một job, mỗi video chỉ được tải một lần
+        Args:
+            coverage: CoverageReport của lần quét trước (chỉ tải các video có phụ đề dùng được)
+        """
+        try:
+            self.error_handler.log_info(f"Bắt đầu xử lý {len(playlist_urls)} playlist...")
             
-            # Xóa container tên video sau khi hoàn thành
-            current_video_container.empty()
+            playlists = self._resolve_playlists(playlist_urls)
+            if not playlists:
+                st.error("Không có playlist nào để xử lý")
+                return
             
-            # Cập nhật kết quả cuối cùng
+            # Bắt đầu job mới với kết quả trống
+            first = playlists[0]
             st.session_state.results.update({
-                'success_count': success_count,
-                'failed_count': failed_count,
-                'videos': videos,
-                'total_videos': total_videos
+                'playlist_id': first['playlist_id'],
+                'playlist_title': first['title'] if len(playlists) == 1 else f"{len(playlists)} playlist",
+                'playlist_uploader': first['channel'] if len(playlists) == 1 else '',
+                'playlists': [
+                    {key: playlist[key] for key in ('playlist_id', 'title', 'channel')}
+                    for playlist in playlists
+                ],
+                'membership': {},
+                'language': language,
+                'videos': ResultsStore(),
+                'error_logs': create_error_log(),
+                'near_duplicates': {},
+                'success_count': 0,
+                'failed_count': 0
             })
-            st.session_state.processing_complete = True
-            st.session_state.show_retry = failed_count > 0
             
-            # Hiển thị thông báo hoàn thành
-            if success_count == total_videos:
-                st.success(f"✨ Hoàn thành! Đã tải thành công {success_count}/{total_videos} transcripts")
-            else:
-                st.warning(f"⚠️ Đã hoàn thành với {success_count}/{total_videos} transcripts thành công")
-                
-            self.error_handler.log_info("Đã hoàn thành xử lý playlist")
+            if coverage is not None:
+                # Giữ thông tin playlist của mọi video trước khi lọc theo kết quả quét trước
+                membership = self.pipeline.build_work_set(playlists)[1]
+                skipped = coverage.filter_playlists(playlists)
+                if skipped:
+                    st.info(f"⏭️ Bỏ qua {len(skipped)} video không có phụ đề {language} (theo kết quả quét trước)")
+                    st.session_state.results['videos'].add_videos(skipped)
+                    for video in skipped:
+                        self._log_failed_video(video)
+                st.session_state.results['membership'] = membership
+            
+            self._run_job(playlists, language, is_retry=False)
             
         except Exception as e:
             self.error_handler.log_error("Playlist Processing Error", str(e))
             st.error(f"Lỗi khi xử lý playlist: {str(e)}")
 
+    def _group_by_playlist(self, videos: list) -> list:
+        """Chia các video (vd: video cần thử lại) về đúng các playlist chứa chúng"""
+        membership = st.session_state.results.get('membership', {})
+        groups = {}
+        for video in videos:
+            for playlist_id in membership.get(video['video_id'], [st.session_state.results['playlist_id']]):
+                groups.setdefault(playlist_id, []).append(video)
+        return [{'playlist_id': playlist_id, 'videos': group} for playlist_id, group in groups.items()]
+
+    def _run_job(self, playlists: list, language: str, is_retry: bool):
+        """Chạy job trên worker pool dùng chung và cập nhật kết quả vào session"""
+        job_name = 'playlist_retry' if is_retry else 'playlist'
+        with profile_job(job_name, enabled=self.profiling_enabled()) as profile_tags:
+            try:
+                results = st.session_state.results
+                unique_videos, membership = self.pipeline.build_work_set(playlists)
+                total_videos = len(unique_videos)
+                self.error_handler.log_info(f"Tìm thấy {total_videos} video (không trùng lặp)")
+                profile_tags.update(playlist_id=playlists[0]['playlist_id'], playlists=len(playlists), size=total_videos)
+                
+                if not is_retry:
+                    results['videos'].add_videos(unique_videos)
+                    results['membership'].update(membership)
+                    # Bao gồm cả video đã bị bỏ qua nhờ quét trước
+                    results['total_videos'] = len(results['videos'])
+                
+                # Giao diện chỉ nhận sự kiện tiến trình đã được gộp theo thời gian
+                bus = ProgressBus()
+                bus.subscribe(self._create_progress_renderer(), max_updates_per_second=self.ui_updates_per_second)
+                bus.subscribe(metrics_subscriber)
+                
+                # Bấm dừng làm Streamlit chạy lại script: pipeline nhận tín hiệu ngắt và bỏ qua các video còn lại
+                control = JobControl.from_env()
+                st.button("⏹ Dừng xử lý", key="stop_job", on_click=control.cancel)
+                
+                try:
+                    if self.work_queue is not None:
+                        summary = self.pipeline.run_distributed(
+                            playlists, language, self.work_queue, bus, control=control, user_id=self.current_user_id()
+                        )
+                    else:
+                        summary = self.pipeline.run_batch(
+                            playlists, language, bus, control=control, user_id=self.current_user_id()
+                        )
+                except BaseException:
+                    # Giữ lại kết quả của các video đã xử lý trước khi job bị dừng
+                    self._store_job_results(playlists, unique_videos)
+                    raise
+                self._store_job_results(playlists, unique_videos)
+                
+                if summary['stop_reason']:
+                    st.warning(f"⏹ Job dừng sớm ({summary['stop_reason']}), các video chưa xử lý có thể thử lại")
+                
+                # Hiển thị thông báo hoàn thành
+                success_count = summary['success_count']
+                if success_count == total_videos:
+                    st.success(f"✨ Hoàn thành! Đã tải thành công {success_count}/{total_videos} transcripts")
+                else:
+                    st.warning(f"⚠️ Đã hoàn thành với {success_count}/{total_videos} transcripts thành công")
+                    
+                self.error_handler.log_info("Đã hoàn thành xử lý playlist")
+                
+            except Exception as e:
+                self.error_handler.log_error("Playlist Processing Error", str(e))
+                st.error(f"Lỗi khi xử lý playlist: {str(e)}")
+
+    def _store_job_results(self, playlists: list, unique_videos: list):
+        """Cập nhật kết quả của job (đã chạy hết hoặc dừng sớm) vào session"""
+        results = st.session_state.results
+        results['videos'].add_videos(unique_videos)
+        for video in unique_videos:
+            if video.get('status') == 'failed':
+                self._log_failed_video(video)
+        
+        # Số liệu được tính lại từ kho kết quả (bao gồm cả các lần thử lại)
+        results.update({
+            'success_count': results['videos'].count('success'),
+            'failed_count': results['videos'].count('failed')
+        })
+        # Các cụm video gần trùng trong từng playlist (tính một lần khi job kết thúc)
+        results['near_duplicates'] = {
+            playlist['playlist_id']: self.data_storage.get_near_duplicate_clusters(playlist['playlist_id'])
+            for playlist in results.get('playlists') or playlists
+        }
+        st.session_state.processing_complete = True
+        st.session_state.show_retry = bool(self.get_retryable_videos(results['videos'].get_videos('failed')))
+
+    def get_retryable_videos(self, failed_videos: list) -> list:
+        """Lọc các video lỗi tạm thời (có thể thử lại), bỏ qua lỗi vĩnh viễn"""
+        return [
+            video for video in failed_videos
+            if not FailureReason.is_permanent(video.get('error_type'))
+        ]
+
     def retry_failed_videos(self):
-        """Thử lại các video bị lỗi"""
+        """Thử lại các video bị lỗi tạm thời"""
         st.session_state.show_retry = False
-        prev_success = st.session_state.results['success_count']
-        prev_failed = st.session_state.results['failed_count']
         
-        self.process_playlist(None, None, st.session_state.results['failed_videos'])
+        failed_videos = st.session_state.results['videos'].get_videos('failed')
+        retry_videos = self.get_retryable_videos(failed_videos)
+        skipped = len(failed_videos) - len(retry_videos)
+        if skipped:
+            self.error_handler.log_info(f"Bỏ qua {skipped} video lỗi vĩnh viễn khi thử lại")
+        if not retry_videos:
+            st.info("Không có video nào lỗi tạm thời để thử lại")
+            return
+        
+        for video in retry_videos:
+            video['is_retry'] = True
         
-        if 'success_count' in st.session_state.results:
-            st.session_state.results['success_count'] = prev_success + st.session_state.results['success_count']
-            st.session_state.results['failed_count'] = prev_failed - st.session_state.results['success_count'] 
\ No newline at end of file
+        self.process_playlist(None, st.session_state.results.get('language'), retry_videos)
@@ -1,6 +1,7 @@
 from colorama import init, Fore, Style
 from tqdm import tqdm
 from ..utils.error_handler import ErrorHandler
+from ..core.progress import ProgressEvent
 
 
 class ConsoleUI:
@@ -32,6 +33,26 @@ class ConsoleUI:
         """Tạo thanh tiến trình"""
         return tqdm(total=total, desc=desc, bar_format='{l_bar}{bar:30}{r_bar}')
 
+    def create_progress_subscriber(self, desc: str = "Processing"):
+        """Tạo subscriber cập nhật thanh tiến trình tqdm theo sự kiện của job"""
+        state = {'bar': None}
+
+        def on_event(event: ProgressEvent):
+            if event.kind == ProgressEvent.JOB_STARTED:
+                state['bar'] = self.create_progress_bar(event.total, desc)
+                return
+            bar = state['bar']
+            if bar is None:
+                return
+            bar.n = event.completed
+            bar.set_postfix(ok=event.success_count, failed=event.failed_count, refresh=False)
+            bar.refresh()
+            if event.kind == ProgressEvent.JOB_FINISHED:
+                bar.close()
+                state['bar'] = None
+
+        return on_event
+
     def print_success(self, message: str):
         """In thông báo thành công"""
         print(f"{Fore.GREEN}[SUCCESS] {message}{Style.RESET_ALL}")
@@ -1,9 +1,13 @@
+import functools
 import streamlit as st
 from ..core.playlist import PlaylistHandler
 from ..core.transcript import TranscriptExtractor
 from ..core.storage import DataStorage
+from ..core.scheduler import FetchScheduler
 from ..utils.error_handler import ErrorHandler
+from ..utils.metrics import Metrics
 from .components import video_processor, file_handler
+from .components.results_view import ResultsStore, ResultsView, create_error_log
 
 class MainApp:
     def __init__(self):
@@ -12,6 +16,7 @@ class MainApp:
         self.transcript_extractor = TranscriptExtractor()
         self.data_storage = DataStorage()
         self.error_handler = ErrorHandler()
+        self.metrics = Metrics()
         self.video_processor = video_processor.VideoProcessor(
             self.transcript_extractor,
             self.data_storage,
@@ -19,6 +24,7 @@ class MainApp:
             self.playlist_handler
         )
         self.file_handler = file_handler.FileHandler(self.data_storage)
+        self.results_view = ResultsView()
         
         # Khởi tạo session state
         self._initialize_session_state()
@@ -32,12 +38,11 @@ class MainApp:
             st.session_state.results = {
                 'success_count': 0,
                 'failed_count': 0,
-                'videos': [],
+                'videos': ResultsStore(),
                 'playlist_id': None,
                 'playlist_title': '',
                 'playlist_uploader': '',
-                'error_logs': [],
-                'failed_videos': [],
+                'error_logs': create_error_log(),
                 'total_videos': 0
             }
             
@@ -66,16 +71,22 @@ class MainApp:
                     help="Nhập mã ngôn ngữ (vd: en=Tiếng Anh, vi=Tiếng Việt, ja=Tiếng Nhật, ko=Tiếng Hàn...)"
                 )
                 
+                skip_metadata = st.checkbox(
+                    "Bỏ qua tải thông tin video (nhanh hơn)",
+                    help="Không gọi yt-dlp để lấy tiêu đề; dùng tiêu đề đã cache hoặc video ID"
+                )
+                
                 submitted = st.form_submit_button("Trích xuất phụ đề")
             
             # Xử lý và hiển thị kết quả bên ngoài form
             if submitted:
-                self._handle_single_video(video_url, language)
+                self._handle_single_video(video_url, language, fetch_metadata=not skip_metadata)
+            self._show_single_video_result()
         
         with tab2:
             with st.form("playlist_form"):
-                playlist_url = st.text_input(
-                    "Nhập URL playlist YouTube",
+                playlist_url = st.text_area(
+                    "Nhập URL playlist YouTube (mỗi dòng một URL để xử lý nhiều playlist cùng lúc)",
                     placeholder="https://www.youtube.com/playlist?list=..."
                 )
                 
@@ -86,48 +97,129 @@ class MainApp:
                 )
                 
                 submitted = st.form_submit_button("Bắt đầu trích xuất")
-                
-                if submitted:
-                    self._handle_submission(playlist_url, language)
+                prescan = st.form_submit_button(
+                    "🔍 Quét phụ đề trước",
+                    help="Chỉ lấy danh sách phụ đề của từng video để xem video nào có ngôn ngữ đã chọn"
+                )
+            
+            # Xử lý bên ngoài form: job có nút dừng (st.button không được đặt trong form)
+            if prescan:
+                self._handle_prescan(playlist_url, language)
+            elif submitted:
+                self._handle_submission(playlist_url, language)
+            self._show_coverage()
 
         if st.session_state.processing_complete:
             self._show_results()
 
-    def _handle_submission(self, playlist_url: str, language: str):
-        """Xử lý khi form được submit"""
-        try:
-            if not playlist_url:
-                st.error("Vui lòng nhập URL playlist!")
-                return
-                
+        self._show_metrics_sidebar()
+
+    def _show_metrics_sidebar(self):
+        """Hiển thị số liệu hoạt động chung của server ở sidebar"""
+        snapshot = self.metrics.snapshot()
+        with st.sidebar.expander("📈 Số liệu hệ thống"):
+            st.checkbox(
+                "🔬 Profiling job (ghi profile vào logs/profiles)",
+                key="profiling_enabled",
+                help="Lấy mẫu stack khi xử lý playlist và tạo ZIP, xuất file .collapsed và speedscope"
+            )
+            rate = snapshot['gauges'].get('rate_limiter.rate')
+            if rate is not None:
+                st.metric("Tốc độ request YouTube", f"{rate:.2f} req/s")
+            st.caption(
+                f"Request: {snapshot['counters'].get('rate_limiter.requests', 0)} | "
+                f"Bị chặn (429): {snapshot['counters'].get('rate_limiter.throttled', 0)} | "
+                f"Request dự phòng: {snapshot['counters'].get('transcript.hedged', 0)}"
+            )
+            st.caption(
+                f"Metadata cache: {snapshot['counters'].get('metadata_cache.hits', 0)} hit | "
+                f"{snapshot['counters'].get('metadata_cache.stale_hits', 0)} stale | "
+                f"{snapshot['counters'].get('metadata_cache.misses', 0)} miss"
+            )
+            usage = FetchScheduler().usage(self.video_processor.current_user_id())
+            quota = usage['daily_quota'] or '∞'
+            st.caption(
+                f"Lượt tải của bạn: {usage['running']} đang chạy | {usage['queued']} đang chờ | "
+                f"hôm nay {usage['used_today']}/{quota}"
+            )
+            st.caption(
+                f"Transcript không đổi: {snapshot['counters'].get('storage.unchanged', 0)} | "
+                f"Có thay đổi: {snapshot['counters'].get('storage.changed', 0)}"
+            )
+
+    def _parse_playlist_urls(self, playlist_input: str) -> list:
+        """Tách các URL playlist (mỗi dòng một URL, bỏ dòng trống và URL trùng) và giữ lại URL hợp lệ"""
+        playlist_urls = list(dict.fromkeys(
+            line.strip() for line in (playlist_input or '').splitlines() if line.strip()
+        ))
+        if not playlist_urls:
+            st.error("Vui lòng nhập URL playlist!")
+            return []
+        
+        valid_urls = []
+        for playlist_url in playlist_urls:
             self.error_handler.log_info(f"Bắt đầu xử lý URL: {playlist_url}")
-                
             if not self.playlist_handler.validate_playlist_url(playlist_url):
-                st.error("URL playlist không hợp lệ!")
-                return
-                
-            # Lấy thông tin playlist
-            playlist_info = self.playlist_handler.get_playlist_info(playlist_url)
-            if not playlist_info:
-                st.error("Không thể lấy thông tin playlist. Vui lòng kiểm tra URL và thử lại.")
+                st.error(f"URL playlist không hợp lệ: {playlist_url}")
+                continue
+            valid_urls.append(playlist_url)
+        return valid_urls
+
+    def _handle_prescan(self, playlist_input: str, language: str):
+        """Quét trước phụ đề của playlist (không tải nội dung phụ đề)"""
+        try:
+            st.session_state.coverage = None
+            valid_urls = self._parse_playlist_urls(playlist_input)
+            if valid_urls:
+                self.video_processor.prescan_playlists(valid_urls, language)
+        except Exception as e:
+            self.error_handler.log_error("Prescan Error", str(e))
+            st.error(f"Có lỗi xảy ra: {str(e)}")
+
+    def _show_coverage(self):
+        """Hiển thị kết quả quét trước và nút trích xuất các video có phụ đề"""
+        coverage = st.session_state.get('coverage')
+        if not coverage:
+            return
+        
+        report = coverage['report']
+        self.results_view.render_coverage(report)
+        usable = len(report.usable_ids())
+        if usable and st.button(f"▶️ Trích xuất {usable} video có phụ đề {report.language}", key="extract_covered"):
+            self.video_processor.process_playlists(coverage['urls'], coverage['language'], coverage=report)
+
+    def _handle_submission(self, playlist_input: str, language: str):
+        """Xử lý khi form được submit (một hoặc nhiều URL playlist)"""
+        try:
+            valid_urls = self._parse_playlist_urls(playlist_input)
+            if not valid_urls:
                 return
-                
-            self.error_handler.log_info(f"Đã lấy thông tin playlist: {playlist_info}")
-            st.info(f"🎵 Đang xử lý playlist: {playlist_info['title']}")
             
-            # Lấy danh sách video
-            videos = self.playlist_handler.get_playlist_videos(playlist_url)
-            if not videos:
-                st.error("""
-                ❌ Không thể tải danh sách video. Có thể do:
-                - Playlist không tồn tại hoặc đã bị xóa
-                - Playlist ở chế độ riêng tư
-                - Có vấn đề với kết nối mạng
-                """)
-                return
+            if len(valid_urls) == 1:
+                # Lấy thông tin playlist
+                playlist_info = self.playlist_handler.get_playlist_info(valid_urls[0])
+                if not playlist_info:
+                    st.error("Không thể lấy thông tin playlist. Vui lòng kiểm tra URL và thử lại.")
+                    return
+                    
+                self.error_handler.log_info(f"Đã lấy thông tin playlist: {playlist_info}")
+                st.info(f"🎵 Đang xử lý playlist: {playlist_info['title']}")
                 
-            # Bắt đầu xử lý video
-            self.video_processor.process_playlist(playlist_url, language)
+                # Lấy danh sách video
+                videos = self.playlist_handler.get_playlist_videos(valid_urls[0])
+                if not videos:
+                    st.error("""
+                    ❌ Không thể tải danh sách video. Có thể do:
+                    - Playlist không tồn tại hoặc đã bị xóa
+                    - Playlist ở chế độ riêng tư
+                    - Có vấn đề với kết nối mạng
+                    """)
+                    return
+            else:
+                st.info(f"🎵 Đang xử lý {len(valid_urls)} playlist trong một lượt")
+                
+            # Bắt đầu xử lý video (video trùng giữa các playlist chỉ tải một lần)
+            self.video_processor.process_playlists(valid_urls, language)
             
         except Exception as e:
             self.error_handler.log_error("Submission Error", str(e))
@@ -168,45 +260,50 @@ class MainApp:
 
     def _show_action_buttons(self, results):
         """Hiển thị các nút hành động"""
-        # Nút retry
-        if st.session_state.show_retry and results.get('failed_videos'):
-            if st.button("🔄 Thử lại các video lỗi"):
+        # Nút retry (chỉ thử lại các video lỗi tạm thời)
+        failed_videos = results['videos'].get_videos('failed') if st.session_state.show_retry else []
+        if failed_videos:
+            retryable = self.video_processor.get_retryable_videos(failed_videos)
+            permanent_count = len(failed_videos) - len(retryable)
+            if permanent_count:
+                st.caption(f"⛔ {permanent_count} video lỗi vĩnh viễn (không có/tắt phụ đề) sẽ không được thử lại")
+            if retryable and st.button(f"🔄 Thử lại các video lỗi ({len(retryable)})"):
                 self.video_processor.retry_failed_videos()
         
-        # Nút tải xuống
+        # Nút tải xuống (mỗi playlist một file ZIP)
         if results['success_count'] > 0:
-            zip_data = self.file_handler.create_zip_file(results['playlist_id'])
-            filename = self.file_handler.generate_filename(
-                results.get('playlist_uploader', ''),
-                results.get('playlist_title', ''),
-                results.get('playlist_id', '')
-            )
-            
-            st.download_button(
-                label="📥 Tải xuống tất cả transcript",
-                data=zip_data,
-                file_name=filename,
-                mime="application/zip"
-            )
+            playlists = results.get('playlists') or [{
+                'playlist_id': results['playlist_id'],
+                'title': results.get('playlist_title', ''),
+                'channel': results.get('playlist_uploader', '')
+            }]
+            profile = self.video_processor.profiling_enabled()
+            for playlist in playlists:
+                # ZIP chỉ được tạo khi người dùng bấm tải (Streamlit gọi hàm ở luồng riêng),
+                # các lần rerun khác không đọc transcript nào
+                zip_data = functools.partial(self.file_handler.create_zip_file, playlist['playlist_id'], profile)
+                filename = self.file_handler.generate_filename(
+                    playlist.get('channel') or '',
+                    playlist.get('title') or '',
+                    playlist['playlist_id']
+                )
+                
+                label = "📥 Tải xuống tất cả transcript"
+                if len(playlists) > 1:
+                    label = f"📥 Tải xuống: {playlist.get('title') or playlist['playlist_id']}"
+                st.download_button(
+                    label=label,
+                    data=zip_data,
+                    file_name=filename,
+                    mime="application/zip",
+                    key=f"download_{playlist['playlist_id']}"
+                )
 
     def _show_details(self, results):
         """Hiển thị chi tiết video và log lỗi"""
-        if results.get('videos'):
-            with st.expander("Xem chi tiết từng video"):
-                for video in results['videos']:
-                    status_color = "🟢" if video.get('status') == 'success' else "🔴"
-                    st.markdown(f"{status_color} **{video.get('title', 'Unknown Title')}**")
-        
-        if results.get('error_logs'):
-            with st.expander("Xem log lỗi chi tiết"):
-                for log in results['error_logs']:
-                    retry_status = "Lần thử lại" if log.get('is_retry') else "Lần đầu"
-                    st.markdown(f"""
-                        **Video:** {log.get('title', 'Unknown Title')}  
-                        **Error:** {log.get('error', 'Unknown Error')}  
-                        **Trạng thái:** {retry_status}  
-                        ---
-                    """) 
+        self.results_view.render_videos(results['videos'])
+        self.results_view.render_near_duplicates(results.get('near_duplicates', {}), results.get('playlists', []))
+        self.results_view.render_error_logs(results['error_logs'])
 
     def process_url(self):
         """Xử lý URL được nhập vào"""
@@ -246,9 +343,27 @@ class MainApp:
             st.error(f"❌ Có lỗi xảy ra: {str(e)}")
             self.error_handler.log_error("Processing Error", str(e))
 
-    def _handle_single_video(self, video_url: str, language: str):
+    def _show_single_video_result(self):
+        """Hiển thị kết quả video đơn lẻ của request gần nhất (giữ qua các lần rerun, không tải lại)"""
+        result = st.session_state.get('single_video_result')
+        if result is None:
+            return
+        
+        if result.success:
+            st.success(f"✅ Đã tải thành công transcript cho video: {result.title}")
+            st.download_button(
+                label="📥 Tải transcript",
+                data=result.text,
+                file_name=result.filename,
+                mime="text/plain"
+            )
+        else:
+            st.error(f"❌ Không thể tải transcript cho video: {result.title} ({result.video.get('error_type')})")
+
+    def _handle_single_video(self, video_url: str, language: str, fetch_metadata: bool = True):
         """Xử lý video đơn lẻ"""
         try:
+            st.session_state.single_video_result = None
             if not video_url:
                 st.error("Vui lòng nhập URL video!")
                 return
@@ -258,51 +373,11 @@ class MainApp:
             if not video_id:
                 st.error("URL video không hợp lệ!")
                 return
-                
-            # Lấy thông tin video
-            video_info = self.playlist_handler.get_video_info(video_url)
-            if not video_info:
-                st.error("Không thể lấy thông tin video. Vui lòng kiểm tra URL và thử lại.")
-                return
-                
-            st.info(f"🎥 Đang xử lý video: {video_info['title']}")
-            
-            # Tạo container cho status
-            status_container = st.empty()
-            
-            # Tạo video object
-            video = {
-                'video_id': video_id,
-                'title': video_info['title'],
-                'url': video_url,
-                'status': 'pending'
-            }
             
-            # Xử lý video
-            success = self.video_processor.process_video(
-                video,
-                'single_videos',  # Thư mục đặc biệt cho video đơn lẻ
-                language,
-                status_container
-            )
-            
-            # Hiển thị kết quả và nút download bên ngoài form
-            if success:
-                st.success(f"✅ Đã tải thành công transcript cho video: {video_info['title']}")
-                
-                # Tạo nút download
-                transcript_data = self.transcript_extractor.download_transcript(video_id, video_info['title'], language)
-                if transcript_data:
-                    txt_content = self.data_storage._create_text_content(transcript_data)
-                    # Nút download được đặt bên ngoài form
-                    st.download_button(
-                        label="📥 Tải transcript",
-                        data=txt_content,
-                        file_name=f"{self.data_storage._sanitize_filename(video_info['title'])}_{video_id}.txt",
-                        mime="text/plain"
-                    )
-            else:
-                st.error(f"❌ Không thể tải transcript cho video: {video_info['title']}")
+            # Transcript chỉ được tải một lần; kết quả dùng cho cả lưu trữ và nút tải xuống
+            with st.spinner("🎥 Đang tải transcript..."):
+                result = self.video_processor.process_single_video(video_url, video_id, language, fetch_metadata)
+            st.session_state.single_video_result = result
                 
         except Exception as e:
             self.error_handler.log_error("Single Video Processing Error", str(e))
@@ -0,0 +1,63 @@
+import threading
+import time
+
+
+class Metrics:
+    # Singleton pattern - các số liệu được dùng chung trong toàn bộ process
+    _instance = None
+    _initialized = False
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(Metrics, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        # Chỉ khởi tạo một lần
+        if not Metrics._initialized:
+            self._lock = threading.Lock()
+            self.counters = {}
+            self.gauges = {}
+            self.timings = {}
+            self.started_at = time.time()
+            Metrics._initialized = True
+
+    def increment(self, name: str, value: int = 1):
+        """Tăng bộ đếm"""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def set_gauge(self, name: str, value: float):
+        """Ghi giá trị hiện tại của một đại lượng (vd: tốc độ request)"""
+        with self._lock:
+            self.gauges[name] = value
+
+    def observe(self, name: str, seconds: float):
+        """Ghi nhận thời gian thực hiện một thao tác"""
+        with self._lock:
+            timing = self.timings.setdefault(name, {'count': 0, 'total': 0.0, 'max': 0.0})
+            timing['count'] += 1
+            timing['total'] += seconds
+            timing['max'] = max(timing['max'], seconds)
+
+    def get_gauge(self, name: str, default: float = None) -> float:
+        with self._lock:
+            return self.gauges.get(name, default)
+
+    def get_average(self, name: str, default: float = None) -> float:
+        """Thời gian trung bình của một thao tác"""
+        with self._lock:
+            timing = self.timings.get(name)
+            if not timing or not timing['count']:
+                return default
+            return timing['total'] / timing['count']
+
+    def snapshot(self) -> dict:
+        """Lấy bản sao toàn bộ số liệu hiện tại"""
+        with self._lock:
+            return {
+                'uptime': time.time() - self.started_at,
+                'counters': dict(self.counters),
+                'gauges': dict(self.gauges),
+                'timings': {name: dict(timing) for name, timing in self.timings.items()}
+            }
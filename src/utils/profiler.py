@@ -0,0 +1,192 @@
+import contextvars
+import functools
+import json
+import os
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from .error_handler import ErrorHandler
+
+
+def is_profiling_enabled() -> bool:
+    """Profiling được bật qua biến môi trường PROFILE_JOBS=1"""
+    return os.environ.get('PROFILE_JOBS', '').lower() in ('1', 'true', 'yes')
+
+
+# Profiler của job đang chạy trong ngữ cảnh hiện tại (None nếu không profile)
+_active_profiler = contextvars.ContextVar('active_profiler', default=None)
+
+
+class SamplingProfiler:
+    """
+    Profiler lấy mẫu stack theo chu kỳ, chỉ với các luồng đang làm việc cho job
+    (luồng gọi profile_job và các tác vụ được bọc bằng propagate_profiling).
+    Các job khác chạy đồng thời trong cùng process (session khác) không bị tính vào.
+    Chạy trong luồng nền nên chi phí thấp và không cần sửa code được đo.
+    """
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples = {}
+        self.sample_count = 0
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.started_at = None
+        self.duration = 0.0
+        # thread ident -> số tác vụ của job đang chạy trên luồng đó
+        self._threads = {}
+        self._threads_lock = threading.Lock()
+
+    @contextmanager
+    def attach_current_thread(self):
+        """Tính các mẫu của luồng hiện tại cho job trong khi khối lệnh chạy"""
+        thread_id = threading.get_ident()
+        with self._threads_lock:
+            self._threads[thread_id] = self._threads.get(thread_id, 0) + 1
+        token = _active_profiler.set(self)
+        try:
+            yield
+        finally:
+            _active_profiler.reset(token)
+            with self._threads_lock:
+                self._threads[thread_id] -= 1
+                if not self._threads[thread_id]:
+                    del self._threads[thread_id]
+
+    @staticmethod
+    def _frame_label(frame) -> str:
+        code = frame.f_code
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+    def _sample(self):
+        with self._threads_lock:
+            job_threads = set(self._threads)
+        thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id not in job_threads:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self._frame_label(frame))
+                frame = frame.f_back
+            stack.append(f"thread {thread_names.get(thread_id, thread_id)}")
+            key = tuple(reversed(stack))
+            self.samples[key] = self.samples.get(key, 0) + 1
+        self.sample_count += 1
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        self.started_at = time.time()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+        self.duration = time.time() - self.started_at
+
+    def write_collapsed(self, path: str):
+        """Ghi file collapsed stack (dùng được với flamegraph.pl, speedscope, inferno)"""
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in sorted(self.samples.items(), key=lambda item: -item[1]):
+                f.write(f"{';'.join(frame.replace(';', ',') for frame in stack)} {count}\n")
+
+    def write_speedscope(self, path: str, name: str):
+        """Ghi file định dạng speedscope (https://www.speedscope.app)"""
+        frames = []
+        frame_index = {}
+        samples = []
+        weights = []
+        for stack, count in self.samples.items():
+            indices = []
+            for label in stack:
+                if label not in frame_index:
+                    frame_index[label] = len(frames)
+                    frames.append({'name': label})
+                indices.append(frame_index[label])
+            samples.append(indices)
+            weights.append(count * self.interval)
+
+        document = {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'shared': {'frames': frames},
+            'profiles': [{
+                'type': 'sampled',
+                'name': name,
+                'unit': 'seconds',
+                'startValue': 0,
+                'endValue': sum(weights),
+                'samples': samples,
+                'weights': weights
+            }],
+            'name': name,
+            'exporter': 'youtube_transcript_extractor'
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(document, f)
+
+
+def propagate_profiling(func):
+    """
+    Bọc hàm sẽ chạy trên luồng khác (worker pool) để mẫu của luồng đó được tính cho
+    job đang được profile ở luồng gọi; trả về nguyên func nếu không có profiling
+    """
+    profiler = _active_profiler.get()
+    if profiler is None:
+        return func
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with profiler.attach_current_thread():
+            return func(*args, **kwargs)
+    return wrapper
+
+
+@contextmanager
+def profile_job(job_name: str, enabled: bool = None, **tags):
+    """
+    Profile một job nếu được bật, ghi kết quả vào logs/profiles
+    Args:
+        job_name: Tên job (vd: 'playlist', 'cli', 'zip')
+        enabled: Bật/tắt profiling; None thì theo biến môi trường PROFILE_JOBS
+        tags: Thông tin gắn vào tên file (vd: playlist_id, size); có thể cập nhật
+              thêm trong khi job chạy qua dict được yield ra
+    """
+    if enabled is None:
+        enabled = is_profiling_enabled()
+    if not enabled:
+        yield tags
+        return
+
+    error_handler = ErrorHandler()
+    interval = float(os.environ.get('PROFILE_INTERVAL', 0.01))
+    profiler = SamplingProfiler(interval)
+    profiler.start()
+    try:
+        with profiler.attach_current_thread():
+            yield tags
+    finally:
+        profiler.stop()
+        try:
+            profiles_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'logs', 'profiles')
+            os.makedirs(profiles_dir, exist_ok=True)
+
+            tag_text = '_'.join(f"{key}-{value}" for key, value in tags.items() if value is not None)
+            tag_text = re.sub(r'[^\w\-]', '_', tag_text)
+            base_name = f"{job_name}_{tag_text}_{datetime.now().strftime('%Y%m%d_%H%M%S')}".replace('__', '_')
+            base_path = os.path.join(profiles_dir, base_name)
+
+            profiler.write_collapsed(f"{base_path}.collapsed")
+            profiler.write_speedscope(f"{base_path}.speedscope.json", base_name)
+            error_handler.log_info(
+                f"Đã ghi profile {base_name} ({profiler.sample_count} mẫu, {profiler.duration:.1f}s)"
+            )
+        except Exception as e:
+            error_handler.log_error("Profiler Error", str(e), {"job": job_name, "tags": tags})
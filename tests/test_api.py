@@ -0,0 +1,196 @@
+import http.client
+import json
+import threading
+import time
+
+import pytest
+
+from src.api.server import ApiError, TranscriptApi, create_server
+from src.core.pipeline import TranscriptPipeline
+from src.core.storage import DataStorage
+from src.core.storage_backends import LocalStorageBackend
+from src.utils.error_handler import ErrorHandler
+
+
+class StubJob:
+    job_id = 'job-1'
+
+    def to_dict(self):
+        return {'job_id': self.job_id, 'status': 'running'}
+
+
+class StubApi:
+    """Thay TranscriptApi: không gọi mạng, chỉ ghi lại job được gửi"""
+
+    def __init__(self, data_storage):
+        self.error_handler = ErrorHandler()
+        self.data_storage = data_storage
+        self.submitted = []
+
+    def submit_job(self, urls, language, user_id):
+        self.submitted.append((urls, language, user_id))
+        return StubJob()
+
+
+@pytest.fixture
+def api(tmp_path):
+    return StubApi(DataStorage(backend=LocalStorageBackend(str(tmp_path))))
+
+
+@pytest.fixture
+def client(api, monkeypatch):
+    monkeypatch.delenv('API_TOKEN', raising=False)
+    monkeypatch.delenv('API_TOKENS', raising=False)
+    server = create_server('127.0.0.1', 0, api)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    def request(method, path, body=None, headers=None):
+        connection = http.client.HTTPConnection(*server.server_address[:2], timeout=10)
+        connection.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers or {})
+        response = connection.getresponse()
+        data = response.read()
+        connection.close()
+        return response, data
+
+    yield request
+    server.shutdown()
+    server.server_close()
+
+
+def _save(api, title='Video 1', text='hello'):
+    api.data_storage.save_transcript('p1', 'v1', title, {
+        'video_id': 'v1',
+        'title': title,
+        'transcript': [{'text': text, 'start': 0.0, 'duration': 1.0}],
+        'metadata': {'language': 'en', 'language_name': 'English', 'download_date': '2024-01-01T00:00:00'}
+    })
+
+
+def test_transcript_etag_and_not_modified(api, client):
+    _save(api)
+    response, body = client('GET', '/playlists/p1/transcripts/v1')
+    assert response.status == 200
+    assert json.loads(body)['title'] == 'Video 1'
+    etag = response.getheader('ETag')
+
+    response, body = client('GET', '/playlists/p1/transcripts/v1', headers={'If-None-Match': etag})
+    assert response.status == 304
+    assert body == b''
+    assert response.getheader('ETag') == etag
+
+    txt_response, _ = client('GET', '/playlists/p1/transcripts/v1?format=txt', headers={'If-None-Match': etag})
+    assert txt_response.status == 200
+    assert txt_response.getheader('ETag') != etag
+
+
+@pytest.mark.parametrize('change', [{'title': 'Tiêu đề mới'}, {'text': 'nội dung mới'}])
+def test_etag_changes_with_title_or_content(api, client, change):
+    _save(api)
+    etag = client('GET', '/playlists/p1/transcripts/v1')[0].getheader('ETag')
+
+    _save(api, **change)
+    response, body = client('GET', '/playlists/p1/transcripts/v1', headers={'If-None-Match': etag})
+    assert response.status == 200
+    assert response.getheader('ETag') != etag
+    data = json.loads(body)
+    assert data['title'] == change.get('title', 'Video 1')
+    assert data['transcript'][0]['text'] == change.get('text', 'hello')
+
+
+def test_missing_transcript_is_404(client):
+    assert client('GET', '/playlists/p1/transcripts/nope')[0].status == 404
+
+
+def test_job_user_comes_from_token_not_body(api, client, monkeypatch):
+    monkeypatch.setenv('API_TOKENS', 'alice:token-a,bob:token-b')
+    body = {'url': 'https://www.youtube.com/playlist?list=PL1', 'user_id': 'bob'}
+
+    response, _ = client('POST', '/jobs', body, {'Authorization': 'Bearer token-a'})
+    assert response.status == 202
+    assert api.submitted[-1][2] == 'alice'
+
+    assert client('POST', '/jobs', body, {'Authorization': 'Bearer wrong'})[0].status == 401
+    assert client('POST', '/jobs', body)[0].status == 401
+    assert len(api.submitted) == 1
+
+
+def test_client_user_id_is_ignored_without_tokens(api, client):
+    response, _ = client('POST', '/jobs', {'url': 'https://www.youtube.com/playlist?list=PL1', 'user_id': 'bob'})
+    assert response.status == 202
+    assert api.submitted[-1][2] == 'api'
+
+
+class BlockingPlaylistHandler:
+    """Thay PlaylistHandler: lấy thông tin playlist bị chặn tới khi test cho phép"""
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    def validate_playlist_url(self, url):
+        return 'list=' in url
+
+    def get_playlist_info(self, url):
+        self.release.wait(5)
+        if 'BROKEN' in url:
+            return None
+        return {'id': 'p1', 'title': 'Playlist 1', 'channel': 'Kênh'}
+
+    def get_playlist_videos(self, url):
+        return [{'video_id': 'v1', 'title': 'Video 1'}]
+
+
+class FinishingPipeline(TranscriptPipeline):
+    def run_batch(self, playlists, language, bus=None, job_id=None, control=None, user_id=None):
+        return {'success_count': 1, 'failed_count': 0, 'failed_videos': [], 'stop_reason': None}
+
+
+@pytest.fixture
+def transcript_api(tmp_path):
+    storage = DataStorage(backend=LocalStorageBackend(str(tmp_path)))
+    return TranscriptApi(storage, BlockingPlaylistHandler(), FinishingPipeline(None, storage))
+
+
+def _wait_done(job):
+    deadline = time.monotonic() + 5
+    while not job.done and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return job.to_dict()
+
+
+def test_submit_returns_before_playlists_are_resolved(transcript_api):
+    job = transcript_api.submit_job(['https://www.youtube.com/playlist?list=PL1'], 'en', 'alice')
+    assert (job.status, job.total) == ('resolving', 0)
+
+    transcript_api.playlist_handler.release.set()
+    status = _wait_done(job)
+    assert (status['status'], status['total'], status['success_count']) == ('finished', 1, 1)
+    assert status['playlists'][0]['playlist_id'] == 'p1'
+
+
+def test_resolution_error_is_reported_through_job_status(transcript_api):
+    with pytest.raises(ApiError) as error:
+        transcript_api.submit_job(['https://example.com/not-a-playlist'], 'en', 'alice')
+    assert error.value.status == 400
+
+    transcript_api.playlist_handler.release.set()
+    job = transcript_api.submit_job(['https://www.youtube.com/playlist?list=BROKEN'], 'en', 'alice')
+    status = _wait_done(job)
+    assert status['status'] == 'failed'
+    assert 'BROKEN' in status['error']
+    assert list(job.iter_results()) == []
+
+
+class FailingJob(StubJob):
+    def iter_results(self):
+        yield {'video_id': 'v1', 'status': 'success', 'playlist_ids': ['p1']}
+        raise RuntimeError('kết quả hỏng')
+
+
+def test_stream_ends_with_error_record_when_results_fail(api, client):
+    api.get_job = lambda job_id: FailingJob()
+    response, body = client('GET', '/jobs/job-1/results')
+    assert response.status == 200
+    lines = [json.loads(line) for line in body.decode('utf-8').splitlines()]
+    assert [line['type'] for line in lines] == ['video', 'error']
+    assert lines[1]['error'] == 'kết quả hỏng'
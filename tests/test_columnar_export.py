@@ -0,0 +1,77 @@
+import json
+
+import pytest
+
+from src.core import columnar_export
+from src.core.storage import DataStorage
+from src.core.storage_backends import LocalStorageBackend
+
+pytestmark = pytest.mark.skipif(columnar_export.pa is None, reason="cần pyarrow")
+
+
+@pytest.fixture
+def storage(tmp_path):
+    return DataStorage(backend=LocalStorageBackend(str(tmp_path / 'data')))
+
+
+def _transcript_data(video_id, lines, language='en'):
+    return {
+        'video_id': video_id,
+        'title': f"Video {video_id}",
+        'transcript': [{'text': text, 'start': float(i * 2), 'duration': 2.0} for i, text in enumerate(lines)],
+        'metadata': {'language': language, 'language_name': 'English', 'download_date': '2024-01-01T00:00:00'}
+    }
+
+
+def _populate(storage):
+    # v1 nằm trong hai playlist: segment chỉ được ghi một lần
+    for playlist_id in ('p1', 'p2'):
+        storage.save_transcript(playlist_id, 'v1', 'Video v1', _transcript_data('v1', ['a', 'b', 'c']))
+        storage.save_metadata(playlist_id, {'title': f"Playlist {playlist_id}", 'channel': 'Kênh A'})
+    storage.save_transcript('p1', 'v2', 'Video v2', _transcript_data('v2', ['d', 'e']))
+    # Playlist lưu theo cấu trúc cũ: chỉ có json/<tên file>.json
+    storage.backend.write_bytes('playlists/old/json/Video v3_v3.json',
+                                json.dumps(_transcript_data('v3', ['f', 'g', 'h', 'i'])).encode('utf-8'))
+
+
+@pytest.mark.parametrize('fmt', ['parquet', 'arrow'])
+def test_export_round_trip(storage, tmp_path, fmt):
+    _populate(storage)
+    output_dir = str(tmp_path / 'out')
+    summary = columnar_export.CorpusExporter(storage, row_group_size=2).export(output_dir, fmt=fmt)
+
+    assert (summary['playlist_count'], summary['video_count'], summary['segment_count']) == (3, 4, 9)
+    if fmt == 'arrow':
+        pa = columnar_export.pa
+        with pa.memory_map(summary['segments_path']) as source:
+            segments = pa.ipc.open_file(source).read_all()
+        with pa.memory_map(summary['videos_path']) as source:
+            videos = pa.ipc.open_file(source).read_all()
+    else:
+        segments = columnar_export.pq.read_table(summary['segments_path'])
+        videos = columnar_export.pq.read_table(summary['videos_path'])
+
+    assert segments.num_rows == 9
+    assert videos.num_rows == 4
+    segment_rows = segments.to_pylist()
+    assert [row['text'] for row in segment_rows if row['video_id'] == 'v1'] == ['a', 'b', 'c']
+    assert len({row['content_hash'] for row in segment_rows}) == 3
+
+    video_rows = {(row['playlist_id'], row['video_id']): row for row in videos.to_pylist()}
+    assert set(video_rows) == {('p1', 'v1'), ('p1', 'v2'), ('p2', 'v1'), ('old', 'v3')}
+    assert video_rows['p1', 'v1']['content_hash'] == video_rows['p2', 'v1']['content_hash']
+    assert (video_rows['old', 'v3']['segment_count'], video_rows['old', 'v3']['duration']) == (4, 8.0)
+    assert video_rows['p2', 'v1']['channel'] == 'Kênh A'
+    # Segment nối được với video qua content_hash
+    assert video_rows['old', 'v3']['content_hash'] in {row['content_hash'] for row in segment_rows}
+
+
+def test_legacy_ref_matches_stored_content(storage):
+    _populate(storage)
+    storage.backend.write_bytes('playlists/old/json/Video v1_v1.json',
+                                json.dumps(_transcript_data('v1', ['a', 'b', 'c'])).encode('utf-8'))
+
+    legacy = {ref['video_id']: ref for ref in storage.get_playlist_refs('old', include_legacy=True)}
+    assert legacy['v1']['content_hash'] == storage.get_transcript_ref('p1', 'v1')['content_hash']
+    assert storage.load_transcript(legacy['v3'])['transcript'][3]['text'] == 'i'
+    assert storage.get_playlist_refs('old') == []
@@ -0,0 +1,120 @@
+from contextlib import contextmanager
+
+import pytest
+
+from src.core.coverage import LanguageCoverageScanner
+from src.core.retry import FailureReason, RetryPolicy, TranscriptFetchError
+from src.core.transcript import TranscriptExtractor
+
+
+class DictCache:
+    def __init__(self):
+        self.entries = {}
+
+    def get_or_fetch(self, kind, key, fetch):
+        if (kind, key) not in self.entries:
+            value = fetch()
+            if value is None:
+                return None
+            self.entries[(kind, key)] = value
+        return self.entries[(kind, key)]
+
+
+class RecordingScheduler:
+    def __init__(self):
+        self.slots = []
+
+    @contextmanager
+    def slot(self, user_id=None, priority=None, control=None, charge=True):
+        self.slots.append(user_id)
+        yield
+
+
+class ListingBackend:
+    name = 'listing'
+
+    def __init__(self, listings):
+        # video_id -> danh sách track hoặc exception
+        self.listings = listings
+        self.calls = 0
+
+    def list_tracks(self, video_id):
+        self.calls += 1
+        listing = self.listings[video_id]
+        if isinstance(listing, Exception):
+            raise listing
+        return listing
+
+
+def _track(language, generated=False, translatable=False):
+    return {'language': language, 'generated': generated, 'translatable': translatable}
+
+
+@pytest.fixture
+def extractor():
+    extractor = TranscriptExtractor()
+    extractor.metadata_cache = DictCache()
+    extractor.scheduler = RecordingScheduler()
+    extractor.retry_policy = RetryPolicy(max_attempts=1, base_delay=0)
+    return extractor
+
+
+def test_listing_takes_a_scheduler_slot_only_on_cache_miss(extractor):
+    backend = ListingBackend({'v1': [_track('en')], 'v2': [_track('vi')]})
+    extractor.backends = [backend]
+    scanner = LanguageCoverageScanner(extractor, max_workers=2)
+    videos = [{'video_id': 'v1'}, {'video_id': 'v2'}]
+
+    scanner.scan(videos, 'en', user_id='alice')
+    assert sorted(extractor.scheduler.slots) == ['alice', 'alice']
+
+    report = scanner.scan(videos, 'en', user_id='alice')
+    assert len(extractor.scheduler.slots) == 2
+    assert backend.calls == 2
+    assert report.usable_ids() == {'v1'}
+
+
+class TooManyRequests(Exception):
+    pass
+
+
+def _scan(extractor, listings, language='en'):
+    extractor.backends = [ListingBackend(listings)]
+    videos = [{'video_id': video_id, 'title': video_id} for video_id in listings]
+    return LanguageCoverageScanner(extractor, max_workers=2).scan(videos, language)
+
+
+def test_only_definite_failures_are_unavailable(extractor):
+    report = _scan(extractor, {
+        'english_only': [_track('en')],
+        'translated': [_track('en', translatable=True)],
+        'vietnamese': [_track('vi')],
+        'disabled': TranscriptFetchError(FailureReason.TRANSCRIPTS_DISABLED),
+        'throttled': TooManyRequests('x'),
+    }, language='vi')
+
+    assert report.usable_ids() == {'translated', 'vietnamese'}
+    assert report.unavailable_ids() == {'english_only', 'disabled'}
+    assert not report.is_unavailable('throttled')
+    assert not report.is_unavailable('added_after_scan')
+    assert report.unavailable_reason('disabled') == FailureReason.TRANSCRIPTS_DISABLED
+    assert report.unavailable_reason('english_only') == FailureReason.NO_TRANSCRIPT
+
+
+def test_filter_playlists_keeps_videos_with_transient_scan_errors(extractor):
+    report = _scan(extractor, {
+        'usable': [_track('en')],
+        'missing': [_track('vi')],
+        'throttled': TooManyRequests('x'),
+    })
+    playlists = [
+        {'videos': [{'video_id': 'usable'}, {'video_id': 'missing'}, {'video_id': 'throttled'}]},
+        {'videos': [{'video_id': 'missing'}, {'video_id': 'new'}]},
+    ]
+
+    skipped = report.filter_playlists(playlists)
+
+    assert [video['video_id'] for video in skipped] == ['missing']
+    assert skipped[0]['status'] == 'failed'
+    assert [video['video_id'] for video in playlists[0]['videos']] == ['usable', 'throttled']
+    assert [video['video_id'] for video in playlists[1]['videos']] == ['new']
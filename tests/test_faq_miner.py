@@ -0,0 +1,65 @@
+import json
+
+import pytest
+
+from src.core import faq_miner
+from src.core.storage import DataStorage
+from src.core.storage_backends import LocalStorageBackend
+
+pytestmark = pytest.mark.skipif(faq_miner.np is None or faq_miner.sparse is None, reason="cần numpy và scipy")
+
+
+@pytest.fixture
+def storage(tmp_path):
+    return DataStorage(backend=LocalStorageBackend(str(tmp_path)))
+
+
+def _transcript_data(video_id, lines):
+    return {
+        'video_id': video_id,
+        'title': f"Video {video_id}",
+        'transcript': [{'text': text, 'start': float(i * 5), 'duration': 5.0} for i, text in enumerate(lines)],
+        'metadata': {'language': 'en', 'language_name': 'English', 'download_date': '2024-01-01T00:00:00'}
+    }
+
+
+def _save(storage, video_id, lines):
+    storage.save_transcript('p1', video_id, f"Video {video_id}", _transcript_data(video_id, lines))
+
+
+def test_mine_groups_questions_and_caches_through_analysis_documents(storage):
+    _save(storage, 'v1', ['Welcome to the python course.', 'How do I install python on windows?',
+                          'Today we learn loops.'])
+    _save(storage, 'v2', ['In this lesson we cover functions.', 'How do I install python on windows?',
+                          'Functions take arguments.'])
+
+    result = faq_miner.FaqMiner(storage).mine('p1')
+    top = result['faq'][0]
+    assert top['question'] == 'How do I install python on windows?'
+    assert (top['occurrences'], top['video_count']) == (2, 2)
+
+    key = f"faq/v{faq_miner.ANALYSIS_VERSION}/playlists/p1"
+    assert storage.load_analysis(key)['manifest_hash'] == result['manifest_hash']
+    assert storage.backend.exists(f"analysis/{key}.json")
+
+    # Kết quả cache được dùng lại khi manifest không đổi
+    storage.save_analysis(key, dict(result, faq=[]))
+    assert faq_miner.FaqMiner(storage).mine('p1')['faq'] == []
+    assert faq_miner.FaqMiner(storage).mine('p1', force=True)['faq'][0]['question'] == top['question']
+
+
+def test_mine_includes_transcripts_in_the_legacy_layout(storage):
+    _save(storage, 'v1', ['How do I install python on windows?', 'Today we learn loops.'])
+    storage.backend.write_bytes('playlists/p1/json/Video v2_v2.json', json.dumps(
+        _transcript_data('v2', ['Welcome back.', 'How do I install python on windows?'])
+    ).encode('utf-8'))
+
+    result = faq_miner.FaqMiner(storage).mine('p1')
+    assert result['video_count'] == 2
+    assert (result['faq'][0]['occurrences'], result['faq'][0]['video_count']) == (2, 2)
+
+
+def test_miner_requires_scipy(storage, monkeypatch):
+    monkeypatch.setattr(faq_miner, 'sparse', None)
+    with pytest.raises(ImportError):
+        faq_miner.FaqMiner(storage)
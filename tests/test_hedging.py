@@ -0,0 +1,62 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.core import transcript
+
+
+class SlowBackend:
+    def __init__(self, name, delay, text='hello'):
+        self.name = name
+        self.delay = delay
+        self.text = text
+        self.calls = 0
+
+    def fetch(self, video_id, language_code):
+        self.calls += 1
+        time.sleep(self.delay)
+        return [{'text': self.text, 'start': 0.0, 'duration': 1.0}]
+
+
+@pytest.fixture
+def executor(monkeypatch):
+    executor = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(transcript, '_HEDGE_EXECUTOR', executor)
+    yield executor
+    executor.shutdown(wait=True)
+
+
+@pytest.fixture
+def extractor():
+    extractor = transcript.TranscriptExtractor()
+    extractor.hedge_delay = 0.2
+    return extractor
+
+
+def test_slow_primary_is_hedged(monkeypatch, extractor):
+    monkeypatch.setattr(transcript, '_HEDGE_EXECUTOR', ThreadPoolExecutor(max_workers=2))
+    primary = SlowBackend('primary', 1.0, 'primary')
+    fallback = SlowBackend('fallback', 0.0, 'fallback')
+    extractor.backends = [primary, fallback]
+
+    started = time.monotonic()
+    assert extractor._fetch_hedged('vid', 'en')[0]['text'] == 'fallback'
+    assert time.monotonic() - started < 0.8
+    assert fallback.calls == 1
+
+
+def test_time_queued_in_executor_does_not_count_towards_hedge_delay(executor, extractor):
+    # Luồng duy nhất của executor đang bận: request chính phải xếp hàng lâu hơn hedge_delay
+    release = threading.Event()
+    executor.submit(release.wait)
+    threading.Timer(0.4, release.set).start()
+
+    primary = SlowBackend('primary', 0.05, 'primary')
+    fallback = SlowBackend('fallback', 0.0, 'fallback')
+    extractor.backends = [primary, fallback]
+
+    assert extractor._fetch_hedged('vid', 'en')[0]['text'] == 'primary'
+    assert fallback.calls == 0
+
@@ -0,0 +1,68 @@
+import threading
+import time
+
+import pytest
+
+from src.core import job_control
+from src.core.job_control import JobControl
+from src.core.retry import FailureReason
+
+
+class FakeClock:
+    """Thay time.monotonic trong job_control: ngân sách chỉ trôi khi test tăng đồng hồ"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(job_control, 'time', clock)
+    return clock
+
+
+def test_budget_from_env(monkeypatch):
+    monkeypatch.setenv('JOB_DEADLINE_SECONDS', '0')
+    control = JobControl.from_env()
+    assert control.remaining() is None and control.stop_reason is None
+
+    monkeypatch.setenv('JOB_DEADLINE_SECONDS', '30')
+    assert JobControl.from_env().budget_seconds == 30
+
+
+def test_deadline_is_reached_after_budget(clock):
+    control = JobControl(budget_seconds=10)
+
+    clock.now += 4
+    assert control.remaining() == 6
+    assert control.stop_reason is None
+    clock.now += 6
+    assert control.remaining() == 0
+    assert control.stop_reason == FailureReason.DEADLINE_EXCEEDED
+
+
+def test_wait_is_cut_short_by_deadline(clock):
+    control = JobControl(budget_seconds=10)
+    clock.now += 10
+
+    started = time.monotonic()
+    assert control.wait(60)
+    assert time.monotonic() - started < 5
+
+
+def test_cancel_keeps_first_reason_and_wakes_waiters():
+    control = JobControl()
+    assert not control.wait(0)
+
+    timer = threading.Timer(0.05, control.cancel)
+    timer.start()
+    started = time.monotonic()
+    assert control.wait(30)
+    assert time.monotonic() - started < 5
+
+    control.cancel(FailureReason.DEADLINE_EXCEEDED)
+    assert control.stop_reason == FailureReason.CANCELLED
@@ -0,0 +1,131 @@
+import threading
+import time
+
+import pytest
+
+from src.core import metadata_cache
+from src.core.metadata_cache import MetadataCache
+
+
+class FakeClock:
+    """Thay module time trong metadata_cache: tuổi của entry chỉ đổi khi test tăng đồng hồ"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+class Fetcher:
+    """Hàm tải giả: trả lần lượt các giá trị cho trước và báo khi được gọi"""
+
+    def __init__(self, *values):
+        self.values = list(values)
+        self.calls = 0
+        self.called = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        self.called.set()
+        return self.values.pop(0)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(metadata_cache, 'time', clock)
+    return clock
+
+
+@pytest.fixture
+def make_cache(monkeypatch, tmp_path, clock):
+    """Tạo MetadataCache mới (bỏ qua instance dùng chung), lưu đĩa vào thư mục tạm"""
+    def make(backend='memory', size=100):
+        monkeypatch.setattr(MetadataCache, '_instance', None)
+        monkeypatch.setattr(MetadataCache, '_initialized', False)
+        monkeypatch.setenv('METADATA_CACHE_BACKEND', backend)
+        monkeypatch.setenv('METADATA_CACHE_SIZE', str(size))
+        cache = MetadataCache()
+        cache.cache_dir = str(tmp_path / 'metadata')
+        return cache
+    return make
+
+
+def _wait_for_refresh(cache, fetcher):
+    assert fetcher.called.wait(5)
+    for _ in range(500):
+        if not cache._refreshing:
+            return
+        time.sleep(0.01)
+    raise AssertionError('làm mới trong nền chưa xong')
+
+
+def test_fresh_entry_is_served_without_fetching(make_cache, clock):
+    cache = make_cache()
+    fetcher = Fetcher({'title': 'A'}, {'title': 'B'})
+
+    assert cache.get_or_fetch('playlist', 'p1', fetcher) == {'title': 'A'}
+    clock.now += cache.ttls['playlist'] - 1
+    assert cache.get_or_fetch('playlist', 'p1', fetcher) == {'title': 'A'}
+    assert fetcher.calls == 1
+
+
+def test_stale_entry_is_served_while_refreshing_in_background(make_cache, clock):
+    cache = make_cache()
+    cache.get_or_fetch('playlist', 'p1', Fetcher({'title': 'A'}))
+
+    clock.now += cache.ttls['playlist'] + 1
+    fetcher = Fetcher({'title': 'B'})
+    # Trả ngay bản cũ, bản mới có sau khi luồng nền tải xong
+    assert cache.get_or_fetch('playlist', 'p1', fetcher) == {'title': 'A'}
+    _wait_for_refresh(cache, fetcher)
+    assert cache.get_or_fetch('playlist', 'p1', fetcher) == {'title': 'B'}
+    assert fetcher.calls == 1
+
+
+def test_entry_older_than_max_stale_is_fetched_synchronously(make_cache, clock):
+    cache = make_cache()
+    cache.get_or_fetch('playlist_videos', 'p1', Fetcher(['v1']))
+
+    clock.now += cache.ttls['playlist_videos'] * cache.stale_factor
+    fetcher = Fetcher(['v1', 'v2'])
+    assert cache.get_or_fetch('playlist_videos', 'p1', fetcher) == ['v1', 'v2']
+    assert fetcher.calls == 1
+
+
+def test_failed_fetch_is_not_cached(make_cache):
+    cache = make_cache()
+    fetcher = Fetcher(None, {'title': 'A'})
+
+    assert cache.get_or_fetch('video', 'v1', fetcher) is None
+    assert cache.peek('video', 'v1') is None
+    assert cache.get_or_fetch('video', 'v1', fetcher) == {'title': 'A'}
+
+
+def test_cached_value_is_a_copy(make_cache):
+    cache = make_cache()
+    value = cache.get_or_fetch('video', 'v1', Fetcher({'tags': ['a']}))
+    value['tags'].append('b')
+
+    assert cache.peek('video', 'v1') == {'tags': ['a']}
+
+
+def test_least_recently_used_entry_is_evicted(make_cache):
+    cache = make_cache(size=2)
+    cache.put('video', 'v1', 1)
+    cache.put('video', 'v2', 2)
+    cache.peek('video', 'v1')
+    cache.put('video', 'v3', 3)
+
+    assert [cache.peek('video', key) for key in ('v1', 'v2', 'v3')] == [1, None, 3]
+
+
+def test_disk_entries_survive_restart_with_original_age(make_cache, clock):
+    make_cache(backend='disk').put('playlist', 'p1', {'title': 'A'})
+
+    cache = make_cache(backend='disk')
+    assert cache.get_or_fetch('playlist', 'p1', Fetcher()) == {'title': 'A'}
+    # Tuổi tính từ lúc tải ban đầu, không phải lúc đọc lại từ đĩa
+    clock.now += cache.ttls['playlist'] * cache.stale_factor
+    assert cache.get_or_fetch('playlist', 'p1', Fetcher({'title': 'B'})) == {'title': 'B'}
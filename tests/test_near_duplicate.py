@@ -0,0 +1,59 @@
+import random
+
+import pytest
+
+from src.core import near_duplicate
+from src.core.near_duplicate import MinHasher, NearDuplicateIndex
+from src.core.storage_backends import LocalStorageBackend
+
+
+def _text(word_count, seed=0):
+    rng = random.Random(seed)
+    words = [f"w{rng.randint(0, 500)}" for _ in range(word_count)]
+    return ' '.join(words)
+
+
+@pytest.mark.skipif(near_duplicate.np is None, reason="cần numpy")
+@pytest.mark.parametrize('word_count', [0, 3, 5, 200, 10000])
+def test_numpy_signature_matches_pure_python(monkeypatch, word_count):
+    hasher = MinHasher()
+    text = _text(word_count)
+    fast = hasher.signature(text)
+    monkeypatch.setattr(near_duplicate, 'np', None)
+    assert fast == hasher.signature(text)
+
+
+def _segments(text):
+    return [{'text': text, 'start': 0.0, 'duration': 1.0}]
+
+
+def test_index_persists_on_backend_and_is_shared_per_location(tmp_path):
+    index = NearDuplicateIndex(LocalStorageBackend(str(tmp_path)))
+    assert NearDuplicateIndex(LocalStorageBackend(str(tmp_path))) is index
+    assert NearDuplicateIndex(LocalStorageBackend(str(tmp_path / 'other'))) is not index
+
+    original = _text(300, seed=1)
+    assert index.check('obj-1', 'video-1', 'en', _segments(original)) is None
+    match = index.check('obj-2', 'video-2', 'en', _segments(original + ' thêm một câu'))
+    assert match['video_id'] == 'video-1'
+    assert match['object'] == 'obj-1'
+
+    records = LocalStorageBackend(str(tmp_path)).read_records('index/minhash')
+    assert len(records) == 2
+
+
+def test_index_reloads_records_appended_by_other_processes(tmp_path, monkeypatch):
+    # Mỗi process có instance riêng: bỏ qua instance dùng chung trong process khi tạo instance thứ hai
+    first = NearDuplicateIndex(LocalStorageBackend(str(tmp_path)))
+    monkeypatch.setattr(NearDuplicateIndex, '_instances', {})
+    second = NearDuplicateIndex(LocalStorageBackend(str(tmp_path)))
+    assert second is not first
+
+    original = _text(300, seed=2)
+    assert first.check('obj-1', 'video-1', 'en', _segments(original)) is None
+    match = second.check('obj-2', 'video-2', 'en', _segments(original + ' bản tải lại'))
+    assert (match['video_id'], match['object']) == ('video-1', 'obj-1')
+    # Bản ghi của instance thứ hai được instance đầu nạp lại ở lần kiểm tra sau
+    assert first.get('obj-2') is None
+    assert first.check('obj-3', 'video-3', 'en', _segments(original + ' bản khác')) is not None
+    assert first.get('obj-2')['video_id'] == 'video-2'
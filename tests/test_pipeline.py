@@ -0,0 +1,134 @@
+import threading
+import time
+
+import pytest
+
+from src.core.job_control import JobControl
+from src.core.pipeline import TranscriptPipeline
+from src.core.progress import ProgressBus
+from src.core.retry import FailureReason
+from src.core.storage import DataStorage
+from src.core.storage_backends import LocalStorageBackend
+
+
+class StubExtractor:
+    """Trả transcript dựng sẵn; video trong `missing` không có phụ đề"""
+
+    def __init__(self, missing=()):
+        self.missing = set(missing)
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def fetch_transcript(self, video_id, title, language_code='en', control=None, user_id=None, priority=None):
+        with self._lock:
+            self.calls.append(video_id)
+        if video_id in self.missing:
+            return None, FailureReason.NO_TRANSCRIPT
+        return {
+            'video_id': video_id,
+            'title': title,
+            'transcript': [{'text': f"nội dung {video_id}", 'start': 0.0, 'duration': 1.0}],
+            'metadata': {'language': language_code, 'language_name': 'English', 'download_date': '2024-01-01T00:00:00'}
+        }, None
+
+
+@pytest.fixture
+def storage(tmp_path):
+    return DataStorage(backend=LocalStorageBackend(str(tmp_path / 'data')))
+
+
+def _playlist(playlist_id, video_ids):
+    return {'playlist_id': playlist_id, 'videos': [{'video_id': video_id, 'title': video_id} for video_id in video_ids]}
+
+
+def test_build_work_set_keeps_first_occurrence_and_membership(storage):
+    pipeline = TranscriptPipeline(StubExtractor(), storage)
+    playlists = [_playlist('p1', ['v1', 'v2', 'v1']), _playlist('p2', ['v2', 'v3'])]
+
+    unique_videos, membership = pipeline.build_work_set(playlists)
+    assert [video['video_id'] for video in unique_videos] == ['v1', 'v2', 'v3']
+    assert unique_videos[1] is playlists[0]['videos'][1]
+    assert membership == {'v1': ['p1'], 'v2': ['p1', 'p2'], 'v3': ['p2']}
+
+
+def test_run_batch_fetches_shared_video_once_and_stores_it_in_every_playlist(storage):
+    extractor = StubExtractor(missing={'v4'})
+    pipeline = TranscriptPipeline(extractor, storage)
+    playlists = [_playlist('p1', ['v1', 'v2', 'v4']), _playlist('p2', ['v2', 'v3', 'v4'])]
+    events = []
+    bus = ProgressBus()
+    bus.subscribe(lambda event: events.append(event.kind))
+
+    summary = pipeline.run_batch(playlists, 'en', bus, job_id='job')
+
+    assert sorted(extractor.calls) == ['v1', 'v2', 'v3', 'v4']
+    assert (summary['success_count'], summary['failed_count']) == (3, 1)
+    assert [video['video_id'] for video in summary['failed_videos']] == ['v4']
+    assert summary['playlists'] == {
+        'p1': {'success_count': 2, 'failed_count': 1, 'total': 3},
+        'p2': {'success_count': 2, 'failed_count': 1, 'total': 3}
+    }
+    assert events == ['job_started'] + ['video_finished'] * 4 + ['job_finished']
+
+    # Video dùng chung được lưu vào cả hai playlist, trỏ tới cùng một object
+    assert storage.get_transcript_ref('p1', 'v2')['object'] == storage.get_transcript_ref('p2', 'v2')['object']
+    assert {ref['video_id'] for ref in storage.get_playlist_refs('p2')} == {'v2', 'v3'}
+
+
+def test_run_batch_copies_result_to_duplicate_entries(storage):
+    pipeline = TranscriptPipeline(StubExtractor(missing={'v2'}), storage)
+    playlists = [_playlist('p1', ['v1', 'v2']), _playlist('p2', ['v2', 'v1'])]
+
+    pipeline.run_batch(playlists, 'en')
+
+    # Bản sao trong playlist thứ hai là dict khác nhưng có cùng trạng thái
+    duplicate_v2, duplicate_v1 = playlists[1]['videos']
+    assert duplicate_v1['status'] == 'success' and 'error_type' not in duplicate_v1
+    assert (duplicate_v2['status'], duplicate_v2['error_type']) == ('failed', FailureReason.NO_TRANSCRIPT)
+
+
+def test_cancelled_batch_keeps_finished_videos_and_saves_pending_ones(storage):
+    control = JobControl()
+
+    class CancellingExtractor(StubExtractor):
+        def fetch_transcript(self, video_id, *args, **kwargs):
+            # Người dùng bấm dừng trong lúc video thứ hai đang tải: video đó vẫn được lưu
+            if video_id == 'v2':
+                control.cancel()
+            return super().fetch_transcript(video_id, *args, **kwargs)
+
+    pipeline = TranscriptPipeline(CancellingExtractor(missing={'v1'}), storage)
+    pipeline.max_workers = 1
+    playlists = [_playlist('p1', ['v1', 'v2', 'v3', 'v4'])]
+
+    summary = pipeline.run_batch(playlists, 'en', job_id='job', control=control)
+
+    assert summary['stop_reason'] == FailureReason.CANCELLED
+    assert [video.get('error_type') for video in playlists[0]['videos']] == [
+        FailureReason.NO_TRANSCRIPT, None, FailureReason.CANCELLED, FailureReason.CANCELLED
+    ]
+    assert storage.get_transcript_ref('p1', 'v2') is not None
+    state = storage.get_job_state('p1')
+    assert (state['job_id'], state['status'], state['total'], state['success_count']) == (
+        'job', FailureReason.CANCELLED, 4, 1
+    )
+    # Video lỗi vĩnh viễn không cần chạy lại
+    assert state['pending_video_ids'] == ['v3', 'v4']
+
+    # Chạy lại hết thì trạng thái dừng sớm được xóa
+    pipeline.run_batch([_playlist('p1', state['pending_video_ids'])], 'en')
+    assert storage.get_job_state('p1') is None
+
+
+def test_expired_budget_marks_every_video_deadline_exceeded(storage):
+    extractor = StubExtractor()
+    pipeline = TranscriptPipeline(extractor, storage)
+    control = JobControl(budget_seconds=1)
+    control.deadline = time.monotonic()
+
+    summary = pipeline.run_batch([_playlist('p1', ['v1', 'v2'])], 'en', control=control)
+
+    assert extractor.calls == []
+    assert summary['stop_reason'] == FailureReason.DEADLINE_EXCEEDED
+    assert {video['error_type'] for video in summary['failed_videos']} == {FailureReason.DEADLINE_EXCEEDED}
+    assert storage.get_job_state('p1')['pending_video_ids'] == ['v1', 'v2']
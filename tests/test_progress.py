@@ -0,0 +1,101 @@
+import pytest
+
+from src.core import progress
+from src.core.progress import ProgressBus, ProgressEvent
+
+
+class FakeClock:
+    """Thay module time trong progress: thời gian chỉ đổi khi test tăng đồng hồ"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(progress, 'time', clock)
+    return clock
+
+
+def _video(completed, total=10):
+    return ProgressEvent(ProgressEvent.VIDEO_FINISHED, 'job', total, completed=completed,
+                         success_count=completed, video={'status': 'success'})
+
+
+def _subscribe(bus, max_updates_per_second=None):
+    received = []
+    bus.subscribe(lambda event: received.append((event.kind, event.completed)), max_updates_per_second)
+    return received
+
+
+def test_events_within_interval_are_coalesced_to_latest(clock):
+    bus = ProgressBus()
+    throttled = _subscribe(bus, max_updates_per_second=2)
+    unthrottled = _subscribe(bus)
+
+    for completed in (1, 2, 3):
+        bus.emit(_video(completed))
+        clock.now += 0.125
+    assert throttled == [('video_finished', 1)]
+    assert len(unthrottled) == 3
+
+    # Đã đủ 0.5s kể từ lần gửi trước: sự kiện mới được gửi ngay, sự kiện chờ bị bỏ
+    clock.now += 0.125
+    bus.emit(_video(4))
+    assert throttled == [('video_finished', 1), ('video_finished', 4)]
+    bus.tick()
+    assert len(throttled) == 2
+
+
+def test_tick_flushes_pending_event_on_trailing_edge(clock):
+    bus = ProgressBus()
+    received = _subscribe(bus, max_updates_per_second=4)
+    bus.emit(_video(1))
+    bus.emit(_video(2))
+    bus.emit(_video(3))
+
+    # Chưa đến hạn: tick() không gửi gì
+    clock.now += 0.1
+    bus.tick()
+    assert received == [('video_finished', 1)]
+
+    clock.now += ProgressBus.TICK_INTERVAL
+    bus.tick()
+    assert received == [('video_finished', 1), ('video_finished', 3)]
+    clock.now += ProgressBus.TICK_INTERVAL
+    bus.tick()
+    assert len(received) == 2
+
+
+def test_job_finished_flushes_pending_event_first(clock):
+    bus = ProgressBus()
+    received = _subscribe(bus, max_updates_per_second=1)
+    bus.emit(ProgressEvent(ProgressEvent.JOB_STARTED, 'job', 2))
+    bus.emit(_video(1, total=2))
+    bus.emit(_video(2, total=2))
+    bus.emit(ProgressEvent(ProgressEvent.JOB_FINISHED, 'job', 2, completed=2))
+
+    assert received == [('job_started', 0), ('video_finished', 2), ('job_finished', 2)]
+
+
+def test_subscriber_error_does_not_stop_other_subscribers(clock):
+    bus = ProgressBus()
+
+    def broken(event):
+        raise RuntimeError('giao diện lỗi')
+
+    subscription = bus.subscribe(broken)
+    received = _subscribe(bus)
+    bus.emit(_video(1))
+    assert received == [('video_finished', 1)]
+
+    bus.unsubscribe(subscription)
+    bus.emit(_video(2))
+    assert received == [('video_finished', 1), ('video_finished', 2)]
@@ -0,0 +1,107 @@
+import pytest
+
+from src.core import rate_limiter
+from src.core.rate_limiter import RateLimiter
+
+
+class FakeClock:
+    """Thay module time trong rate_limiter: sleep() chỉ tăng đồng hồ, không chờ thật"""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class TooManyRequests(Exception):
+    pass
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter, 'time', clock)
+    return clock
+
+
+@pytest.fixture
+def make_limiter(monkeypatch, clock):
+    """Tạo RateLimiter mới (bỏ qua instance dùng chung) với cấu hình cho trước"""
+    def make(initial=2.0, burst=1.0, min_rate=0.2, max_rate=10.0):
+        monkeypatch.setattr(RateLimiter, '_instance', None)
+        monkeypatch.setattr(RateLimiter, '_initialized', False)
+        monkeypatch.setenv('YT_RATE_INITIAL', str(initial))
+        monkeypatch.setenv('YT_RATE_BURST', str(burst))
+        monkeypatch.setenv('YT_RATE_MIN', str(min_rate))
+        monkeypatch.setenv('YT_RATE_MAX', str(max_rate))
+        return RateLimiter()
+    return make
+
+
+def test_tokens_are_refilled_at_current_rate(make_limiter, clock):
+    limiter = make_limiter(initial=2.0, burst=1.0)
+
+    limiter.acquire()
+    assert clock.sleeps == []
+    # Hết token: chờ 1/rate giây cho token tiếp theo
+    limiter.acquire()
+    assert clock.sleeps == [pytest.approx(0.5)]
+
+
+def test_success_increases_rate_additively_up_to_max(make_limiter):
+    limiter = make_limiter(initial=2.0, max_rate=2.25)
+
+    limiter.on_success()
+    assert limiter.rate == pytest.approx(2.1)
+    for _ in range(5):
+        limiter.on_success()
+    assert limiter.rate == 2.25
+
+
+def test_throttle_halves_rate_and_pauses_requests(make_limiter, clock):
+    limiter = make_limiter(initial=2.0, burst=3.0, min_rate=0.6)
+
+    limiter.on_throttle(backoff_seconds=5.0)
+    assert limiter.rate == 1.0
+    # Đang có token nhưng vẫn phải chờ hết thời gian tạm dừng
+    limiter.acquire()
+    assert sum(clock.sleeps) == pytest.approx(5.0)
+
+    limiter.on_throttle(backoff_seconds=0)
+    assert limiter.rate == 0.6
+
+
+def test_no_increase_during_cooldown_after_throttle(make_limiter, clock):
+    limiter = make_limiter(initial=4.0)
+    limiter.on_throttle(backoff_seconds=0)
+
+    limiter.on_success()
+    assert limiter.rate == 2.0
+    clock.now += limiter.cooldown_seconds
+    limiter.on_success()
+    assert limiter.rate == pytest.approx(2.1)
+
+
+def test_request_reports_outcome_to_limiter(make_limiter, clock):
+    limiter = make_limiter(initial=2.0, burst=3.0)
+
+    with limiter.request():
+        pass
+    assert limiter.rate == pytest.approx(2.1)
+
+    # Lỗi không phải do bị chặn không làm giảm tốc độ
+    with pytest.raises(ValueError):
+        with limiter.request():
+            raise ValueError('x')
+    assert limiter.rate == pytest.approx(2.1)
+
+    with pytest.raises(TooManyRequests):
+        with limiter.request():
+            raise TooManyRequests('HTTP Error 429: Too Many Requests')
+    assert limiter.rate == pytest.approx(1.05)
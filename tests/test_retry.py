@@ -0,0 +1,181 @@
+import pytest
+
+from src.core.job_control import JobControl
+from src.core.negative_cache import NegativeCache
+from src.core.retry import FailureReason, RetryPolicy, TranscriptFetchError, classify_error
+from src.core.storage_backends import LocalStorageBackend
+from src.core.transcript import TranscriptExtractor
+
+
+class NoTranscriptFound(Exception):
+    pass
+
+
+class TooManyRequests(Exception):
+    pass
+
+
+class ReadTimeout(Exception):
+    pass
+
+
+class HTTPError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.response = type('Response', (), {'status_code': status_code})()
+
+
+@pytest.mark.parametrize('error, reason', [
+    (NoTranscriptFound('x'), FailureReason.NO_TRANSCRIPT),
+    (TooManyRequests('x'), FailureReason.RATE_LIMITED),
+    (ReadTimeout('x'), FailureReason.TIMEOUT),
+    (HTTPError(429), FailureReason.RATE_LIMITED),
+    (HTTPError(503), FailureReason.SERVER_ERROR),
+    (HTTPError(404), FailureReason.VIDEO_UNAVAILABLE),
+    (Exception('ERROR: HTTP Error 429: Too Many Requests'), FailureReason.RATE_LIMITED),
+    (Exception('Read timed out.'), FailureReason.TIMEOUT),
+    (Exception('502 Server Error: Bad Gateway'), FailureReason.SERVER_ERROR),
+    (TranscriptFetchError(FailureReason.TRANSCRIPTS_DISABLED), FailureReason.TRANSCRIPTS_DISABLED),
+    (ValueError('boom'), FailureReason.UNKNOWN),
+])
+def test_classify_error(error, reason):
+    assert classify_error(error) == reason
+
+
+def test_permanent_and_transient_sets_are_disjoint():
+    assert not FailureReason.PERMANENT & FailureReason.TRANSIENT
+    assert TranscriptFetchError(FailureReason.NO_TRANSCRIPT).permanent
+    assert not TranscriptFetchError(FailureReason.RATE_LIMITED).permanent
+
+
+def _failing(errors, result='ok'):
+    calls = []
+
+    def func():
+        calls.append(1)
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return result
+    return func, calls
+
+
+def test_retry_recovers_from_transient_errors():
+    func, calls = _failing([TooManyRequests('x'), ReadTimeout('x')])
+    retries = []
+    policy = RetryPolicy(max_attempts=4, base_delay=0)
+    assert policy.call(func, on_retry=lambda attempt, reason, delay: retries.append(reason)) == 'ok'
+    assert len(calls) == 3
+    assert retries == [FailureReason.RATE_LIMITED, FailureReason.TIMEOUT]
+
+
+def test_retry_does_not_repeat_permanent_errors():
+    func, calls = _failing([NoTranscriptFound('x')])
+    with pytest.raises(NoTranscriptFound):
+        RetryPolicy(base_delay=0).call(func)
+    assert len(calls) == 1
+
+
+def test_retry_gives_up_after_max_attempts():
+    func, calls = _failing([TooManyRequests('x')] * 5)
+    with pytest.raises(TooManyRequests):
+        RetryPolicy(max_attempts=3, base_delay=0).call(func)
+    assert len(calls) == 3
+
+
+def test_retry_stops_when_job_is_cancelled():
+    func, calls = _failing([TooManyRequests('x')] * 5)
+    control = JobControl()
+    control.cancel()
+    with pytest.raises(TooManyRequests):
+        RetryPolicy(base_delay=0).call(func, control=control)
+    assert len(calls) == 1
+
+
+def test_backoff_delay_is_capped():
+    policy = RetryPolicy(base_delay=1.0, max_delay=5.0)
+    assert all(0 <= policy.get_delay(attempt) <= 5.0 for attempt in range(1, 10))
+
+
+@pytest.fixture
+def storage_backend(tmp_path):
+    return LocalStorageBackend(str(tmp_path))
+
+
+def test_negative_cache_round_trip(storage_backend):
+    cache = NegativeCache(storage_backend)
+    cache.add('vid', 'en', FailureReason.NO_TRANSCRIPT)
+    assert cache.get('vid', 'en') == FailureReason.NO_TRANSCRIPT
+    assert cache.get('vid', 'vi') is None
+    # Được nạp lại từ backend ở lần chạy sau
+    assert NegativeCache(storage_backend).get('vid', 'en') == FailureReason.NO_TRANSCRIPT
+
+    cache.remove('vid', 'en')
+    assert cache.get('vid', 'en') is None
+    assert NegativeCache(storage_backend).get('vid', 'en') is None
+
+
+def test_negative_cache_expires(storage_backend):
+    cache = NegativeCache(storage_backend, ttl_seconds=-1)
+    cache.add('vid', 'en', FailureReason.TRANSCRIPTS_DISABLED)
+    assert cache.get('vid', 'en') is None
+    assert NegativeCache(storage_backend).get('vid', 'en') is None
+
+
+def test_negative_cache_instances_do_not_overwrite_each_other(storage_backend):
+    first = NegativeCache(storage_backend)
+    second = NegativeCache(storage_backend)
+    assert first.get('v2', 'en') is None
+
+    first.add('v1', 'en', FailureReason.NO_TRANSCRIPT)
+    second.add('v2', 'en', FailureReason.TRANSCRIPTS_DISABLED)
+
+    # Mỗi instance thấy mục do instance kia ghi, kể cả sau khi đã tra cứu trượt
+    assert first.get('v2', 'en') == FailureReason.TRANSCRIPTS_DISABLED
+    assert second.get('v1', 'en') == FailureReason.NO_TRANSCRIPT
+    fresh = NegativeCache(storage_backend)
+    assert (fresh.get('v1', 'en'), fresh.get('v2', 'en')) == (
+        FailureReason.NO_TRANSCRIPT, FailureReason.TRANSCRIPTS_DISABLED
+    )
+
+
+class FakeBackend:
+    name = 'fake'
+
+    def __init__(self, error=None):
+        self.error = error
+        self.calls = 0
+
+    def fetch(self, video_id, language_code):
+        self.calls += 1
+        if self.error:
+            raise self.error
+        return [{'text': 'hello', 'start': 0.0, 'duration': 1.0}]
+
+
+@pytest.fixture
+def extractor(tmp_path):
+    extractor = TranscriptExtractor()
+    extractor.negative_cache = NegativeCache(LocalStorageBackend(str(tmp_path)))
+    extractor.retry_policy = RetryPolicy(max_attempts=2, base_delay=0)
+    return extractor
+
+
+def test_permanent_failure_is_negative_cached(extractor):
+    backend = FakeBackend(TranscriptFetchError(FailureReason.TRANSCRIPTS_DISABLED))
+    extractor.backends = [backend]
+    assert extractor.fetch_transcript('vid', 'title', 'en') == (None, FailureReason.TRANSCRIPTS_DISABLED)
+    assert extractor.fetch_transcript('vid', 'title', 'en') == (None, FailureReason.TRANSCRIPTS_DISABLED)
+    assert backend.calls == 1
+
+
+def test_transient_failure_is_not_negative_cached(extractor):
+    backend = FakeBackend(TooManyRequests('x'))
+    extractor.backends = [backend]
+    assert extractor.fetch_transcript('vid', 'title', 'en') == (None, FailureReason.RATE_LIMITED)
+    assert backend.calls == 2
+    assert extractor.negative_cache.get('vid', 'en') is None
+
+    backend.error = None
+    transcript_data, reason = extractor.fetch_transcript('vid', 'title', 'en')
+    assert reason is None
+    assert transcript_data['transcript'][0]['text'] == 'hello'
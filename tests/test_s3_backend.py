@@ -0,0 +1,90 @@
+import io
+import json
+
+import pytest
+
+boto3 = pytest.importorskip('boto3')
+moto = pytest.importorskip('moto')
+
+from src.core.storage_backends import S3StorageBackend, create_storage_backend  # noqa: E402
+
+mock_aws = getattr(moto, 'mock_aws', None) or getattr(moto, 'mock_s3')
+
+BUCKET = 'transcripts'
+MB = 1024 * 1024
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    for name, value in (('AWS_ACCESS_KEY_ID', 'test'), ('AWS_SECRET_ACCESS_KEY', 'test'),
+                        ('AWS_DEFAULT_REGION', 'us-east-1')):
+        monkeypatch.setenv(name, value)
+    with mock_aws():
+        client = boto3.client('s3', region_name='us-east-1')
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+
+@pytest.fixture
+def backend(s3):
+    return S3StorageBackend(BUCKET, prefix='node/', region_name='us-east-1',
+                            multipart_threshold=5 * MB, multipart_chunksize=5 * MB)
+
+
+def test_read_write_exists_delete(backend, s3):
+    assert backend.read_bytes('playlists/p1/refs/v1.json') is None
+    assert not backend.exists('playlists/p1/refs/v1.json')
+
+    backend.write_bytes('playlists/p1/refs/v1.json', b'{"video_id": "v1"}')
+    assert backend.read_bytes('playlists/p1/refs/v1.json') == b'{"video_id": "v1"}'
+    assert backend.exists('playlists/p1/refs/v1.json')
+    # Khóa được đặt dưới prefix của backend
+    assert s3.head_object(Bucket=BUCKET, Key='node/playlists/p1/refs/v1.json')
+
+    backend.delete('playlists/p1/refs/v1.json')
+    assert not backend.exists('playlists/p1/refs/v1.json')
+    assert backend.location == f"s3://{BUCKET}/node"
+
+
+def test_large_stream_is_uploaded_in_parts(backend):
+    data = bytes(range(256)) * (11 * MB // 256)
+    backend.write_stream('exports/big.zip', io.BytesIO(data))
+    assert backend.read_bytes('exports/big.zip') == data
+
+
+def test_list_follows_pagination(backend, s3):
+    for number in range(1005):
+        s3.put_object(Bucket=BUCKET, Key=f"node/objects/{number:04d}.json", Body=b'{}')
+    s3.put_object(Bucket=BUCKET, Key='other/objects/x.json', Body=b'{}')
+
+    keys = backend.list('objects/')
+    assert len(keys) == 1005
+    assert keys[0] == 'objects/0000.json' and keys[-1] == 'objects/1004.json'
+
+
+def test_append_record_writes_one_object_per_record(backend):
+    for number in range(3):
+        backend.append_record('playlists/p1/changes', json.dumps({'n': number}))
+
+    assert len(backend.list('playlists/p1/changes/')) == 3
+    assert not backend.exists('playlists/p1/changes.jsonl')
+    assert [json.loads(line)['n'] for line in backend.read_records('playlists/p1/changes')] == [0, 1, 2]
+
+
+def test_read_new_records_lists_after_cursor(backend):
+    backend.append_record('index/minhash', '{"n": 0}')
+    lines, cursor = backend.read_new_records('index/minhash')
+    assert lines == ['{"n": 0}']
+    assert backend.read_new_records('index/minhash', cursor)[0] == []
+
+    backend.append_record('index/minhash', '{"n": 1}')
+    assert backend.read_new_records('index/minhash', cursor)[0] == ['{"n": 1}']
+
+
+def test_create_storage_backend_from_environment(s3, monkeypatch):
+    monkeypatch.setenv('STORAGE_BACKEND', 's3')
+    monkeypatch.setenv('STORAGE_S3_BUCKET', BUCKET)
+    monkeypatch.setenv('STORAGE_S3_PREFIX', 'node')
+    backend = create_storage_backend('unused')
+    assert isinstance(backend, S3StorageBackend)
+    assert (backend.bucket, backend.prefix) == (BUCKET, 'node')
@@ -0,0 +1,148 @@
+import pytest
+
+from src.core.job_control import JobControl
+from src.core.negative_cache import NegativeCache
+from src.core.retry import FailureReason, RetryPolicy, TranscriptFetchError
+from src.core.scheduler import FetchScheduler
+from src.core.storage_backends import LocalStorageBackend
+from src.core.transcript import TranscriptExtractor
+
+BULK, INTERACTIVE = FetchScheduler.BULK, FetchScheduler.INTERACTIVE
+
+
+@pytest.fixture
+def make_scheduler(monkeypatch):
+    """Tạo FetchScheduler mới (bỏ qua instance dùng chung) với cấu hình cho trước"""
+    def make(max_concurrency=1, user_concurrency=10, daily_quota=0, weights=''):
+        monkeypatch.setattr(FetchScheduler, '_instance', None)
+        monkeypatch.setattr(FetchScheduler, '_initialized', False)
+        monkeypatch.setenv('SCHEDULER_MAX_CONCURRENCY', str(max_concurrency))
+        monkeypatch.setenv('SCHEDULER_USER_CONCURRENCY', str(user_concurrency))
+        monkeypatch.setenv('SCHEDULER_DAILY_QUOTA', str(daily_quota))
+        monkeypatch.setenv('SCHEDULER_USER_WEIGHTS', weights)
+        return FetchScheduler()
+    return make
+
+
+def _grant_order(scheduler, holder, waiters):
+    """Trả lượt đang giữ rồi lần lượt trả lượt của từng yêu cầu được cấp; thứ tự cấp lượt"""
+    order = []
+    current = holder
+    while True:
+        scheduler._release(current)
+        granted = [name for name, waiter in waiters if waiter.granted and name not in order]
+        if not granted:
+            return order
+        order.extend(granted)
+        current = dict(waiters)[granted[-1]]
+
+
+def test_virtual_time_interleaves_users(make_scheduler):
+    scheduler = make_scheduler()
+    holder = scheduler._enqueue('x', BULK)
+    waiters = [(f"alice{i}", scheduler._enqueue('alice', BULK)) for i in range(3)]
+    waiters += [(f"bob{i}", scheduler._enqueue('bob', BULK)) for i in range(3)]
+
+    # Alice gửi trước nhưng không chiếm hết lượt của Bob
+    assert _grant_order(scheduler, holder, waiters) == ['alice0', 'bob0', 'alice1', 'bob1', 'alice2', 'bob2']
+
+
+def test_weight_gives_user_a_larger_share(make_scheduler):
+    scheduler = make_scheduler(weights='alice:2')
+    holder = scheduler._enqueue('x', BULK)
+    waiters = [(f"alice{i}", scheduler._enqueue('alice', BULK)) for i in range(3)]
+    waiters += [(f"bob{i}", scheduler._enqueue('bob', BULK)) for i in range(3)]
+
+    assert _grant_order(scheduler, holder, waiters) == ['alice0', 'bob0', 'alice1', 'alice2', 'bob1', 'bob2']
+
+
+def test_interactive_requests_go_before_bulk(make_scheduler):
+    scheduler = make_scheduler()
+    holder = scheduler._enqueue('x', BULK)
+    waiters = [(f"bulk{i}", scheduler._enqueue('alice', BULK)) for i in range(2)]
+    waiters.append(('interactive', scheduler._enqueue('bob', INTERACTIVE)))
+
+    assert _grant_order(scheduler, holder, waiters) == ['interactive', 'bulk0', 'bulk1']
+
+
+def test_per_user_cap_does_not_block_other_users(make_scheduler):
+    scheduler = make_scheduler(max_concurrency=4, user_concurrency=2)
+    alice = [scheduler._enqueue('alice', BULK) for _ in range(3)]
+    bob = scheduler._enqueue('bob', BULK)
+
+    assert [waiter.granted for waiter in alice] == [True, True, False]
+    assert bob.granted
+    assert scheduler.usage('alice') == {'running': 2, 'queued': 1, 'used_today': 3, 'daily_quota': 0}
+
+    scheduler._release(alice[0])
+    assert alice[2].granted
+
+
+def test_daily_quota_is_charged_once_per_video_and_refunded_on_abandon(make_scheduler):
+    scheduler = make_scheduler(daily_quota=2)
+    holder = scheduler._enqueue('alice', BULK)
+    queued = scheduler._enqueue('alice', BULK)
+    with pytest.raises(TranscriptFetchError) as error:
+        scheduler._enqueue('alice', BULK)
+    assert error.value.reason == FailureReason.QUOTA_EXCEEDED
+    # Lần thử lại không tính thêm hạn mức
+    retry = scheduler._enqueue('alice', BULK, charge=False)
+    assert scheduler.usage('alice')['used_today'] == 2
+
+    # Yêu cầu bị rút khỏi hàng đợi được hoàn hạn mức và không được cấp lượt
+    assert scheduler._abandon(queued)
+    assert scheduler.usage('alice')['used_today'] == 1
+    scheduler._release(holder)
+    assert not queued.granted and retry.granted
+    assert not scheduler._abandon(retry)
+    assert scheduler._enqueue('bob', BULK) is not None
+
+
+def test_slot_raises_for_stopped_job_without_using_quota(make_scheduler):
+    scheduler = make_scheduler(daily_quota=1)
+    control = JobControl()
+    control.cancel()
+    with pytest.raises(TranscriptFetchError) as error:
+        with scheduler.slot('alice', control=control):
+            pass
+    assert error.value.reason == FailureReason.CANCELLED
+    assert scheduler.usage('alice')['used_today'] == 0
+
+    with scheduler.slot('alice'):
+        assert scheduler.usage('alice')['running'] == 1
+    assert scheduler.usage('alice') == {'running': 0, 'queued': 0, 'used_today': 1, 'daily_quota': 1}
+
+
+class TooManyRequests(Exception):
+    pass
+
+
+def test_slot_is_released_while_waiting_to_retry(make_scheduler, tmp_path):
+    scheduler = make_scheduler(daily_quota=5)
+    running_during_fetch, running_during_backoff = [], []
+
+    class FlakyBackend:
+        name = 'flaky'
+
+        def fetch(self, video_id, language_code):
+            running_during_fetch.append(scheduler.usage('alice')['running'])
+            if len(running_during_fetch) == 1:
+                raise TooManyRequests('x')
+            return [{'text': 'hello', 'start': 0.0, 'duration': 1.0}]
+
+    class RecordingPolicy(RetryPolicy):
+        def get_delay(self, attempt):
+            running_during_backoff.append(scheduler.usage('alice')['running'])
+            return 0
+
+    extractor = TranscriptExtractor()
+    extractor.negative_cache = NegativeCache(LocalStorageBackend(str(tmp_path)))
+    extractor.retry_policy = RecordingPolicy(max_attempts=2, base_delay=0)
+    extractor.backends = [FlakyBackend()]
+    assert extractor.scheduler is scheduler
+
+    transcript_data, reason = extractor.fetch_transcript('vid', 'title', 'en', user_id='alice')
+    assert reason is None and transcript_data['transcript'][0]['text'] == 'hello'
+    assert running_during_fetch == [1, 1]
+    assert running_during_backoff == [0]
+    assert scheduler.usage('alice')['used_today'] == 1
@@ -0,0 +1,105 @@
+import random
+
+import pytest
+
+from src.core.pipeline import VideoResult
+from src.core.storage import DataStorage
+from src.core.storage_backends import LocalStorageBackend
+
+
+@pytest.fixture
+def storage(tmp_path):
+    return DataStorage(backend=LocalStorageBackend(str(tmp_path)))
+
+
+def _transcript(video_id, seed, download_date='2024-01-01T00:00:00'):
+    rng = random.Random(seed)
+    segments = [
+        {'text': ' '.join(f"w{rng.randint(0, 5000)}" for _ in range(12)), 'start': float(i), 'duration': 1.0}
+        for i in range(20)
+    ]
+    return {
+        'video_id': video_id,
+        'title': f"Video {video_id}",
+        'transcript': segments,
+        'metadata': {'language': 'en', 'language_name': 'English', 'download_date': download_date}
+    }
+
+
+def test_same_transcript_in_two_playlists_is_stored_once(storage):
+    assert storage.save_transcript('p1', 'v1', 'Video v1', _transcript('v1', seed=1))
+    assert storage.save_transcript('p2', 'v1', 'Video v1', _transcript('v1', seed=1))
+
+    assert len(storage.backend.list('objects/')) == 1
+    ref_1 = storage.get_transcript_ref('p1', 'v1')
+    ref_2 = storage.get_transcript_ref('p2', 'v1')
+    assert ref_1['object'] == ref_2['object']
+    assert storage.load_transcript(ref_1)['transcript'] == _transcript('v1', seed=1)['transcript']
+
+
+def test_unchanged_transcript_is_not_rewritten(storage):
+    storage.save_transcript('p1', 'v1', 'Video v1', _transcript('v1', seed=1))
+    revision = storage.get_playlist_revision('p1')
+
+    storage.save_transcript('p1', 'v1', 'Video v1', _transcript('v1', seed=1, download_date='2025-06-01T00:00:00'))
+
+    assert storage.get_transcript_ref('p1', 'v1')['download_date'] == '2024-01-01T00:00:00'
+    assert storage.get_playlist_revision('p1') == revision
+    assert storage.get_playlist_changes('p1') == []
+
+
+def test_changed_transcript_records_diff(storage):
+    storage.save_transcript('p1', 'v1', 'Video v1', _transcript('v1', seed=1))
+    first_object = storage.get_transcript_ref('p1', 'v1')['object']
+    revision = storage.get_playlist_revision('p1')
+
+    edited = _transcript('v1', seed=1)
+    edited['transcript'][3]['text'] = 'đoạn đã sửa'
+    storage.save_transcript('p1', 'v1', 'Video v1', edited)
+
+    ref = storage.get_transcript_ref('p1', 'v1')
+    assert ref['previous_object'] == first_object
+    assert ref['object'] != first_object
+    assert storage.get_playlist_revision('p1') != revision
+    changes = storage.get_playlist_changes('p1')
+    assert len(changes) == 1
+    assert changes[0]['changes'] == [
+        {'op': 'replace', 'old': [3, 4], 'new': [3, 4], 'segments': [edited['transcript'][3]]}
+    ]
+
+
+def test_unchanged_metadata_keeps_revision_and_export(storage):
+    metadata = {'playlist_id': 'p1', 'title': 'Playlist', 'updated': '2024-01-01T00:00:00'}
+    storage.save_metadata('p1', metadata)
+    revision = storage.get_playlist_revision('p1')
+    storage.save_playlist_export('p1', revision, b'zip')
+
+    storage.save_metadata('p1', dict(metadata, updated='2025-06-01T00:00:00'))
+    assert storage.get_playlist_revision('p1') == revision
+    assert storage.load_playlist_export('p1', revision) == b'zip'
+
+    storage.save_metadata('p1', dict(metadata, title='Playlist mới'))
+    assert storage.get_playlist_revision('p1') != revision
+    assert storage.load_playlist_export('p1', storage.get_playlist_revision('p1')) is None
+
+
+def test_near_duplicate_is_flagged(storage):
+    storage.save_transcript('p1', 'v1', 'Video v1', _transcript('v1', seed=1))
+    reupload = _transcript('v2', seed=1)
+    reupload['transcript'][0]['text'] = 'mở đầu khác'
+    storage.save_transcript('p1', 'v2', 'Video v2', reupload)
+
+    assert storage.get_transcript_ref('p1', 'v2')['near_duplicate_of']['video_id'] == 'v1'
+    assert storage.get_near_duplicate_clusters('p1')[0]['original']['video_id'] == 'v1'
+
+
+def test_video_result_renders_text_and_filename_once(storage):
+    transcript_data = _transcript('v1', seed=1)
+    result = VideoResult({'video_id': 'v1', 'title': 'Bài 1: Giới thiệu?', 'status': 'success'}, transcript_data, storage)
+
+    assert result.success
+    assert result.filename == storage.build_text_filename('Bài 1: Giới thiệu?', 'v1')
+    assert result.filename.endswith('_v1.txt') and '?' not in result.filename
+    assert result.text == storage.render_text(transcript_data)
+    assert result.text.startswith('Video ID: v1')
+    assert result.text is result.text
@@ -0,0 +1,49 @@
+import requests
+
+from src.core import transcript_backends
+
+
+class FakeApi:
+    """Giả lập YouTubeTranscriptApi của cả hai dòng phiên bản"""
+    calls = []
+
+    def __init__(self, http_client=None):
+        self.http_client = http_client
+
+    def list(self, video_id):
+        self.calls.append(('list', video_id, self.http_client))
+        return ['instance']
+
+    @classmethod
+    def list_transcripts(cls, video_id, proxies=None):
+        cls.calls.append(('list_transcripts', video_id, proxies))
+        return ['classmethod']
+
+
+def test_major_version_of_installed_package():
+    assert transcript_backends.YOUTUBE_TRANSCRIPT_API_MAJOR in (0, 1)
+    assert transcript_backends._package_major('youtube-transcript-api') == transcript_backends.YOUTUBE_TRANSCRIPT_API_MAJOR
+    assert transcript_backends._package_major('khong-co-package-nay', default=7) == 7
+
+
+def test_list_transcripts_uses_instance_api_from_1_0(monkeypatch):
+    FakeApi.calls = []
+    monkeypatch.setattr(transcript_backends, 'YouTubeTranscriptApi', FakeApi)
+    monkeypatch.setattr(transcript_backends, 'YOUTUBE_TRANSCRIPT_API_MAJOR', 1)
+    session = requests.Session()
+
+    assert transcript_backends.list_transcripts('v1', session) == ['instance']
+    assert FakeApi.calls == [('list', 'v1', session)]
+
+
+def test_list_transcripts_passes_proxies_before_1_0(monkeypatch):
+    FakeApi.calls = []
+    monkeypatch.setattr(transcript_backends, 'YouTubeTranscriptApi', FakeApi)
+    monkeypatch.setattr(transcript_backends, 'YOUTUBE_TRANSCRIPT_API_MAJOR', 0)
+    session = requests.Session()
+
+    assert transcript_backends.list_transcripts('v1', session) == ['classmethod']
+    session.proxies = {'https': 'http://proxy:8080'}
+    transcript_backends.list_transcripts('v2', session)
+    assert FakeApi.calls == [('list_transcripts', 'v1', None),
+                             ('list_transcripts', 'v2', {'https': 'http://proxy:8080'})]
@@ -0,0 +1,137 @@
+import pytest
+
+from src.core import transport
+from src.core.retry import FailureReason
+
+
+class FakeClock:
+    """Thay module time trong transport: sleep() chỉ tăng đồng hồ, không chờ thật"""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class NoTranscriptFound(Exception):
+    pass
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(transport, 'time', clock)
+    return clock
+
+
+def _pool(urls=('http://p1', 'http://p2'), **kwargs):
+    kwargs.setdefault('rate_per_proxy', 1.0)
+    return transport.ProxyPool(list(urls), **kwargs)
+
+
+def _available(pool):
+    return sorted(proxy['url'] for proxy in pool.stats() if not proxy['ejected'])
+
+
+def test_requests_are_spread_and_rate_limited_per_proxy(clock):
+    pool = _pool(rate_per_proxy=2.0)
+
+    assert [pool.acquire().url for _ in range(2)] == ['http://p1', 'http://p2']
+    assert clock.sleeps == []
+    # Cả hai proxy vừa được dùng: lượt thứ ba chờ tới khi proxy rảnh sớm nhất hết khoảng cách 0.5s
+    assert pool.acquire().url == 'http://p1'
+    assert clock.sleeps == [0.5]
+    assert [proxy['requests'] for proxy in pool.stats()] == [2, 1]
+
+
+def test_rate_limited_proxy_is_ejected_with_doubling_duration(clock):
+    pool = _pool(rate_per_proxy=0, ejection_seconds=60)
+    p1 = pool.proxies[0]
+
+    pool.report_failure(p1, FailureReason.RATE_LIMITED)
+    assert _available(pool) == ['http://p2']
+    assert [pool.acquire().url for _ in range(3)] == ['http://p2'] * 3
+
+    clock.now += 60
+    assert _available(pool) == ['http://p1', 'http://p2']
+    pool.report_failure(p1, FailureReason.RATE_LIMITED)
+    assert p1.ejected_until == clock.now + 120
+    assert (p1.failures, p1.throttled, p1.ejections) == (2, 2, 2)
+
+
+def test_consecutive_transient_failures_eject_proxy(clock):
+    pool = _pool(rate_per_proxy=0, max_consecutive_failures=3)
+    p1 = pool.proxies[0]
+
+    pool.report_failure(p1, FailureReason.TIMEOUT)
+    pool.report_failure(p1, FailureReason.TIMEOUT)
+    pool.report_success(p1)
+    pool.report_failure(p1, FailureReason.TIMEOUT)
+    assert _available(pool) == ['http://p1', 'http://p2']
+
+    pool.report_failure(p1, FailureReason.SERVER_ERROR)
+    pool.report_failure(p1, FailureReason.TIMEOUT)
+    assert _available(pool) == ['http://p2']
+
+
+def test_ejection_backoff_decays_after_sustained_successes(clock):
+    pool = _pool(rate_per_proxy=0, ejection_seconds=10, recovery_successes=3)
+    p1 = pool.proxies[0]
+    pool.report_failure(p1, FailureReason.RATE_LIMITED)
+    pool.report_failure(p1, FailureReason.RATE_LIMITED)
+    assert p1.ejections == 2
+
+    # Một request thành công không xóa lịch sử bị loại
+    pool.report_success(p1)
+    assert p1.ejections == 2
+    # Mỗi recovery_successes lần thành công liên tiếp giảm một bậc
+    for _ in range(2):
+        pool.report_success(p1)
+    assert p1.ejections == 1
+    # Lỗi xen giữa làm đếm lại từ đầu
+    pool.report_success(p1)
+    pool.report_failure(p1, FailureReason.TIMEOUT)
+    pool.report_success(p1)
+    pool.report_success(p1)
+    assert p1.ejections == 1
+
+    pool.report_failure(p1, FailureReason.RATE_LIMITED)
+    assert p1.ejected_until == clock.now + 20
+
+
+def test_pool_falls_back_to_proxy_closest_to_recovery(clock):
+    pool = _pool(rate_per_proxy=0, ejection_seconds=10)
+    pool.report_failure(pool.proxies[0], FailureReason.RATE_LIMITED)
+    pool.report_failure(pool.proxies[0], FailureReason.RATE_LIMITED)
+    pool.report_failure(pool.proxies[1], FailureReason.RATE_LIMITED)
+    assert _available(pool) == []
+
+    assert pool.acquire().url == 'http://p2'
+    assert _available(pool) == ['http://p2']
+
+
+def test_transport_reports_only_transient_errors_against_proxy(clock):
+    http = transport.HttpTransport()
+    pool = _pool(urls=('http://p1',), rate_per_proxy=0, max_consecutive_failures=1)
+    previous = http.proxy_pool
+    http.set_proxy_pool(pool)
+    try:
+        with pytest.raises(NoTranscriptFound):
+            with http.session() as session:
+                assert session.proxies == {'http': 'http://p1', 'https': 'http://p1'}
+                raise NoTranscriptFound('x')
+        assert pool.proxies[0].failures == 0
+
+        with pytest.raises(TimeoutError):
+            with http.session():
+                raise TimeoutError('Read timed out.')
+        assert pool.proxies[0].failures == 1
+        assert _available(pool) == []
+    finally:
+        http.set_proxy_pool(previous)
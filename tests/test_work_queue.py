@@ -0,0 +1,112 @@
+import threading
+import time
+
+import pytest
+
+from src.core.pipeline import TranscriptPipeline
+from src.core.retry import FailureReason
+from src.core.storage import DataStorage
+from src.core.storage_backends import LocalStorageBackend
+from src.core.work_queue import QueueWorker, SQLiteWorkQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return SQLiteWorkQueue(str(tmp_path / 'queue.sqlite'), max_attempts=2)
+
+
+def _submit(queue, job_id='job', video_ids=('v1', 'v2')):
+    videos = [{'video_id': video_id, 'title': video_id} for video_id in video_ids]
+    return queue.submit_job(job_id, videos, {video_id: ['p1'] for video_id in video_ids}, 'en', 'alice')
+
+
+def test_task_is_leased_to_one_worker_at_a_time(queue):
+    _submit(queue)
+    first = queue.lease('w1', 60)
+    second = queue.lease('w2', 60)
+    assert (first['video_id'], second['video_id']) == ('v1', 'v2')
+    assert first['playlist_ids'] == ['p1'] and first['user_id'] == 'alice'
+    assert queue.lease('w3', 60) is None
+    assert queue.active_leases() == 2
+
+    assert not queue.complete(first['task_id'], 'w2', 'success')
+    assert queue.complete(first['task_id'], 'w1', 'success', elapsed=1.5)
+    progress = queue.job_progress('job')
+    assert (progress['success'], progress['leased'], progress['active']) == (1, 1, 1)
+    assert [task['video_id'] for task in queue.completed_tasks('job')] == ['v1']
+
+
+def test_expired_lease_is_reassigned_then_given_up(queue):
+    _submit(queue, video_ids=('v1',))
+    stale = queue.lease('w1', -1)
+    assert queue.active_leases() == 0
+
+    retaken = queue.lease('w2', -1)
+    assert retaken['task_id'] == stale['task_id'] and retaken['attempts'] == 2
+    # Worker cũ mất lease: không gia hạn hay ghi kết quả được nữa
+    assert not queue.heartbeat(stale['task_id'], 'w1', 60)
+    assert not queue.complete(stale['task_id'], 'w1', 'success')
+
+    # Đã nhận đủ max_attempts lần: task bị đánh dấu lỗi thay vì giao lại
+    assert queue.lease('w3', 60) is None
+    [task] = queue.completed_tasks('job')
+    assert (task['status'], task['error_type']) == ('failed', 'lease_expired')
+
+
+def test_cancel_fails_queued_tasks_and_keeps_active_lease(queue):
+    _submit(queue, video_ids=('v1', 'v2', 'v3'))
+    active = queue.lease('w1', 60)
+
+    queue.cancel_job('job', FailureReason.CANCELLED)
+
+    assert queue.lease('w2', 60) is None
+    assert [(task['video_id'], task['error_type']) for task in queue.completed_tasks('job')] == [
+        ('v2', FailureReason.CANCELLED), ('v3', FailureReason.CANCELLED)
+    ]
+    # Video đang xử lý dở vẫn ghi được kết quả
+    assert queue.complete(active['task_id'], 'w1', 'success')
+    assert queue.completed_tasks('job', after_seq=2)[0]['video_id'] == 'v1'
+
+
+@pytest.fixture
+def pipeline(tmp_path):
+    return TranscriptPipeline(None, DataStorage(backend=LocalStorageBackend(str(tmp_path / 'data'))))
+
+
+def _playlists(video_ids):
+    return [{'playlist_id': 'p1', 'videos': [{'video_id': video_id, 'title': video_id} for video_id in video_ids]}]
+
+
+def test_run_distributed_fails_fast_without_workers(queue, pipeline):
+    started = time.monotonic()
+    summary = pipeline.run_distributed(
+        _playlists(['v1', 'v2']), 'en', queue, job_id='job', poll_interval=0.05, worker_timeout=0.2
+    )
+    assert time.monotonic() - started < 5
+    assert summary['stop_reason'] == FailureReason.NO_WORKER
+    assert summary['failed_count'] == 2
+    assert {video['error_type'] for video in summary['failed_videos']} == {FailureReason.NO_WORKER}
+
+
+class StubPipeline:
+    max_workers = 1
+
+    def process_video_for_playlists(self, video, playlist_ids, language, user_id=None):
+        video['status'] = 'success'
+
+
+def test_run_distributed_collects_worker_results(queue, pipeline):
+    stop_event = threading.Event()
+    worker = QueueWorker(StubPipeline(), queue, worker_id='w1', lease_seconds=60)
+    thread = threading.Thread(target=worker.run, args=(stop_event, 0.05), daemon=True)
+    thread.start()
+    try:
+        summary = pipeline.run_distributed(
+            _playlists(['v1', 'v2']), 'en', queue, job_id='job', poll_interval=0.05, worker_timeout=5
+        )
+    finally:
+        stop_event.set()
+        thread.join(5)
+    assert summary['stop_reason'] is None
+    assert summary['success_count'] == 2
+    assert summary['playlists']['p1']['success_count'] == 2
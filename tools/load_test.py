@@ -0,0 +1,396 @@
+"""
+Kiểm thử tải cho giao diện Streamlit: chạy N session đồng thời qua các bước
+đăng nhập -> video đơn lẻ -> playlist bằng streamlit.testing (AppTest) trên chính
+streamlit_app.py, với Supabase, yt-dlp và youtube_transcript_api được thay bằng
+bản giả lập cục bộ (có độ trễ cấu hình được).
+
+Mỗi mức đồng thời chạy trong một tiến trình con mới (cache, singleton và bộ nhớ
+không bị mức trước để lại). Báo cáo theo từng mức: độ trễ rerun (p50/p95/max) của mỗi bước,
+bộ nhớ giữ lại trên mỗi session (tracemalloc) và thông lượng (session/s, video/s).
+
+Ví dụ:
+    python tools/load_test.py --levels 1,4,8,16 --videos 10 --fetch-latency 0.2
+"""
+import argparse
+import functools
+import gc
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import types
+from types import SimpleNamespace
+from urllib.parse import parse_qs, urlparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_FILE = os.path.join(ROOT, 'streamlit_app.py')
+
+
+class FakeLatency:
+    """Độ trễ giả lập của các dịch vụ bên ngoài (giây)"""
+    auth = 0.05
+    metadata = 0.1
+    fetch = 0.2
+
+
+class FakeSupabaseAuthApi:
+    def sign_in_with_password(self, credentials: dict):
+        time.sleep(FakeLatency.auth)
+        email = credentials['email']
+        return SimpleNamespace(user=SimpleNamespace(id=f"user-{email}", email=email))
+
+    def sign_up(self, credentials: dict):
+        time.sleep(FakeLatency.auth)
+        return SimpleNamespace(user=SimpleNamespace(id=f"user-{credentials['email']}", email=credentials['email']))
+
+    def sign_out(self):
+        pass
+
+
+class FakeSupabaseClient:
+    def __init__(self, url: str, key: str):
+        self.auth = FakeSupabaseAuthApi()
+
+
+class FakeYoutubeDL:
+    """Thay cho yt_dlp.YoutubeDL: playlist có videos_per_playlist video, mỗi video một ID riêng"""
+    videos_per_playlist = 10
+
+    def __init__(self, opts: dict = None):
+        self.opts = opts or {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def extract_info(self, url: str, download: bool = False, **kwargs) -> dict:
+        time.sleep(FakeLatency.metadata)
+        query = parse_qs(urlparse(url).query)
+        if 'list' in query:
+            playlist_id = query['list'][0]
+            return {
+                '_type': 'playlist',
+                'id': playlist_id,
+                'title': f"Load test {playlist_id}",
+                'channel': 'Load test',
+                'channel_id': 'load-test',
+                'entries': [
+                    {'id': f"{playlist_id}-{i}", 'title': f"Video {i} of {playlist_id}", 'duration': 60}
+                    for i in range(self.videos_per_playlist)
+                ]
+            }
+        video_id = query['v'][0]
+        return {'id': video_id, 'title': f"Video {video_id}", 'channel': 'Load test', 'duration': 60}
+
+
+class FakeTranscript:
+    def __init__(self, video_id: str):
+        self.video_id = video_id
+
+    def fetch(self) -> list:
+        time.sleep(FakeLatency.fetch)
+        # Nội dung khác nhau giữa các video để không bị coi là gần trùng
+        return [
+            {'text': f"{self.video_id} segment {i} " + ' '.join(f"w{hash((self.video_id, i, j)) % 997}" for j in range(12)),
+             'start': i * 5.0, 'duration': 5.0}
+            for i in range(40)
+        ]
+
+    def translate(self, language_code: str):
+        return self
+
+
+class FakeTranscriptList:
+    def __init__(self, video_id: str):
+        self.video_id = video_id
+
+    def find_transcript(self, language_codes: list) -> FakeTranscript:
+        return FakeTranscript(self.video_id)
+
+
+def fake_list_transcripts(video_id: str, http_client) -> FakeTranscriptList:
+    """Thay cho transcript_backends.list_transcripts (không gọi youtube_transcript_api)"""
+    return FakeTranscriptList(video_id)
+
+
+def configure_environment(args):
+    """Đặt biến môi trường trước khi import ứng dụng (các singleton đọc cấu hình khi khởi tạo)"""
+    os.environ['METADATA_CACHE_BACKEND'] = 'memory'
+    os.environ['TRANSCRIPT_BACKENDS'] = 'youtube_transcript_api'
+    os.environ.pop('WORK_QUEUE_BACKEND', None)
+    if not args.real_rate_limits:
+        # Đo chi phí của ứng dụng, không đo giới hạn tốc độ gọi YouTube
+        for name, value in (('YT_RATE_INITIAL', '1000'), ('YT_RATE_MAX', '1000'), ('YT_RATE_BURST', '1000')):
+            os.environ[name] = value
+        os.environ['SCHEDULER_MAX_CONCURRENCY'] = str(max(64, args.max_level * 4))
+        os.environ['SCHEDULER_DAILY_QUOTA'] = '0'
+
+
+def install_fakes(data_dir: str):
+    """Thay dịch vụ bên ngoài bằng bản giả lập và chuyển dữ liệu sang thư mục tạm"""
+    sys.modules['supabase'] = types.SimpleNamespace(create_client=FakeSupabaseClient, Client=FakeSupabaseClient)
+    sys.path.insert(0, ROOT)
+
+    from src.auth import supabase_auth
+    from src.core import playlist, storage, transcript, transcript_backends
+    from src.core.negative_cache import NegativeCache
+    from src.core.storage_backends import LocalStorageBackend
+
+    supabase_auth.create_client = FakeSupabaseClient
+    playlist.YoutubeDL = FakeYoutubeDL
+    transcript_backends.YoutubeDL = FakeYoutubeDL
+    transcript_backends.list_transcripts = fake_list_transcripts
+    storage.create_storage_backend = lambda base_path: LocalStorageBackend(data_dir)
+    transcript.NegativeCache = functools.partial(NegativeCache, LocalStorageBackend(data_dir))
+
+
+def prepare_concurrent_apptest():
+    """
+    AppTest được thiết kế cho một lượt chạy tại một thời điểm: mỗi lượt gán rồi xóa
+    Runtime._instance, st.secrets và tùy chọn global.appTest toàn cục. Khi chạy nhiều session song song, dùng
+    chung một runtime giả lập (như các session trên cùng một server thật) và đặt
+    secrets một lần để các lượt chạy không xóa trạng thái của nhau.
+    """
+    import streamlit as st
+    from unittest.mock import MagicMock
+    from streamlit import config
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    from streamlit.runtime.secrets import Secrets
+
+    shared_runtime = MagicMock(spec=Runtime)
+    shared_runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    shared_runtime.cache_storage_manager = MemoryCacheStorageManager()
+    Runtime.instance = classmethod(lambda cls: cls._instance or shared_runtime)
+    Runtime.exists = classmethod(lambda cls: True)
+    # Mỗi lượt chạy bật/tắt global.appTest; bật sẵn để lượt kết thúc trước không tắt của lượt khác
+    config.set_option('global.appTest', True)
+
+    secrets = Secrets()
+    secrets._secrets = {'supabase': {'url': 'http://localhost', 'anon_key': 'load-test'}}
+    st.secrets = secrets
+
+
+def _button(at, label: str):
+    return next(button for button in at.button if button.label == label)
+
+
+def _input(elements, label: str):
+    return next(element for element in elements if element.label.startswith(label))
+
+
+class SessionRunner:
+    """Một session giả lập người dùng, ghi lại thời gian của từng bước (mỗi bước là một lượt rerun)"""
+
+    def __init__(self, session_no: int, level: int, flows: list, timeout: float):
+        from streamlit.testing.v1 import AppTest
+        self.session_no = session_no
+        self.tag = f"L{level}S{session_no}"
+        self.flows = flows
+        self.timeout = timeout
+        self.timings = {}
+        self.errors = []
+        self.videos = 0
+        self.at = AppTest.from_file(APP_FILE, default_timeout=timeout)
+
+    def _step(self, name: str, action):
+        started = time.perf_counter()
+        try:
+            action()
+            if self.at.exception:
+                self.errors.append(f"{name}: {self.at.exception[0].message}")
+            for error in self.at.error:
+                self.errors.append(f"{name}: {error.value}")
+        except Exception as e:
+            self.errors.append(f"{name}: {type(e).__name__}: {e}")
+        self.timings.setdefault(name, []).append(time.perf_counter() - started)
+
+    def run(self):
+        at = self.at
+        self._step('initial', lambda: at.run())
+        if 'login' in self.flows:
+            def login():
+                _input(at.text_input, 'Email').input(f"{self.tag}@load.test")
+                _input(at.text_input, 'Mật khẩu').input('password')
+                _button(at, 'Đăng nhập').click().run()
+            self._step('login', login)
+        if 'single' in self.flows:
+            def single_video():
+                _input(at.text_input, 'Nhập URL video').input(f"https://www.youtube.com/watch?v={self.tag}-single")
+                _button(at, 'Trích xuất phụ đề').click().run()
+                result = at.session_state['single_video_result']
+                self.videos += 1 if result is not None and result.success else 0
+            self._step('single_video', single_video)
+        if 'playlist' in self.flows:
+            def playlist():
+                _input(at.text_area, 'Nhập URL playlist').input(f"https://www.youtube.com/playlist?list=PL{self.tag}")
+                _button(at, 'Bắt đầu trích xuất').click().run()
+                self.videos += at.session_state['results']['success_count']
+            self._step('playlist', playlist)
+        # Rerun không có thao tác (vd: người dùng mở expander) sau khi đã có kết quả
+        self._step('idle_rerun', lambda: at.run())
+
+
+def percentile(values: list, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def measure_retained_memory(level: int, args) -> float:
+    """
+    Bộ nhớ (byte) mỗi session giữ lại sau khi chạy xong các bước, đo bằng tracemalloc trên
+    args.memory_samples session chạy thêm sau mức tải: module, cache dùng chung... đã được nạp
+    trong lượt đo tải nên chỉ phần tăng thêm do session (session_state, widget, kết quả...) được tính.
+    Đo riêng vì tracemalloc làm chậm mọi lượt cấp phát và sẽ làm sai số liệu độ trễ.
+    """
+    if args.memory_samples <= 0:
+        return 0.0
+    gc.collect()
+    tracemalloc.start()
+    try:
+        # Session mới (ID playlist/video khác) để không dùng lại kết quả cache của lượt đo tải
+        runners = [SessionRunner(level + i, level, args.flows, args.timeout) for i in range(args.memory_samples)]
+        for runner in runners:
+            runner.run()
+        gc.collect()
+        # Chỉ các cấp phát sau tracemalloc.start() được theo dõi; runners vẫn còn sống ở đây
+        retained, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return retained / len(runners)
+
+
+def run_level(level: int, args) -> dict:
+    """Chạy level session đồng thời và tổng hợp số liệu"""
+    runners = [SessionRunner(i, level, args.flows, args.timeout) for i in range(level)]
+    threads = [threading.Thread(target=runner.run, name=f"load-session-{i}") for i, runner in enumerate(runners)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    steps = {}
+    for runner in runners:
+        for name, values in runner.timings.items():
+            steps.setdefault(name, []).extend(values)
+    report = {
+        'sessions': level,
+        'wall_seconds': wall,
+        'sessions_per_second': level / wall if wall else 0.0,
+        'videos_per_second': sum(runner.videos for runner in runners) / wall if wall else 0.0,
+        'memory_per_session_mb': 0.0,
+        'errors': [error for runner in runners for error in runner.errors],
+        'steps': {
+            name: {
+                'p50': statistics.median(values),
+                'p95': percentile(values, 0.95),
+                'max': max(values)
+            }
+            for name, values in steps.items()
+        }
+    }
+    del runners
+    report['memory_per_session_mb'] = measure_retained_memory(level, args) / (1024 * 1024)
+    return report
+
+
+def run_level_in_subprocess(level: int) -> dict:
+    """Chạy một mức tải trong tiến trình con mới với cùng tham số dòng lệnh"""
+    fd, report_path = tempfile.mkstemp(prefix='transcript-load-test-', suffix='.json')
+    os.close(fd)
+    try:
+        command = [sys.executable, os.path.abspath(__file__), *sys.argv[1:],
+                   '--single-level', str(level), '--report-file', report_path]
+        completed = subprocess.run(command)
+        if completed.returncode != 0:
+            return {
+                'sessions': level, 'wall_seconds': 0.0, 'sessions_per_second': 0.0, 'videos_per_second': 0.0,
+                'memory_per_session_mb': 0.0, 'steps': {},
+                'errors': [f"Tiến trình con thoát với mã {completed.returncode}"]
+            }
+        with open(report_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    finally:
+        os.remove(report_path)
+
+
+def print_report(reports: list):
+    print()
+    print(f"{'sessions':>8} {'wall(s)':>8} {'sess/s':>7} {'video/s':>8} {'MB/sess':>8} {'errors':>6}")
+    for report in reports:
+        print(f"{report['sessions']:>8} {report['wall_seconds']:>8.2f} {report['sessions_per_second']:>7.2f} "
+              f"{report['videos_per_second']:>8.2f} {report['memory_per_session_mb']:>8.2f} {len(report['errors']):>6}")
+    print()
+    print(f"{'sessions':>8} {'step':<14} {'p50(s)':>8} {'p95(s)':>8} {'max(s)':>8}")
+    for report in reports:
+        for name, stats in report['steps'].items():
+            print(f"{report['sessions']:>8} {name:<14} {stats['p50']:>8.3f} {stats['p95']:>8.3f} {stats['max']:>8.3f}")
+    for report in reports:
+        for error in report['errors'][:5]:
+            print(f"[{report['sessions']} sessions] {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kiểm thử tải nhiều session đồng thời cho giao diện Streamlit")
+    parser.add_argument('--levels', default='1,2,4,8', help="Các mức số session đồng thời, vd: 1,4,16")
+    parser.add_argument('--flows', default='login,single,playlist', help="Các bước mỗi session thực hiện")
+    parser.add_argument('--videos', type=int, default=10, help="Số video trong mỗi playlist giả lập")
+    parser.add_argument('--auth-latency', type=float, default=FakeLatency.auth)
+    parser.add_argument('--metadata-latency', type=float, default=FakeLatency.metadata)
+    parser.add_argument('--fetch-latency', type=float, default=FakeLatency.fetch)
+    parser.add_argument('--timeout', type=float, default=300, help="Thời gian tối đa của một lượt rerun (giây)")
+    parser.add_argument('--real-rate-limits', action='store_true',
+                        help="Giữ cấu hình RateLimiter/FetchScheduler thật thay vì nới giới hạn")
+    parser.add_argument('--memory-samples', type=int, default=2,
+                        help="Số session chạy thêm để đo bộ nhớ giữ lại mỗi session (0 để bỏ qua)")
+    parser.add_argument('--json', dest='json_path', help="Ghi báo cáo dạng JSON ra file")
+    # Dùng nội bộ: tiến trình con chạy một mức tải và ghi báo cáo ra file
+    parser.add_argument('--single-level', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--report-file', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    args.levels = [int(level) for level in args.levels.split(',') if level.strip()]
+    args.max_level = max(args.levels)
+    args.flows = [flow.strip() for flow in args.flows.split(',') if flow.strip()]
+
+    FakeLatency.auth = args.auth_latency
+    FakeLatency.metadata = args.metadata_latency
+    FakeLatency.fetch = args.fetch_latency
+    FakeYoutubeDL.videos_per_playlist = args.videos
+
+    if args.single_level is None:
+        reports = []
+        for level in args.levels:
+            print(f"Đang chạy {level} session đồng thời...", flush=True)
+            reports.append(run_level_in_subprocess(level))
+        print_report(reports)
+        if args.json_path:
+            with open(args.json_path, 'w', encoding='utf-8') as f:
+                json.dump(reports, f, ensure_ascii=False, indent=2)
+        return
+
+    data_dir = tempfile.mkdtemp(prefix='transcript-load-test-')
+    try:
+        configure_environment(args)
+        install_fakes(data_dir)
+        prepare_concurrent_apptest()
+        report = run_level(args.single_level, args)
+        with open(args.report_file, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False)
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
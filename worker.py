@@ -0,0 +1,30 @@
+import threading
+from src.core.transcript import TranscriptExtractor
+from src.core.storage import DataStorage
+from src.core.pipeline import TranscriptPipeline
+from src.core.work_queue import QueueWorker, create_work_queue
+from src.ui.console import ConsoleUI
+
+
+def main():
+    """
+    Chạy worker lấy video từ hàng đợi chung (WORK_QUEUE_BACKEND/WORK_QUEUE_PATH).
+    Có thể chạy nhiều tiến trình worker trên cùng máy với hàng đợi SQLite
+    (file hàng đợi không được đặt trên ổ mạng).
+    """
+    console = ConsoleUI()
+    pipeline = TranscriptPipeline(TranscriptExtractor(), DataStorage())
+    worker = QueueWorker(pipeline, create_work_queue())
+    stop_event = threading.Event()
+
+    console.print_info(f"Worker {worker.worker_id} đang chờ video từ hàng đợi (Ctrl+C để dừng)")
+    try:
+        worker.run(stop_event)
+    except KeyboardInterrupt:
+        # Các video đang xử lý dở đã chạy xong; Ctrl+C lần nữa sẽ thoát ngay,
+        # video đó được giao cho worker khác khi lease hết hạn
+        console.print_warning(f"Worker {worker.worker_id} đã dừng")
+
+
+if __name__ == "__main__":
+    main()